@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends
+
+from .. import models
+from ..core.security import get_current_admin_user
+from ..core.singleflight import resume_reads
+from ..db.history_buffer import history_buffer
+from ..db.slow_queries import slow_query_log
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+@router.get("/slow-queries")
+def read_slow_queries(current_user: models.User = Depends(get_current_admin_user)):
+    """
+    Slow statements seen by this worker: per-statement totals and the most
+    recent occurrences, with EXPLAIN plans where one was sampled.
+    """
+    return slow_query_log.snapshot()
+
+@router.delete("/slow-queries", status_code=204)
+def clear_slow_queries(current_user: models.User = Depends(get_current_admin_user)):
+    """
+    Reset this worker's slow query statistics.
+    """
+    slow_query_log.clear()
+
+@router.get("/read-coalescing")
+def read_coalescing(current_user: models.User = Depends(get_current_admin_user)):
+    """
+    How many resume reads this worker executed and how many shared the result
+    of an identical in-flight one.
+    """
+    return resume_reads.snapshot()
+
+@router.delete("/read-coalescing", status_code=204)
+def clear_read_coalescing(current_user: models.User = Depends(get_current_admin_user)):
+    """
+    Reset this worker's read coalescing counters.
+    """
+    resume_reads.clear()
+
+@router.get("/history-buffer")
+def read_history_buffer(current_user: models.User = Depends(get_current_admin_user)):
+    """
+    State of this worker's write-behind buffer for history rows: rows queued,
+    written and dropped, and how many went into each INSERT.
+    """
+    return history_buffer.snapshot()
@@ -7,7 +7,7 @@ from typing import Any
 
 from app import schemas
 from app.db.base import SessionLocal
-from app.core.security import create_access_token, get_password_hash, verify_password, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.core.security import create_access_token, get_password_hash, verify_password, revoke_token, ACCESS_TOKEN_EXPIRE_MINUTES
 from app.crud.user import get_user_by_email as crud_get_user_by_email, create_user as crud_create_user, authenticate_user as crud_authenticate_user
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -103,8 +103,9 @@ async def login(
             )
         
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        # uid lets get_db pick the user's shard without a directory lookup
         access_token = create_access_token(
-            data={"sub": user.email}, 
+            data={"sub": user.email, "uid": user.id}, 
             expires_delta=access_token_expires
         )
         
@@ -134,7 +135,14 @@ async def login(
         )
 
 @router.post("/logout")
-async def logout(request: Request):
+async def logout(
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    # Revoke the token server-side too, so a copy of it can't be used until expiry
+    for token in (request.cookies.get("access_token"), request.headers.get("Authorization")):
+        if token:
+            revoke_token(db, token)
     response = JSONResponse(content={"message": "Logout successful"})
     response.delete_cookie("access_token")
     return response
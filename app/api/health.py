@@ -2,7 +2,9 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from fastapi import status
+from fastapi.responses import JSONResponse
 from app.db.base import get_db
+from app.db.readiness import readiness
 
 router = APIRouter()
 
@@ -23,3 +25,22 @@ def health_check(db: Session = Depends(get_db)):
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail=f"Database connection error: {str(e)}"
         )
+
+@router.get("/live")
+def liveness_check():
+    """
+    Liveness probe: the worker is running and serving requests. No I/O.
+    """
+    return {"status": "alive"}
+
+@router.get("/ready")
+def readiness_check():
+    """
+    Readiness probe: the cached verdict of this worker's background database
+    and connection pool check, with its age. 503 when not ready.
+    """
+    verdict = readiness.snapshot()
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if verdict["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=verdict
+    )
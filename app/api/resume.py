@@ -1,38 +1,197 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import Response, StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session, sessionmaker
 from typing import List, Optional
 from datetime import datetime
+import asyncio
+import json
 
 from .. import crud, schemas, models
 from ..db.base import get_db
+from ..core.config import settings
 from ..core.security import get_current_active_user
+from ..core.events import broker
+from ..core.idempotency import run_idempotent
+from ..core.singleflight import resume_reads
+from ..core.tracing import span
 from ..crud import resume_history as crud_history
+from ..jobs.resume_purge import purge_detached_resumes
 from ..schemas import resume_history as schemas_history
 
 router = APIRouter(prefix="/resumes", tags=["resumes"])
 
-@router.post("/", response_model=schemas.resume.ResumeInDB)
+IDEMPOTENCY_KEY_HEADER = Header(
+    None,
+    max_length=255,
+    description="Retries with the same key replay the first response instead of repeating the work"
+)
+
+# Set on responses that shared an identical concurrent request's result
+COALESCED_HEADER = "Coalesced"
+_resume_list = TypeAdapter(List[schemas.resume.ResumeFields])
+_resume_detail = TypeAdapter(schemas.resume.ResumeWithHistory)
+
+def _shared_read(
+    db: Session,
+    user_id: int,
+    key: tuple,
+    read,
+    adapter: TypeAdapter,
+    exclude_unset: bool = False
+) -> Response:
+    """
+    Run read() and serialize its result with adapter, once for all identical
+    requests of the user in flight at the same time (see app/core/singleflight.py).
+    Requests that wait for another's result give their connection back first.
+    """
+    def run() -> bytes:
+        result = read()
+        with span("serialize"):
+            return adapter.dump_json(adapter.validate_python(result, from_attributes=True), exclude_unset=exclude_unset)
+
+    if not settings.READ_COALESCING:
+        return Response(content=run(), media_type="application/json")
+    body, shared = resume_reads.do((user_id, *key), run, before_wait=db.close)
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={COALESCED_HEADER: "true"} if shared else None
+    )
+
+@router.post("/", response_model=schemas.resume.ResumeCreated)
 def create_resume(
     resume: schemas.resume.ResumeCreate,
+    idempotency_key: Optional[str] = IDEMPOTENCY_KEY_HEADER,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Create a new resume for the current user. Near-duplicates of it among the
+    user's other resumes are listed under "duplicates".
+    """
+    def create():
+        db_resume = crud.resume.create_resume(db=db, resume=resume, user_id=current_user.id)
+        created = schemas.resume.ResumeCreated.model_validate(db_resume)
+        if settings.DUPLICATE_CHECK_ON_CREATE:
+            created.duplicates = [
+                schemas.resume.SimilarResume(**similar)
+                for similar in crud.resume.find_similar_resumes(
+                    db, db_resume.id, current_user.id, min_similarity=settings.DUPLICATE_MIN_SIMILARITY
+                )
+            ]
+        return created
+
+    return run_idempotent(
+        db, current_user.id, idempotency_key,
+        fingerprint=f"POST /resumes {resume.model_dump_json()}",
+        operation=create,
+        response_model=schemas.resume.ResumeCreated
+    )
+
+@router.post("/improve-batch", response_model=schemas.resume.ResumeImproveBatchResult)
+def improve_resumes(
+    batch: schemas.resume.ResumeImproveBatch,
+    idempotency_key: Optional[str] = IDEMPOTENCY_KEY_HEADER,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Improve several resumes in one request and one transaction.
+    """
+    return run_idempotent(
+        db, current_user.id, idempotency_key,
+        fingerprint=f"POST /resumes/improve-batch {batch.model_dump_json()}",
+        operation=lambda: crud.resume.improve_resumes(
+            db=db,
+            resume_ids=batch.resume_ids,
+            user_id=current_user.id
+        ),
+        response_model=schemas.resume.ResumeImproveBatchResult
+    )
+
+@router.post("/match", response_model=List[schemas.resume.ResumeMatch])
+def match_resumes(
+    request: schemas.resume.ResumeMatchRequest,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
     """
-    Create a new resume for the current user.
+    Rank the current user's resumes by how well they fit a job description.
     """
-    return crud.resume.create_resume(db=db, resume=resume, user_id=current_user.id)
+    return crud.resume.match_resumes(
+        db=db,
+        user_id=current_user.id,
+        job_description=request.job_description,
+        limit=request.limit
+    )
 
+# Documented as full resumes, the default; the body is serialized by
+# _shared_read, so the sparse ?fields= form doesn't have to fit this model
 @router.get("/", response_model=List[schemas.resume.ResumeInDB])
 def read_resumes(
     skip: int = 0,
     limit: int = 100,
+    fields: Optional[str] = Query(
+        None,
+        description=(
+            "'summary' or a comma separated list of fields; content is only read when selected. "
+            "Each resume then carries only the selected fields"
+        )
+    ),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
     """
     Retrieve all resumes for the current user.
     """
-    return crud.resume.get_resumes(db, user_id=current_user.id, skip=skip, limit=limit)
+    selected = crud.resume.parse_fields(fields)
+
+    def read():
+        resumes = crud.resume.get_resumes(db, user_id=current_user.id, skip=skip, limit=limit, fields=selected)
+        if selected is None:
+            return [schemas.resume.ResumeInDB.model_validate(resume) for resume in resumes]
+        return [{field: getattr(resume, field) for field in selected} for resume in resumes]
+
+    return _shared_read(
+        db, current_user.id, ("list", skip, limit, tuple(selected or ())), read, _resume_list, exclude_unset=True
+    )
+
+EVENTS_KEEPALIVE_SECONDS = 15
+
+@router.get("/events")
+async def resume_events(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Server-sent events stream of changes to the current user's resumes.
+    """
+    user_id = current_user.id
+    # Return the connection to the pool instead of holding it for the whole stream
+    db.close()
+
+    async def stream():
+        subscription = broker.subscribe(user_id)
+        _, queue = subscription
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: resume\ndata: {json.dumps(event)}\n\n"
+        finally:
+            broker.unsubscribe(user_id, subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/{resume_id}", response_model=schemas.resume.ResumeWithHistory)
 def read_resume(
@@ -43,13 +202,32 @@ def read_resume(
     """
     Get a specific resume by ID with its history.
     """
-    resume = crud.resume.get_resume(db, resume_id=resume_id, user_id=current_user.id)
-    history = crud.resume.get_resume_history(db, resume_id=resume_id, user_id=current_user.id)
-    
-    return {
-        **resume.__dict__,
-        "history": history
-    }
+    def read():
+        resume = crud.resume.get_resume(db, resume_id=resume_id, user_id=current_user.id)
+        history = crud.resume.get_resume_history(db, resume_id=resume_id, user_id=current_user.id)
+        return {
+            **resume.__dict__,
+            "history": history
+        }
+
+    return _shared_read(db, current_user.id, ("detail", resume_id), read, _resume_detail)
+
+@router.get("/{resume_id}/similar", response_model=List[schemas.resume.SimilarResume])
+def similar_resumes(
+    resume_id: int,
+    min_similarity: float = Query(0.7, ge=0, le=1),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    The current user's resumes most similar to this one. Found through LSH
+    buckets tuned for near-duplicates: below about 0.7 most similar resumes
+    are missed, whatever min_similarity is.
+    """
+    return crud.resume.find_similar_resumes(
+        db, resume_id, current_user.id, min_similarity=min_similarity, limit=limit
+    )
 
 @router.put("/{resume_id}", response_model=schemas.resume.ResumeInDB)
 def update_resume(
@@ -87,29 +265,72 @@ async def get_resume_history(
     
     return crud_history.get_resume_history(db, resume_id=resume_id, skip=skip, limit=limit)
 
+@router.get("/{resume_id}/history/{from_id}/diff/current", response_model=schemas_history.ResumeDiff)
+def diff_history_against_current(
+    resume_id: int,
+    from_id: int,
+    granularity: str = Query("line", pattern="^(line|word)$"),
+    context: Optional[int] = Query(None, ge=0, le=100),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Diff a history version against the resume's current content.
+    """
+    resume = crud.resume.get_resume(db, resume_id=resume_id, user_id=current_user.id)
+    return crud_history.diff_versions(
+        db, resume, from_id=from_id, granularity=granularity, context=context
+    )
+
+@router.get("/{resume_id}/history/{from_id}/diff/{to_id}", response_model=schemas_history.ResumeDiff)
+def diff_history_versions(
+    resume_id: int,
+    from_id: int,
+    to_id: int,
+    granularity: str = Query("line", pattern="^(line|word)$"),
+    context: Optional[int] = Query(None, ge=0, le=100),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Diff two history versions of a resume.
+    """
+    resume = crud.resume.get_resume(db, resume_id=resume_id, user_id=current_user.id)
+    return crud_history.diff_versions(
+        db, resume, from_id=from_id, to_id=to_id, granularity=granularity, context=context
+    )
+
 @router.delete("/{resume_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_resume(
     resume_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
     """
-    Delete a resume.
+    Delete a resume. Very long histories are purged after the response.
     """
-    crud.resume.delete_resume(db=db, resume_id=resume_id, user_id=current_user.id)
+    if crud.resume.delete_resume(db=db, resume_id=resume_id, user_id=current_user.id):
+        background_tasks.add_task(purge_detached_resumes, sessionmaker(bind=db.get_bind()))
     return {"ok": True}
 
 @router.post("/{resume_id}/improve", response_model=schemas.resume.ResumeInDB)
 def improve_resume(
     resume_id: int,
+    idempotency_key: Optional[str] = IDEMPOTENCY_KEY_HEADER,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
     """
     Improve a resume using AI.
     """
-    return crud.resume.improve_resume(
-        db=db,
-        resume_id=resume_id,
-        user_id=current_user.id
+    return run_idempotent(
+        db, current_user.id, idempotency_key,
+        fingerprint=f"POST /resumes/{resume_id}/improve",
+        operation=lambda: crud.resume.improve_resume(
+            db=db,
+            resume_id=resume_id,
+            user_id=current_user.id
+        ),
+        response_model=schemas.resume.ResumeInDB
     )
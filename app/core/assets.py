@@ -0,0 +1,201 @@
+"""
+Static asset pipeline.
+
+build_assets() vendors the third-party CSS/JS the templates use into
+app/static/dist under content-hashed filenames, next to .gz (and, when the
+optional brotli package is installed, .br) siblings, and writes a manifest
+mapping logical names to those files. Templates resolve URLs through
+asset_url(), which falls back to the public CDN when no build is present, so
+development works without running the pipeline.
+
+PrecompressedStaticFiles serves the precompressed siblings to clients that
+accept them and marks fingerprinted files as immutable, so repeat page loads
+are served entirely from the browser cache.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import stat
+from functools import lru_cache
+from mimetypes import guess_type
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+from urllib.request import Request, urlopen
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+
+try:
+    import brotli
+except ImportError:  # optional: without it only .gz siblings are produced
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+DIST_PREFIX = "dist"
+MANIFEST_NAME = "manifest.json"
+
+# Logical name -> upstream URL. JavaScript is taken from the upstream minified
+# builds; CSS is additionally run through minify_css().
+VENDOR_ASSETS: Dict[str, str] = {
+    "tailwind.css": "https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css",
+    "fontawesome.css": "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0-beta3/css/all.min.css",
+    "htmx.js": "https://unpkg.com/htmx.org@1.9.2/dist/htmx.min.js",
+    "hyperscript.js": "https://unpkg.com/hyperscript.org@0.9.8/dist/_hyperscript.min.js",
+}
+
+COMPRESSIBLE = {".css", ".js", ".svg", ".ttf", ".eot", ".json", ".map"}
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_CSS_COMMENT_RE = re.compile(r"/\*(?!!).*?\*/", re.S)
+_CSS_SPACE_RE = re.compile(r"\s+")
+_CSS_PUNCT_RE = re.compile(r"\s*([{}:;,>])\s*")
+_CSS_URL_RE = re.compile(r"url\(\s*(['\"]?)([^'\")]+)\1\s*\)")
+
+
+def fetch_url(url: str) -> bytes:
+    request = Request(url, headers={"User-Agent": "resume-asset-pipeline"})
+    with urlopen(request, timeout=30) as response:
+        return response.read()
+
+
+def minify_css(css: str) -> str:
+    """Conservative minifier: comments (except /*! licences) and redundant whitespace"""
+    css = _CSS_COMMENT_RE.sub("", css)
+    css = _CSS_SPACE_RE.sub(" ", css)
+    css = _CSS_PUNCT_RE.sub(r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+def fingerprint(name: str, data: bytes) -> str:
+    stem, ext = os.path.splitext(os.path.basename(name))
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+
+def _write(output_dir: str, filename: str, data: bytes) -> None:
+    path = os.path.join(output_dir, filename)
+    with open(path, "wb") as f:
+        f.write(data)
+    if os.path.splitext(filename)[1] not in COMPRESSIBLE:
+        return
+    # mtime=0 keeps the .gz byte-identical across builds
+    gzipped = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gzipped) < len(data):
+        with open(path + ".gz", "wb") as f:
+            f.write(gzipped)
+    if brotli is not None:
+        compressed = brotli.compress(data, quality=11)
+        if len(compressed) < len(data):
+            with open(path + ".br", "wb") as f:
+                f.write(compressed)
+
+
+def _vendor_css_dependencies(
+    css: str,
+    css_url: str,
+    output_dir: str,
+    fetch: Callable[[str], bytes],
+    seen: Dict[str, str]
+) -> str:
+    """Download files referenced by url(...) (fonts, images) and point the CSS at their fingerprinted copies"""
+    def replace(match: "re.Match") -> str:
+        ref = match.group(2).strip()
+        if ref.startswith(("data:", "#")):
+            return match.group(0)
+        absolute = urljoin(css_url, ref)
+        parts = urlsplit(absolute)
+        fetch_target = absolute.split("#", 1)[0]
+        if fetch_target not in seen:
+            data = fetch(fetch_target)
+            filename = fingerprint(os.path.basename(parts.path), data)
+            _write(output_dir, filename, data)
+            seen[fetch_target] = filename
+        fragment = f"#{parts.fragment}" if parts.fragment else ""
+        return f"url({seen[fetch_target]}{fragment})"
+
+    return _CSS_URL_RE.sub(replace, css)
+
+
+def build_assets(
+    sources: Optional[Dict[str, str]] = None,
+    static_dir: str = STATIC_DIR,
+    fetch: Callable[[str], bytes] = fetch_url
+) -> Dict[str, str]:
+    """Vendor, minify and fingerprint every source; returns and writes the manifest"""
+    sources = sources or VENDOR_ASSETS
+    output_dir = os.path.join(static_dir, DIST_PREFIX)
+    os.makedirs(output_dir, exist_ok=True)
+
+    manifest = {}
+    seen: Dict[str, str] = {}
+    for name, url in sources.items():
+        data = fetch(url)
+        if name.endswith(".css"):
+            css = _vendor_css_dependencies(data.decode("utf-8"), url, output_dir, fetch, seen)
+            data = minify_css(css).encode("utf-8")
+        filename = fingerprint(name, data)
+        _write(output_dir, filename, data)
+        manifest[name] = f"{DIST_PREFIX}/{filename}"
+
+    with open(os.path.join(output_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    load_manifest.cache_clear()
+    return manifest
+
+
+@lru_cache(maxsize=None)
+def load_manifest(static_dir: str = STATIC_DIR) -> Dict[str, str]:
+    try:
+        with open(os.path.join(static_dir, DIST_PREFIX, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def asset_url(name: str) -> str:
+    """Template helper: fingerprinted URL from the manifest, else the CDN original"""
+    path = load_manifest().get(name)
+    if path:
+        return f"/static/{path}"
+    return VENDOR_ASSETS.get(name, f"/static/{name}")
+
+
+def _accepted_encodings(scope) -> Tuple[str, ...]:
+    accepted = []
+    for part in Headers(scope=scope).get("accept-encoding", "").split(","):
+        token, _, params = part.strip().partition(";")
+        if token and params.strip().replace(" ", "") not in ("q=0", "q=0.0"):
+            accepted.append(token.lower())
+    return tuple(accepted)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves .br/.gz siblings and caches fingerprinted files forever"""
+
+    async def get_response(self, path: str, scope) -> Response:
+        response = None
+        if scope["method"] in ("GET", "HEAD"):
+            accepted = _accepted_encodings(scope)
+            for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+                if encoding not in accepted:
+                    continue
+                full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+                if stat_result and stat.S_ISREG(stat_result.st_mode):
+                    response = FileResponse(
+                        full_path,
+                        stat_result=stat_result,
+                        media_type=guess_type(path)[0] or "text/plain",
+                        headers={"Content-Encoding": encoding},
+                    )
+                    break
+        if response is None:
+            response = await super().get_response(path, scope)
+
+        if response.status_code in (200, 304):
+            response.headers["Vary"] = "Accept-Encoding"
+            if path.startswith(f"{DIST_PREFIX}/"):
+                response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
@@ -9,12 +9,132 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
 
+    # Production launcher (python -m app.server)
+    WEB_HOST: str = "0.0.0.0"
+    WEB_PORT: int = 8001
+    WEB_CONCURRENCY: int = 0  # 0 = autotune from CPU and memory limits
+    WEB_WORKERS_PER_CORE: float = 1.0
+    WEB_WORKER_MEMORY_MB: int = 256  # budget per worker when a memory limit is set
+    WEB_MAX_REQUESTS: int = 10000  # recycle a worker after this many requests (0 = never)
+    WEB_MAX_REQUESTS_JITTER: int = 1000
+    WEB_GRACEFUL_TIMEOUT: int = 30
+    # The launcher exits after this many workers in a row die within seconds of starting
+    WEB_MAX_STARTUP_FAILURES: int = 10
+    WEB_FORWARDED_ALLOW_IPS: str = "127.0.0.1"
+
     # Database settings
     DATABASE_URL: str
     TEST_DATABASE_URL: Optional[str] = None
+    # User-id sharding: comma-separated name=url pairs. Empty keeps everything in
+    # DATABASE_URL; otherwise DATABASE_URL is the user directory (users,
+    # user_shards, revoked_tokens) and each user's data lives on one shard
+    DATABASE_SHARDS: str = ""
+    SHARD_STRATEGY: str = "hash"  # or "range": SHARD_RANGE_SIZE consecutive ids per shard, round robin
+    SHARD_RANGE_SIZE: int = 100000
+    SHARD_DIRECTORY_CACHE_SECONDS: float = 30  # how long a worker trusts a cached shard assignment
 
     # Security
     ALGORITHM: str = "HS256"
+    # bcrypt cost (log2 rounds); pick it per host with calibrate_password_hash.py.
+    # Stored hashes with a different cost are rehashed on the next login.
+    BCRYPT_ROUNDS: int = 12
+    # Revoked token ids are mirrored into a per-worker Bloom filter; other
+    # workers pick up a revocation within REFRESH_SECONDS
+    TOKEN_REVOCATION_REFRESH_SECONDS: float = 5.0
+    TOKEN_REVOCATION_BLOOM_CAPACITY: int = 100000
+    TOKEN_REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+
+    # Resume history
+    # "app" builds history rows in Python; "database" snapshots the old content
+    # server-side in the same statement batch as the edit (see migration 979b066dd4a9)
+    HISTORY_CAPTURE_MODE: str = "app"
+    # "sync" inserts each history row in its edit's transaction. "buffered"
+    # queues rows per worker and inserts them in batches of up to MAX_ROWS, at
+    # least every FLUSH_SECONDS; a killed worker loses its queued rows.
+    # "relaxed" also commits edits with synchronous_commit off on PostgreSQL.
+    # Capture mode "database" always writes history with the edit.
+    # (see app/db/history_buffer.py)
+    HISTORY_DURABILITY: str = "sync"
+    HISTORY_BUFFER_MAX_ROWS: int = 500
+    HISTORY_BUFFER_FLUSH_SECONDS: float = 1.0
+
+    # Deleting a resume with more history versions than this only detaches it;
+    # its history is then purged in the background, RESUME_PURGE_BATCH_SIZE rows
+    # per transaction (0 = always delete synchronously)
+    RESUME_PURGE_ASYNC_THRESHOLD: int = 10000
+    RESUME_PURGE_BATCH_SIZE: int = 5000
+
+    # Resume improvement: "marker", "rules" or "package.module:EngineClass"
+    # (see app/core/improvement.py). Batches of at least PARALLEL_MIN_BATCH
+    # resumes are spread over WORKERS processes (0 = one per CPU)
+    IMPROVEMENT_ENGINE: str = "marker"
+    IMPROVEMENT_WORKERS: int = 0
+    IMPROVEMENT_PARALLEL_MIN_BATCH: int = 16
+    IMPROVE_BATCH_MAX_SIZE: int = 200
+
+    # POST /api/resumes/match: keywords listed per resume as matched and as missing
+    MATCH_KEYWORD_LIMIT: int = 20
+    # Creating a resume at least this similar (estimated Jaccard of 3-word
+    # shingles) to another of the user's lists it under "duplicates"
+    DUPLICATE_CHECK_ON_CREATE: bool = True
+    DUPLICATE_MIN_SIMILARITY: float = 0.8
+    # Resumes indexed per transaction by the startup job that indexes those
+    # missing a signature (see app/jobs/content_index.py)
+    CONTENT_INDEX_BATCH_SIZE: int = 500
+
+    # History retention: keep every version for KEEP_ALL_DAYS, then one per day
+    # until DAILY_DAYS, then one per month (dropped entirely after MONTHLY_DAYS, 0 = never)
+    HISTORY_RETENTION_KEEP_ALL_DAYS: int = 30
+    HISTORY_RETENTION_DAILY_DAYS: int = 365
+    HISTORY_RETENTION_MONTHLY_DAYS: int = 0
+    HISTORY_RETENTION_ARCHIVE: bool = False
+    HISTORY_RETENTION_CHUNK_SIZE: int = 100  # resumes per transaction
+    HISTORY_RETENTION_INTERVAL_MINUTES: int = 0  # 0 disables the in-app scheduler
+    # Monthly resume_history partitions to keep created ahead of time (PostgreSQL only)
+    HISTORY_PARTITION_MONTHS_AHEAD: int = 3
+
+    # Change notifications: "auto" (postgres on PostgreSQL, else memory), "postgres" or "memory"
+    EVENTS_BACKEND: str = "auto"
+
+    # Version diffs
+    # Changed tokens beyond this are reported as one replacement. SequenceMatcher
+    # can take quadratic time in them, inline on the request's thread
+    DIFF_MAX_TOKENS: int = 4000
+    DIFF_CACHE_SIZE: int = 1024  # cached diffs per worker
+
+    # Idempotency-Key handling for POST /api/resumes and /improve
+    IDEMPOTENCY_TTL_HOURS: int = 24  # how long a stored response can be replayed
+    IDEMPOTENCY_WAIT_SECONDS: float = 30  # how long a duplicate waits for the in-flight original
+    IDEMPOTENCY_LOCK_TIMEOUT_SECONDS: int = 120  # an unfinished original older than this is presumed dead
+
+    # Slow query log (logs/slow_queries.log and GET /api/admin/slow-queries)
+    SLOW_QUERY_THRESHOLD_MS: float = 200  # 0 disables
+    SLOW_QUERY_LOG_PER_MINUTE: int = 60  # log lines beyond this are only counted
+    SLOW_QUERY_EXPLAINS_PER_MINUTE: int = 6
+    SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS: int = 600  # per distinct statement
+    SLOW_QUERY_EXPLAIN_TIMEOUT_MS: int = 10000  # EXPLAIN ANALYZE re-runs the query
+    # Comma separated emails allowed to use the /api/admin endpoints
+    ADMIN_EMAILS: str = ""
+
+    # Request tracing, as OTLP/JSON lines in logs/traces.jsonl (see app/core/tracing.py).
+    # Share of requests traced when no incoming traceparent decides, and the
+    # most traced per second per worker (0 disables tracing)
+    TRACE_SAMPLE_RATE: float = 0.01
+    TRACE_MAX_PER_SECOND: float = 10
+
+    # GET /api/ready: how often each worker probes the database, and the share
+    # of pool connections in use at which it reports itself not ready
+    HEALTH_CHECK_INTERVAL_SECONDS: float = 5
+    HEALTH_POOL_SATURATION: float = 1.0
+
+    # Share one in-flight computation between identical concurrent GET
+    # /api/resumes and /api/resumes/{id} requests of a user (per worker)
+    READ_COALESCING: bool = True
+
+    # Resumes shown on the dashboard next to the account statistics
+    DASHBOARD_RECENT_RESUMES: int = 6
+    # Versions rendered with the resume detail page and per lazily loaded page after it
+    HISTORY_PAGE_SIZE: int = 10
 
     class Config:
         case_sensitive = True
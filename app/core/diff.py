@@ -0,0 +1,108 @@
+import re
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Tuple
+
+GRANULARITIES = ("line", "word")
+DEFAULT_CONTEXT = {"line": 3, "word": 10}
+
+# A word and the whitespace after it, so joining tokens restores the text exactly
+_WORD_RE = re.compile(r"^\s+|\S+\s*")
+
+
+def tokenize(text: str, granularity: str) -> List[str]:
+    if granularity == "word":
+        return _WORD_RE.findall(text)
+    return text.splitlines(keepends=True)
+
+
+def _common_affixes(a: List[str], b: List[str]) -> Tuple[int, int]:
+    prefix = 0
+    limit = min(len(a), len(b))
+    while prefix < limit and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and a[-1 - suffix] == b[-1 - suffix]:
+        suffix += 1
+    return prefix, suffix
+
+
+def _opcodes(a: List[str], b: List[str], max_tokens: int) -> Tuple[List[Tuple[str, List[str]]], bool]:
+    """
+    Diff two token lists into (op, tokens) runs. The unchanged prefix and suffix
+    are trimmed first, which is where most resume edits leave the bulk of the
+    text; only the changed middle goes through SequenceMatcher. If that middle is
+    still larger than max_tokens it is reported as one replacement (coarse but
+    correct) and the second value is True.
+    """
+    prefix, suffix = _common_affixes(a, b)
+    a_mid = a[prefix:len(a) - suffix]
+    b_mid = b[prefix:len(b) - suffix]
+
+    runs: List[Tuple[str, List[str]]] = []
+    if prefix:
+        runs.append(("equal", a[:prefix]))
+
+    capped = len(a_mid) + len(b_mid) > max_tokens
+    if capped:
+        if a_mid:
+            runs.append(("delete", a_mid))
+        if b_mid:
+            runs.append(("insert", b_mid))
+    else:
+        matcher = SequenceMatcher(None, a_mid, b_mid, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                runs.append(("equal", a_mid[i1:i2]))
+                continue
+            if tag in ("delete", "replace"):
+                runs.append(("delete", a_mid[i1:i2]))
+            if tag in ("insert", "replace"):
+                runs.append(("insert", b_mid[j1:j2]))
+
+    if suffix:
+        runs.append(("equal", a[len(a) - suffix:]))
+    return runs, capped
+
+
+def diff_texts(
+    old: str,
+    new: str,
+    granularity: str = "line",
+    context: int = None,
+    max_tokens: int = 4000
+) -> Dict[str, Any]:
+    """
+    Compact diff of two texts. Unchanged runs longer than 2 * context tokens are
+    collapsed into a "skip" chunk carrying only the number of tokens left out.
+    """
+    if context is None:
+        context = DEFAULT_CONTEXT[granularity]
+    runs, capped = _opcodes(tokenize(old or "", granularity), tokenize(new or "", granularity), max_tokens)
+
+    chunks = []
+    insertions = deletions = 0
+    for index, (op, tokens) in enumerate(runs):
+        if op == "insert":
+            insertions += len(tokens)
+        elif op == "delete":
+            deletions += len(tokens)
+        elif op == "equal":
+            head = context if index > 0 else 0
+            tail = context if index < len(runs) - 1 else 0
+            if len(tokens) > head + tail + 1:
+                if head:
+                    chunks.append({"op": "equal", "text": "".join(tokens[:head])})
+                chunks.append({"op": "skip", "skipped": len(tokens) - head - tail})
+                if tail:
+                    chunks.append({"op": "equal", "text": "".join(tokens[-tail:])})
+                continue
+        chunks.append({"op": op, "text": "".join(tokens)})
+
+    return {
+        "granularity": granularity,
+        "chunks": chunks,
+        "insertions": insertions,
+        "deletions": deletions,
+        "truncated": capped,
+    }
@@ -0,0 +1,188 @@
+"""
+Per-user resume change notifications for the SSE stream.
+
+Write paths call publish_resume_change() after committing. With the "postgres"
+backend the event goes out through NOTIFY and every worker's listener thread
+(LISTEN on a dedicated connection) hands it to the local subscribers, so all
+uvicorn workers see every change. The "memory" backend delivers straight to
+subscribers in the current process, which is all a single worker or a SQLite
+run needs.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "resume_events"
+QUEUE_SIZE = 100
+LISTEN_POLL_SECONDS = 5
+RECONNECT_SECONDS = 2
+
+
+def backend_for(engine: Engine) -> str:
+    if settings.EVENTS_BACKEND == "auto":
+        return "postgres" if engine.dialect.name == "postgresql" else "memory"
+    return settings.EVENTS_BACKEND
+
+
+class EventBroker:
+    """Fans events out to the asyncio queues of this process's SSE connections"""
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._lock = threading.Lock()
+        self._listener: Optional["PostgresListener"] = None
+        self.engine: Optional[Engine] = None
+        self.backend = "memory"
+        self.dropped = 0
+
+    def subscribe(self, user_id: int) -> Tuple[asyncio.AbstractEventLoop, asyncio.Queue]:
+        subscription = (asyncio.get_running_loop(), asyncio.Queue(maxsize=QUEUE_SIZE))
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, user_id: int, subscription: Tuple[asyncio.AbstractEventLoop, asyncio.Queue]) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+    def dispatch(self, event: Dict[str, Any]) -> None:
+        """Deliver an event to local subscribers; safe to call from any thread"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(event.get("user_id"), ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, event)
+            except RuntimeError:
+                # The subscriber's event loop has already shut down
+                pass
+
+    def _offer(self, queue: asyncio.Queue, event: Dict[str, Any]) -> None:
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A stalled client only misses events; it re-fetches on reconnect
+            self.dropped += 1
+
+    def start(self, engine: Engine) -> None:
+        self.engine = engine
+        self.backend = backend_for(engine)
+        if self.backend == "postgres" and self._listener is None:
+            self._listener = PostgresListener(engine, self)
+            self._listener.start()
+
+    def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+
+class PostgresListener(threading.Thread):
+    """LISTENs on a dedicated connection and dispatches NOTIFY payloads locally"""
+
+    def __init__(self, engine: Engine, broker: EventBroker):
+        super().__init__(name="resume-events-listener", daemon=True)
+        self.engine = engine
+        self.broker = broker
+        self._stopped = threading.Event()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def run(self) -> None:
+        while not self._stopped.is_set():
+            connection = None
+            try:
+                # Detached from the pool: this connection lives as long as the worker
+                connection = self.engine.raw_connection()
+                connection.detach()
+                dbapi_connection = connection.driver_connection
+                dbapi_connection.autocommit = True
+                with dbapi_connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CHANNEL}")
+                self._listen(dbapi_connection)
+            except Exception as e:
+                logger.error(f"Resume events listener error: {str(e)}")
+                self._stopped.wait(RECONNECT_SECONDS)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+
+    def _listen(self, dbapi_connection) -> None:
+        while not self._stopped.is_set():
+            readable, _, _ = select.select([dbapi_connection], [], [], LISTEN_POLL_SECONDS)
+            if not readable:
+                continue
+            dbapi_connection.poll()
+            while dbapi_connection.notifies:
+                notify = dbapi_connection.notifies.pop(0)
+                try:
+                    self.broker.dispatch(json.loads(notify.payload))
+                except ValueError:
+                    logger.warning(f"Ignoring malformed resume event: {notify.payload!r}")
+
+
+broker = EventBroker()
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def publish_resume_change(
+    db: Session,
+    change: str,
+    user_id: int,
+    resume_id: int,
+    version: Optional[int] = None,
+    updated_at: Optional[datetime] = None
+) -> None:
+    """
+    Announce that a resume was created, updated, improved or deleted. Call after
+    the change is committed; with the postgres backend this costs one extra
+    statement.
+    """
+    event = {
+        "type": change,
+        "user_id": user_id,
+        "resume_id": resume_id,
+        "version": version,
+        "updated_at": _isoformat(updated_at),
+    }
+    if broker.backend == "postgres":
+        try:
+            # A separate pooled connection, so the session's objects aren't
+            # expired; on the listener's database, which with sharding need not
+            # be the one db writes to
+            with (broker.engine or db.get_bind()).connect() as connection:
+                connection.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {"channel": CHANNEL, "payload": json.dumps(event)}
+                )
+                connection.commit()
+        except Exception as e:
+            logger.error(f"Failed to publish resume event: {str(e)}")
+    else:
+        broker.dispatch(event)
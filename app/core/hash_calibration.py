@@ -0,0 +1,71 @@
+"""
+Benchmark bcrypt on this host and pick the cost that fits a login latency
+budget. Used by calibrate_password_hash.py; the result is stored as
+BCRYPT_ROUNDS.
+"""
+import os
+import re
+import statistics
+import time
+from typing import Callable, Dict, Tuple
+
+from passlib.hash import bcrypt
+
+# Costs below this are too cheap to brute-force regardless of hardware
+MIN_ROUNDS = 10
+MAX_ROUNDS = 16
+SAMPLE_PASSWORD = "calibration-password"
+
+
+def measure_hash_ms(rounds: int, samples: int = 5) -> float:
+    """Median wall time in milliseconds of one bcrypt hash at the given cost"""
+    hasher = bcrypt.using(rounds=rounds)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        hasher.hash(SAMPLE_PASSWORD)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(
+    target_ms: float,
+    min_rounds: int = MIN_ROUNDS,
+    max_rounds: int = MAX_ROUNDS,
+    samples: int = 5,
+    measure: Callable[[int, int], float] = measure_hash_ms
+) -> Tuple[int, Dict[int, float]]:
+    """
+    Highest cost whose median hash time is within target_ms, never below
+    min_rounds. Each step doubles the work, so measuring stops at the first
+    cost over budget. Returns the cost and the timings measured.
+    """
+    timings: Dict[int, float] = {}
+    chosen = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        timings[rounds] = measure(rounds, samples)
+        if timings[rounds] > target_ms:
+            break
+        chosen = rounds
+    return chosen, timings
+
+
+def write_env_setting(path: str, key: str, value: str) -> None:
+    """Set KEY=value in an env file, replacing an existing assignment or appending one"""
+    lines = []
+    if os.path.exists(path):
+        with open(path) as f:
+            lines = f.read().splitlines()
+    pattern = re.compile(rf"^\s*{re.escape(key)}\s*=")
+    assignment = f"{key}={value}"
+    for index, line in enumerate(lines):
+        if pattern.match(line):
+            lines[index] = assignment
+            break
+    else:
+        lines.append(assignment)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
@@ -0,0 +1,190 @@
+"""
+Idempotency-Key support for mutating endpoints.
+
+The first request with a given key claims a row in idempotency_keys, runs,
+and stores its response there. Retries with the same key get the stored
+response replayed. Duplicates that arrive while the original is still running
+wait for it: this worker is woken directly, while other workers poll the row.
+A failed original releases its claim, so the client can retry. Rows expire
+after IDEMPOTENCY_TTL_HOURS and are purged periodically.
+"""
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from pydantic import BaseModel
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.idempotency import IdempotencyKey
+
+POLL_SECONDS = 0.1
+PURGE_INTERVAL_SECONDS = 300
+REPLAY_HEADER = "Idempotent-Replayed"
+
+# Wakes duplicates waiting in this worker as soon as the original finishes
+_finished: Dict[Tuple[int, str], threading.Event] = {}
+_finished_lock = threading.Lock()
+_next_purge = 0.0
+
+
+def _register(user_id: int, key: str) -> None:
+    with _finished_lock:
+        _finished[(user_id, key)] = threading.Event()
+
+
+def _wait(user_id: int, key: str) -> None:
+    with _finished_lock:
+        event = _finished.get((user_id, key))
+    if event is not None:
+        event.wait(POLL_SECONDS)
+    else:
+        # The original runs in another worker
+        time.sleep(POLL_SECONDS)
+
+
+def _notify(user_id: int, key: str) -> None:
+    with _finished_lock:
+        event = _finished.pop((user_id, key), None)
+    if event is not None:
+        event.set()
+
+
+def purge_expired(db: Session) -> int:
+    result = db.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.expires_at < datetime.now(timezone.utc))
+    )
+    db.commit()
+    return result.rowcount
+
+
+def _claim(db: Session, user_id: int, key: str, request_hash: str) -> bool:
+    """Try to become the request that executes for this key"""
+    global _next_purge
+    now = datetime.now(timezone.utc)
+    if time.monotonic() >= _next_purge:
+        _next_purge = time.monotonic() + PURGE_INTERVAL_SECONDS
+        purge_expired(db)
+
+    try:
+        db.add(IdempotencyKey(
+            user_id=user_id,
+            key=key,
+            request_hash=request_hash,
+            locked_at=now,
+            expires_at=now + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS),
+        ))
+        db.commit()
+        return True
+    except IntegrityError:
+        db.rollback()
+
+    # Take over a row that expired, or whose original died mid-request
+    stale = datetime.now(timezone.utc) - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT_SECONDS)
+    taken = db.execute(
+        update(IdempotencyKey)
+        .where(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key,
+            (IdempotencyKey.expires_at < now)
+            | (IdempotencyKey.status_code.is_(None) & (IdempotencyKey.locked_at < stale)),
+        )
+        .values(
+            request_hash=request_hash,
+            status_code=None,
+            response_body=None,
+            locked_at=now,
+            expires_at=now + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS),
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return taken == 1
+
+
+def _load(db: Session, user_id: int, key: str):
+    record = db.execute(
+        select(IdempotencyKey.request_hash, IdempotencyKey.status_code, IdempotencyKey.response_body)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+    ).one_or_none()
+    # Don't hold a transaction open while waiting
+    db.rollback()
+    return record
+
+
+def _release(db: Session, user_id: int, key: str) -> None:
+    db.rollback()
+    db.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+    )
+    db.commit()
+    _notify(user_id, key)
+
+
+def run_idempotent(
+    db: Session,
+    user_id: int,
+    key: Optional[str],
+    fingerprint: str,
+    operation: Callable[[], Any],
+    response_model: Type[BaseModel]
+) -> Any:
+    """
+    Run operation once per (user, Idempotency-Key). Without a key this is just
+    operation(). fingerprint describes the request (method, path, body) and
+    must match for a key to be replayed.
+    """
+    if key is None:
+        return operation()
+
+    request_hash = hashlib.sha256(fingerprint.encode()).hexdigest()
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    while not _claim(db, user_id, key, request_hash):
+        record = _load(db, user_id, key)
+        if record is None:
+            # The original failed and released the key: try to claim it again
+            continue
+        if record.request_hash != request_hash:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used for a different request"
+            )
+        if record.status_code is not None:
+            return Response(
+                content=record.response_body,
+                status_code=record.status_code,
+                media_type="application/json",
+                headers={REPLAY_HEADER: "true"}
+            )
+        if time.monotonic() >= deadline:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is still in progress"
+            )
+        _wait(user_id, key)
+
+    _register(user_id, key)
+    try:
+        result = operation()
+        body = json.dumps(jsonable_encoder(response_model.model_validate(result)))
+    except BaseException:
+        _release(db, user_id, key)
+        raise
+
+    db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        .values(status_code=status.HTTP_200_OK, response_body=body)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    _notify(user_id, key)
+    return Response(content=body, media_type="application/json")
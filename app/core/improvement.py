@@ -0,0 +1,173 @@
+"""
+Resume improvement engines.
+
+IMPROVEMENT_ENGINE selects the engine crud.resume uses to improve content:
+
+- "marker" (default) leaves the text alone; the caller's [Improved] tag is
+  the only change, as before engines existed.
+- "rules" is a local rule-based pass: whitespace and bullet normalization,
+  weak-verb replacement and duplicate-line removal.
+- "package.module:ClassName" loads any other ImprovementEngine subclass.
+
+improve_many() runs an engine over many texts. Large batches are spread over
+a process pool of IMPROVEMENT_WORKERS processes, started on first use with
+"spawn" (forking a threaded server is unsafe). Engines are constructed inside
+the workers, so they only need to be importable, not picklable.
+"""
+import importlib
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Type
+
+from app.core.config import settings
+
+
+class ImprovementEngine:
+    """Turns resume text into improved resume text. Must be pure and thread-safe."""
+
+    name = "base"
+    # False when improve() returns its input unchanged, which lets callers skip
+    # loading the content at all
+    changes_content = True
+
+    def improve(self, content: str) -> str:
+        raise NotImplementedError
+
+
+class MarkerEngine(ImprovementEngine):
+    name = "marker"
+    changes_content = False
+
+    def improve(self, content: str) -> str:
+        return content
+
+
+_BULLET_RE = re.compile(r"^[ \t]*(?:[*•·▪●‣–—]|-(?!-)|o(?=[ \t]))[ \t]*", re.M)
+_INNER_SPACE_RE = re.compile(r"(?<=\S)[ \t]{2,}")
+_TRAILING_SPACE_RE = re.compile(r"[ \t]+$", re.M)
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+# Weak opening phrases and their replacements; matched at the start of a line
+# or bullet, case-insensitively
+WEAK_VERBS: Dict[str, str] = {
+    "responsible for": "Owned",
+    "in charge of": "Led",
+    "tasked with": "Led",
+    "worked on": "Delivered",
+    "helped with": "Contributed to",
+    "assisted with": "Supported",
+    "assisted in": "Supported",
+    "was involved in": "Contributed to",
+    "involved in": "Contributed to",
+    "participated in": "Contributed to",
+    "duties included": "Delivered",
+    "handled": "Managed",
+}
+_WEAK_VERB_RE = re.compile(
+    r"^(?P<lead>[ \t]*(?:- )?)(?P<phrase>"
+    + "|".join(re.escape(phrase) for phrase in sorted(WEAK_VERBS, key=len, reverse=True))
+    + r")\b",
+    re.I | re.M,
+)
+
+
+def _replace_weak_verb(match: "re.Match") -> str:
+    return match.group("lead") + WEAK_VERBS[match.group("phrase").lower()]
+
+
+class RuleBasedEngine(ImprovementEngine):
+    name = "rules"
+
+    def improve(self, content: str) -> str:
+        text = content.replace("\r\n", "\n").replace("\r", "\n").replace("\t", " ")
+        text = _TRAILING_SPACE_RE.sub("", text)
+        text = _BULLET_RE.sub("- ", text)
+        text = _INNER_SPACE_RE.sub(" ", text)
+        text = _WEAK_VERB_RE.sub(_replace_weak_verb, text)
+
+        seen = set()
+        lines = []
+        for line in text.split("\n"):
+            key = line.strip().lower()
+            if key:
+                if key in seen:
+                    continue
+                seen.add(key)
+            lines.append(line)
+        text = _BLANK_LINES_RE.sub("\n\n", "\n".join(lines))
+        return text.strip()
+
+
+ENGINES: Dict[str, Type[ImprovementEngine]] = {
+    MarkerEngine.name: MarkerEngine,
+    RuleBasedEngine.name: RuleBasedEngine,
+}
+
+
+@lru_cache(maxsize=None)
+def load_engine(spec: str) -> ImprovementEngine:
+    if spec in ENGINES:
+        return ENGINES[spec]()
+    module_name, _, class_name = spec.partition(":")
+    if not class_name:
+        raise ValueError(f"Unknown improvement engine {spec!r}")
+    engine_class = getattr(importlib.import_module(module_name), class_name)
+    if not (isinstance(engine_class, type) and issubclass(engine_class, ImprovementEngine)):
+        raise ValueError(f"{spec!r} is not an ImprovementEngine")
+    return engine_class()
+
+
+def get_engine() -> ImprovementEngine:
+    return load_engine(settings.IMPROVEMENT_ENGINE)
+
+
+def _improve_in_worker(spec: str, contents: Sequence[str]) -> List[str]:
+    engine = load_engine(spec)
+    return [engine.improve(content) for content in contents]
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+
+
+def pool_size() -> int:
+    return settings.IMPROVEMENT_WORKERS or os.cpu_count() or 1
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool, _pool_pid
+    # A pool inherited through a fork belongs to the parent
+    if _pool is None or _pool_pid != os.getpid():
+        _pool = ProcessPoolExecutor(max_workers=pool_size(), mp_context=multiprocessing.get_context("spawn"))
+        _pool_pid = os.getpid()
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.shutdown(wait=False, cancel_futures=True)
+    _pool = None
+
+
+def improve_many(contents: Sequence[str], spec: Optional[str] = None) -> List[str]:
+    """Improve every text, in the process pool when the batch is big enough to pay for it"""
+    spec = spec or settings.IMPROVEMENT_ENGINE
+    engine = load_engine(spec)
+    if not engine.changes_content:
+        return list(contents)
+    if len(contents) < settings.IMPROVEMENT_PARALLEL_MIN_BATCH:
+        return [engine.improve(content) for content in contents]
+
+    pool = _get_pool()
+    # One task per worker-sized slice: fewer round trips than one per resume
+    slices = min(len(contents), pool_size())
+    size = -(-len(contents) // slices)
+    futures = [
+        pool.submit(_improve_in_worker, spec, contents[start:start + size])
+        for start in range(0, len(contents), size)
+    ]
+    return [improved for future in futures for improved in future.result()]
@@ -20,6 +20,9 @@ def setup_logging(
             'standard': {
                 'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
                 'datefmt': '%Y-%m-%d %H:%M:%S'
+            },
+            'message': {
+                'format': '%(message)s'
             }
         },
         'handlers': {
@@ -38,6 +41,24 @@ def setup_logging(
                 'backupCount': 5,
                 'encoding': 'utf8'
             },
+            'slow_query_file': {
+                'class': 'logging.handlers.RotatingFileHandler',
+                'level': 'INFO',
+                'formatter': 'standard',
+                'filename': 'logs/slow_queries.log',
+                'maxBytes': 10485760,  # 10MB
+                'backupCount': 5,
+                'encoding': 'utf8'
+            },
+            'trace_file': {
+                'class': 'logging.handlers.RotatingFileHandler',
+                'level': 'INFO',
+                'formatter': 'message',
+                'filename': 'logs/traces.jsonl',
+                'maxBytes': 10485760,  # 10MB
+                'backupCount': 5,
+                'encoding': 'utf8'
+            },
             'error_file': {
                 'class': 'logging.handlers.RotatingFileHandler',
                 'level': 'ERROR',
@@ -64,6 +85,16 @@ def setup_logging(
                 'handlers': ['console', 'file'],
                 'propagate': False
             },
+            'app.slow_queries': {
+                'handlers': ['slow_query_file'],
+                'level': 'INFO',
+                'propagate': False
+            },
+            'app.traces': {
+                'handlers': ['trace_file'],
+                'level': 'INFO',
+                'propagate': False
+            },
             'sqlalchemy': {
                 'level': 'WARNING',
                 'handlers': ['console', 'file'],
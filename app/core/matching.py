@@ -0,0 +1,101 @@
+"""
+Job-description matching.
+
+Resumes are tokenized when they are written (crud.resume stores term_vector()
+in resume_terms), so ranking never re-reads or re-tokenizes their content.
+rank() scores a user's resumes against a job description with Okapi BM25,
+using the user's own resumes as the corpus for document frequencies. Only the
+description's terms matter to the score, so the term-count matrix is projected
+onto them: one row per resume, one column per query term, and the whole
+ranking is a single matrix-vector product.
+"""
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+# Words, keeping the punctuation of names like c++, c#, node.js and asp.net
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9+#]+)*")
+# Single letters that are languages rather than noise
+SHORT_TERMS = frozenset({"c", "r"})
+STOPWORDS = frozenset("""
+a about above after all also an and any are as at be because been being both but by can could did do
+does doing during each etc for from further had has have having he her here hers him his how i if in
+into is it its itself just me more most my no nor not now of off on once only or other our ours out over
+own per same she should so some such than that the their theirs them then there these they this those
+through to too under until up upon us very via was we were what when where which while who whom why
+will with within without would you your yours
+able ability including join looking must plus preferred required requirements role strong well work
+working years
+""".split())
+
+# BM25 parameters: term-frequency saturation and length normalization
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    return [
+        token for token in _TOKEN_RE.findall(text.lower())
+        if token not in STOPWORDS and (len(token) > 1 or token in SHORT_TERMS) and not token.isdigit()
+    ]
+
+
+def term_vector(text: str) -> Tuple[int, Dict[str, int]]:
+    """(number of terms, count per term) of a text, as stored in resume_terms"""
+    tokens = tokenize(text)
+    return len(tokens), dict(Counter(tokens))
+
+
+@dataclass
+class Match:
+    index: int  # position of the resume in the input
+    score: float
+    matched: List[str] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)
+
+
+def rank(
+    job_description: str,
+    documents: Sequence[Tuple[int, Mapping[str, int]]],
+    keyword_limit: int = 20
+) -> List[Match]:
+    """
+    BM25 score of each (length, term counts) document against the description,
+    best first. matched and missing list the description's keywords found in
+    and absent from each document, most significant first.
+    """
+    query = Counter(tokenize(job_description))
+    if not query or not documents:
+        return []
+    terms = list(query)
+    columns = {term: column for column, term in enumerate(terms)}
+
+    counts = np.zeros((len(documents), len(terms)))
+    lengths = np.empty(len(documents))
+    for row, (length, vector) in enumerate(documents):
+        lengths[row] = length
+        for term in vector.keys() & columns.keys():
+            counts[row, columns[term]] = vector[term]
+
+    document_frequency = np.count_nonzero(counts, axis=0)
+    idf = np.log1p((len(documents) - document_frequency + 0.5) / (document_frequency + 0.5))
+    weights = idf * np.fromiter(query.values(), dtype=float, count=len(terms))
+    average_length = lengths.mean() or 1.0
+    saturation = K1 * (1 - B + B * lengths / average_length)
+    scores = (counts * (K1 + 1) / (counts + saturation[:, None])) @ weights
+
+    # Keywords in order of their weight in the description
+    keyword_order = np.argsort(-weights, kind="stable")
+    matches = []
+    for row in np.argsort(-scores, kind="stable"):
+        present = counts[row, keyword_order] > 0
+        matches.append(Match(
+            index=int(row),
+            score=round(float(scores[row]), 4),
+            matched=[terms[i] for i in keyword_order[present][:keyword_limit]],
+            missing=[terms[i] for i in keyword_order[~present][:keyword_limit]],
+        ))
+    return matches
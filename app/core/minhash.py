@@ -0,0 +1,84 @@
+"""
+Near-duplicate detection with MinHash and locality-sensitive hashing.
+
+A resume is reduced to the set of its SHINGLE_SIZE-word shingles. Its MinHash
+signature holds, for each of PERMUTATIONS random hash functions, the smallest
+hash of any shingle; the share of positions where two signatures agree
+estimates the Jaccard similarity of the two shingle sets.
+
+For lookups the signature is cut into BANDS bands of ROWS values, and each band
+is hashed into a bucket id (stored in resume_lsh_buckets). Two resumes are
+candidates when they share any bucket, which happens with probability
+1 - (1 - s**ROWS)**BANDS for similarity s: 0.1% at s = 0.3, 6% at 0.5, 61%
+at 0.7 and 95% at 0.8. Candidates are then checked against the full signatures.
+
+The parameters are baked into stored data: changing them requires
+re-indexing every resume.
+"""
+import hashlib
+import re
+import zlib
+from typing import List, Sequence
+
+import numpy as np
+
+SHINGLE_SIZE = 3
+PERMUTATIONS = 128
+BANDS = 16
+ROWS = PERMUTATIONS // BANDS
+
+# Hash functions h(x) = (a * x + b) mod PRIME, with a fixed seed so that
+# signatures computed by any process, at any time, are comparable
+_PRIME = np.uint64((1 << 31) - 1)
+_random = np.random.RandomState(20240611)
+_A = _random.randint(1, int(_PRIME), size=PERMUTATIONS).astype(np.uint64)[:, None]
+_B = _random.randint(0, int(_PRIME), size=PERMUTATIONS).astype(np.uint64)[:, None]
+# Shingles hashed per step, bounding the PERMUTATIONS x CHUNK intermediate array
+_CHUNK = 4096
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def shingles(text: str) -> List[str]:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= SHINGLE_SIZE:
+        return [" ".join(words)]
+    return list({" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)})
+
+
+def signature(text: str) -> np.ndarray:
+    """MinHash signature of a text: PERMUTATIONS uint32 values"""
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode()) for shingle in shingles(text)), dtype=np.uint64
+    ) % _PRIME
+    minimum = np.full(PERMUTATIONS, _PRIME, dtype=np.uint64)
+    for start in range(0, len(hashes), _CHUNK):
+        values = (_A * hashes[None, start:start + _CHUNK] + _B) % _PRIME
+        np.minimum(minimum, values.min(axis=1), out=minimum)
+    return minimum.astype(np.uint32)
+
+
+def to_bytes(sig: np.ndarray) -> bytes:
+    return sig.astype("<u4").tobytes()
+
+
+def from_bytes(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype="<u4")
+
+
+def buckets(sig: np.ndarray) -> List[int]:
+    """One LSH bucket id per band, as signed 64-bit integers"""
+    data = to_bytes(sig)
+    width = ROWS * 4
+    return [
+        int.from_bytes(
+            hashlib.blake2b(bytes([band]) + data[band * width:(band + 1) * width], digest_size=8).digest(),
+            "little", signed=True
+        )
+        for band in range(BANDS)
+    ]
+
+
+def similarity(sig: np.ndarray, others: Sequence[np.ndarray]) -> np.ndarray:
+    """Estimated Jaccard similarity of a signature to each of others"""
+    return (np.stack(others) == sig).mean(axis=1)
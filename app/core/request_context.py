@@ -0,0 +1,81 @@
+"""
+The ASGI scope of the request being served, visible to code far from the
+endpoint (engine events, logging) through a context variable. Starlette copies
+the context into the threadpool, so sync endpoints see it too.
+
+The middleware also opens the server span of the requests that are traced
+(see app/core/tracing.py), continuing the trace of an incoming traceparent.
+"""
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from app.core import tracing
+
+_current_scope: ContextVar[Optional[Dict[str, Any]]] = ContextVar("current_scope", default=None)
+
+
+def current_route() -> Optional[str]:
+    """"METHOD /route/{template}" of the current request, or None outside one"""
+    scope = _current_scope.get()
+    if scope is None:
+        return None
+    route = scope.get("route")
+    # The route is filled in by the router, after this middleware ran
+    path = getattr(route, "path", None) or scope.get("path")
+    return f"{scope.get('method', scope['type'].upper())} {path}"
+
+
+class RequestContextMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+        token = _current_scope.set(scope)
+        try:
+            root = None
+            if scope["type"] == "http":
+                root = tracing.start_trace(
+                    _header(scope, b"traceparent"),
+                    f"{scope['method']} {scope['path']}",
+                    {"http.request.method": scope["method"], "url.path": scope["path"]}
+                )
+            if root is None:
+                await self.app(scope, receive, send)
+            else:
+                await self._traced(root, scope, receive, send)
+        finally:
+            _current_scope.reset(token)
+
+    async def _traced(self, root: tracing.Span, scope, receive, send):
+        async def send_traced(message):
+            if message["type"] == "http.response.start":
+                root.set("http.response.status_code", message["status"])
+                # W3C Trace Context level 2: tells the caller which trace to look up
+                message = {
+                    **message,
+                    "headers": [*message.get("headers", ()), (b"traceresponse", root.traceparent.encode())]
+                }
+            await send(message)
+
+        span_token = tracing.activate(root)
+        error = None
+        try:
+            await self.app(scope, receive, send_traced)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                root.name = f"{scope['method']} {route}"
+                root.set("http.route", route)
+            tracing.end_trace(root, span_token, error)
+
+
+def _header(scope: Dict[str, Any], name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
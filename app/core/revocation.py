@@ -0,0 +1,139 @@
+"""
+Access token revocation.
+
+Revoked JWT ids live in the revoked_tokens table. Each worker mirrors them into
+a Bloom filter, topping it up from the table at most every
+TOKEN_REVOCATION_REFRESH_SECONDS, so checking a token that was never revoked
+(nearly every request) needs no database access. A filter hit is confirmed with
+one primary-key lookup and the answer kept in a small LRU of exact results,
+which also absorbs the filter's rare false positives.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.models.token import RevokedToken
+
+# Re-read rows revoked slightly before the last one seen: a row can become
+# visible after rows with a later revoked_at. revoke() stamps revoked_at just
+# before its INSERT commits, so the overlap only has to cover that commit and
+# clock skew between the hosts running workers
+REFRESH_OVERLAP = timedelta(minutes=5)
+EXACT_CACHE_SIZE = 1024
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> Iterator[int]:
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+
+class RevocationList:
+    """Per-worker view of revoked_tokens"""
+
+    def __init__(self, capacity: int, error_rate: float, refresh_seconds: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_seconds = refresh_seconds
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._exact = LRUCache(EXACT_CACHE_SIZE)
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._watermark: Optional[datetime] = None  # newest revoked_at seen
+        self._next_refresh = 0.0
+        self.db_lookups = 0
+
+    def refresh(self, db: Session, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now < self._next_refresh:
+            return
+        # Another thread is already refreshing; its result is good enough
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._next_refresh = now + self.refresh_seconds
+            # Expired rows leave stale bits behind, so start over once the
+            # filter has taken more than it was sized for
+            rebuild = not self._loaded or self._bloom.count > self.capacity
+            query = select(RevokedToken.jti, RevokedToken.revoked_at).where(
+                RevokedToken.expires_at > datetime.now(timezone.utc)
+            )
+            if not rebuild and self._watermark is not None:
+                query = query.where(RevokedToken.revoked_at >= self._watermark - REFRESH_OVERLAP)
+            rows = db.execute(query).all()
+
+            bloom = BloomFilter(self.capacity, self.error_rate) if rebuild else self._bloom
+            for jti, revoked_at in rows:
+                if jti not in bloom:
+                    bloom.add(jti)
+                if not rebuild:
+                    self._exact.set(jti, True)
+                if self._watermark is None or revoked_at > self._watermark:
+                    self._watermark = revoked_at
+            if rebuild:
+                self._exact.clear()
+                self._bloom = bloom
+                self._loaded = True
+        finally:
+            self._lock.release()
+
+    def is_revoked(self, db: Session, jti: str) -> bool:
+        self.refresh(db)
+        if jti not in self._bloom:
+            return False
+        known = self._exact.get(jti)
+        if known is not None:
+            return known
+        self.db_lookups += 1
+        revoked = db.scalar(select(RevokedToken.jti).where(RevokedToken.jti == jti)) is not None
+        self._exact.set(jti, revoked)
+        return revoked
+
+    def revoke(self, db: Session, jti: str, expires_at: datetime) -> None:
+        """Record a revocation (idempotent) and purge rows for tokens that have expired since"""
+        now = datetime.now(timezone.utc)
+        try:
+            # Not the server default: now() is when the transaction began, which
+            # for a request's session can be long before this commit
+            db.add(RevokedToken(jti=jti, expires_at=expires_at, revoked_at=datetime.now(timezone.utc)))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+        db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+        db.commit()
+        # Effective in this worker at once; others see it on their next refresh
+        self._bloom.add(jti)
+        self._exact.set(jti, True)
+
+
+revocation_list = RevocationList(
+    capacity=settings.TOKEN_REVOCATION_BLOOM_CAPACITY,
+    error_rate=settings.TOKEN_REVOCATION_BLOOM_ERROR_RATE,
+    refresh_seconds=settings.TOKEN_REVOCATION_REFRESH_SECONDS,
+)
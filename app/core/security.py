@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Optional, Union, Dict, Any
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -7,9 +7,15 @@ from fastapi.security import OAuth2PasswordBearer, HTTPBearer, HTTPAuthorization
 from starlette.authentication import AuthCredentials, AuthenticationBackend, AuthenticationError, SimpleUser
 from sqlalchemy.orm import Session
 import os
+import uuid
 from dotenv import load_dotenv
 
 from app.db.base import get_db
+from app.db.sharding import shard_router
+from app.core.config import settings
+from app.core.revocation import revocation_list
+from app.core.tracing import span, traced
+from app.db import statements
 from app.models.user import User
 from app.schemas.user import TokenData, UserInDB
 
@@ -19,7 +25,15 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min/max pinned to the configured cost so needs_update() flags hashes made
+# with any other cost, in either direction
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 security = HTTPBearer()
 
@@ -29,16 +43,44 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    return pwd_context.needs_update(hashed_password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    # jti identifies the token so it can be revoked before it expires
+    to_encode.update({"exp": expire, "jti": to_encode.get("jti") or uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+@traced("auth.revocation_check")
+def is_token_revoked(db: Session, payload: Dict[str, Any]) -> bool:
+    """Tokens issued before jti was added can't be revoked and stay valid until they expire"""
+    jti = payload.get("jti")
+    if not jti:
+        return False
+    # Revocations are kept in the directory database, whichever shard db is on
+    with shard_router.on_directory(db) as directory:
+        return revocation_list.is_revoked(directory, jti)
+
+def revoke_token(db: Session, token: str) -> bool:
+    """Revoke a still-valid token; returns False if it was invalid, expired or has no jti"""
+    if token.startswith("Bearer "):
+        token = token.split("Bearer ")[1]
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return False
+    if not payload.get("jti") or not payload.get("exp"):
+        return False
+    with shard_router.on_directory(db) as directory:
+        revocation_list.revoke(directory, payload["jti"], datetime.fromtimestamp(payload["exp"], tz=timezone.utc))
+    return True
+
 async def get_current_user(
     request: Request,
     db: Session = Depends(get_db)
@@ -69,19 +111,24 @@ async def get_current_user(
         print(f"Token received: {token}")
         
         # Decode the token
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        with span("auth.jwt_decode"):
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         print(f"Decoded payload: {payload}")
         
         email: str = payload.get("sub")
         if email is None:
             print("No email in token")
             raise credentials_exception
+
+        if is_token_revoked(db, payload):
+            raise credentials_exception
             
         token_data = TokenData(email=email)
         print(f"Token data: {token_data}")
         
         # Query the database for the user
-        user = db.query(User).filter(User.email == token_data.email).first()
+        with span("auth.user_lookup"):
+            user = db.scalars(statements.USER_BY_EMAIL, {"email": token_data.email}).first()
         print(f"User from DB: {user}")
         
         if user is None:
@@ -93,6 +140,8 @@ async def get_current_user(
     except JWTError as e:
         print(f"JWT Error: {str(e)}")
         raise credentials_exception
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Unexpected error in get_current_user: {str(e)}")
         raise HTTPException(
@@ -116,15 +165,19 @@ async def get_current_user_from_token(
     
     token = credentials.credentials
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        with span("auth.jwt_decode"):
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
         token_data = TokenData(email=email)
     except JWTError:
         raise credentials_exception
+    if is_token_revoked(db, payload):
+        raise credentials_exception
     
-    user = db.query(User).filter(User.email == token_data.email).first()
+    with span("auth.user_lookup"):
+        user = db.scalars(statements.USER_BY_EMAIL, {"email": token_data.email}).first()
     if user is None:
         raise credentials_exception
         
@@ -135,6 +188,12 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+async def get_current_admin_user(current_user: User = Depends(get_current_active_user)) -> User:
+    admins = {email.strip().lower() for email in settings.ADMIN_EMAILS.split(",") if email.strip()}
+    if current_user.email.lower() not in admins:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
+
 
 class JWTAuthBackend(AuthenticationBackend):
     async def authenticate(self, request):
@@ -147,13 +206,23 @@ class JWTAuthBackend(AuthenticationBackend):
             if scheme.lower() != 'bearer':
                 return None
                 
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            with span("auth.jwt_decode"):
+                payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
             email = payload.get("sub")
             if email is None:
                 return None
                 
-            db = next(get_db())
-            user = db.query(User).filter(User.email == email).first()
+            # Closed here: an unfinished get_db() generator keeps its
+            # connection checked out until garbage collection
+            sessions = get_db()
+            db = next(sessions)
+            try:
+                if is_token_revoked(db, payload):
+                    return None
+                with span("auth.user_lookup"):
+                    user = db.scalars(statements.USER_BY_EMAIL, {"email": email}).first()
+            finally:
+                sessions.close()
             if user is None:
                 return None
                 
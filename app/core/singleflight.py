@@ -0,0 +1,99 @@
+"""
+Coalescing of identical concurrent reads.
+
+Page loads and open tabs often ask for the same resume, or the same list, at
+the same moment. SingleFlight.do() lets the first of them (the leader) run the
+read and serialize the response while identical requests arriving meanwhile
+wait and share its result, or its exception. Nothing is kept once the leader
+finishes: this is not a cache, and it is per worker.
+
+Keys start with the user id. A write calls forget(user_id) after committing,
+so requests issued after the write start a fresh read instead of joining one
+that began before it.
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.followers = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.collapsed = 0
+        self.max_followers = 0
+
+    def do(
+        self,
+        key: Tuple,
+        fn: Callable[[], Any],
+        before_wait: Optional[Callable[[], None]] = None
+    ) -> Tuple[Any, bool]:
+        """
+        (fn's result, whether it came from another request's call). before_wait
+        runs when this call is about to wait for another, to release what the
+        caller holds (such as its database connection) in the meantime.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                call.followers += 1
+                self.collapsed += 1
+                self.max_followers = max(self.max_followers, call.followers)
+        if not leader:
+            if before_wait is not None:
+                before_wait()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def forget(self, user_id: int) -> None:
+        """Let later requests of this user start their own calls"""
+        with self._lock:
+            for key in [key for key in self._calls if key[0] == user_id]:
+                del self._calls[key]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.executed + self.collapsed
+            return {
+                "in_flight": len(self._calls),
+                "executed": self.executed,
+                "collapsed": self.collapsed,
+                "collapsed_ratio": round(self.collapsed / total, 4) if total else 0.0,
+                "max_followers": self.max_followers,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self.executed = self.collapsed = self.max_followers = 0
+
+
+resume_reads = SingleFlight()
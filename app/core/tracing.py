@@ -0,0 +1,263 @@
+"""
+Request tracing.
+
+RequestContextMiddleware decides when a request arrives whether it is traced
+(head sampling): an incoming W3C traceparent header that carries a decision is
+followed and the request joins that trace; otherwise TRACE_SAMPLE_RATE of
+requests start a new one. Either way at most TRACE_MAX_PER_SECOND requests per
+worker are traced, whatever the clients ask for.
+
+Inside a traced request, span() and @traced time the stages below the server
+span (token decoding, crud calls, template rendering, serialization). Outside
+one they cost a ContextVar lookup. Spans opened in the threadpool nest
+correctly, as Starlette copies the context there.
+
+A finished trace is written as one line of OTLP/JSON (an
+ExportTraceServiceRequest, the format of the OpenTelemetry Collector's file
+exporter and otlpjsonfile receiver) through the "app.traces" logger, to the
+rotating logs/traces.jsonl.
+"""
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import jinja2
+
+from app.core.config import settings
+
+logger = logging.getLogger("app.traces")
+
+_TRACEPARENT_RE = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_INVALID_TRACE_ID = "0" * 32
+_INVALID_SPAN_ID = "0" * 16
+
+# OTLP enums
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+STATUS_ERROR = 2
+
+
+class _Trace:
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        # Finished spans; appended to from the event loop and threadpool alike
+        self.spans: List["Span"] = []
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "start", "end", "attributes", "error")
+
+    def __init__(
+        self,
+        trace: _Trace,
+        name: str,
+        parent_id: Optional[str] = None,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None
+    ):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+        self.start = time.time_ns()
+        self.end = 0
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace.trace_id}-{self.span_id}-01"
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self.end = time.time_ns()
+        self.trace.spans.append(self)
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Sampler:
+    """Head sampling: follows the caller's decision, else samples rate, and never more than max_per_second"""
+
+    def __init__(self, rate: float, max_per_second: float):
+        self.rate = rate
+        self.max_per_second = max_per_second
+        self._allowance = max_per_second
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def sample(self, parent_sampled: Optional[bool] = None) -> bool:
+        if parent_sampled is False or self.max_per_second <= 0:
+            return False
+        if parent_sampled is None and random.random() >= self.rate:
+            return False
+        # Token bucket holding up to one second's worth of traces
+        with self._lock:
+            now = time.monotonic()
+            self._allowance = min(
+                self.max_per_second, self._allowance + (now - self._last) * self.max_per_second
+            )
+            self._last = now
+            if self._allowance < 1:
+                return False
+            self._allowance -= 1
+            return True
+
+
+sampler = Sampler(settings.TRACE_SAMPLE_RATE, settings.TRACE_MAX_PER_SECOND)
+
+
+def start_trace(traceparent: Optional[str], name: str, attributes: Dict[str, Any]) -> Optional[Span]:
+    """The server span of a request, or None when it is not sampled"""
+    trace_id = parent_id = None
+    parent_sampled = None
+    match = _TRACEPARENT_RE.match(traceparent.strip().lower()) if traceparent else None
+    if match and match.group(1) != _INVALID_TRACE_ID and match.group(2) != _INVALID_SPAN_ID:
+        trace_id, parent_id = match.group(1), match.group(2)
+        parent_sampled = bool(int(match.group(3), 16) & 1)
+    if not sampler.sample(parent_sampled):
+        return None
+    return Span(_Trace(trace_id or os.urandom(16).hex()), name, parent_id, SPAN_KIND_SERVER, attributes)
+
+
+def activate(span: Span) -> Token:
+    return _current_span.set(span)
+
+
+def end_trace(root: Span, token: Token, error: Optional[BaseException] = None) -> None:
+    """Finish the server span and export the trace"""
+    _current_span.reset(token)
+    root.finish(error)
+    try:
+        logger.info(json.dumps(_otlp(root.trace.spans), separators=(",", ":")))
+    except Exception:
+        logging.getLogger(__name__).exception("Could not export trace %s", root.trace.trace_id)
+
+
+def start_span(name: str, **attributes: Any) -> Optional[Span]:
+    """
+    A child of the current span that is not made current, for work that can't
+    be wrapped in span() (a generator consumed across threads); call finish()
+    on it. None outside a traced request.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    return Span(parent.trace, name, parent.span_id, attributes=attributes)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Time the enclosed block as a child of the current span, if the request is traced"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace, name, parent.span_id, attributes=attributes)
+    token = _current_span.set(child)
+    error = None
+    try:
+        yield child
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current_span.reset(token)
+        child.finish(error)
+
+
+def traced(name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """Decorator: each call is a span, named after the function ("crud.resume.get_resume") by default"""
+    def decorate(fn: Callable) -> Callable:
+        span_name = name or f"{fn.__module__.removeprefix('app.')}.{fn.__qualname__}"
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if _current_span.get() is None:
+                    return await fn(*args, **kwargs)
+                with span(span_name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return fn(*args, **kwargs)
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class TracedTemplate(jinja2.Template):
+    """Jinja template class that times render(), as used by TemplateResponse"""
+
+    def render(self, *args: Any, **kwargs: Any) -> str:
+        if _current_span.get() is None:
+            return super().render(*args, **kwargs)
+        with span("template.render", **{"template.name": self.name}):
+            return super().render(*args, **kwargs)
+
+
+def trace_templates(env: jinja2.Environment) -> None:
+    env.template_class = TracedTemplate
+
+
+def _value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _value(value)} for key, value in attributes.items() if value is not None]
+
+
+def _otlp(spans: List[Span]) -> Dict[str, Any]:
+    encoded = []
+    for s in spans:
+        item = {
+            "traceId": s.trace.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": s.kind,
+            "startTimeUnixNano": str(s.start),
+            "endTimeUnixNano": str(s.end),
+            "attributes": _attributes(s.attributes),
+        }
+        if s.parent_id:
+            item["parentSpanId"] = s.parent_id
+        if s.error:
+            item["status"] = {"code": STATUS_ERROR, "message": s.error}
+        encoded.append(item)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _attributes({
+                "service.name": settings.PROJECT_NAME,
+                "process.pid": os.getpid(),
+            })},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": encoded}],
+        }]
+    }
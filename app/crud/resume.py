@@ -1,12 +1,109 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import Text, bindparam, delete, func, insert, literal, or_, select, text, update
+from sqlalchemy.orm import Session, defer
 from fastapi import HTTPException, status
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Sequence
 from datetime import datetime
-from ..models.resume import Resume, ResumeHistory
+from ..core.config import settings
+from ..core.events import publish_resume_change
+from ..core.improvement import get_engine, improve_many
+from ..core import minhash
+from ..core.matching import rank, term_vector
+from ..core.singleflight import resume_reads
+from ..core.tracing import traced
+from ..db import statements
+from ..db.history_buffer import buffering, history_buffer, relax_commit
+from ..models.resume import (
+    Resume, ResumeHistory, ResumeHistoryArchive, ResumeLSHBucket, ResumeSignature, ResumeTerms
+)
 from ..schemas.resume import ResumeCreate, ResumeUpdate, ResumeImprove
+from .stats import bump_user_stats
 
-def get_resume(db: Session, resume_id: int, user_id: int) -> Optional[Resume]:
-    resume = db.query(Resume).filter(Resume.id == resume_id, Resume.user_id == user_id).first()
+IMPROVED_SUFFIX = " [Improved]"
+
+# Fields a list request may select with ?fields=
+RESUME_FIELDS = (
+    "id", "user_id", "title", "content", "created_at", "updated_at",
+    "version", "content_length", "snippet"
+)
+SUMMARY_FIELDS = ("id", "title", "created_at", "updated_at", "content_length", "snippet")
+
+def _announce(db: Session, resume: Resume, change: str) -> None:
+    # Reads started before this change must not be shared with later requests
+    resume_reads.forget(resume.user_id)
+    publish_resume_change(
+        db, change,
+        user_id=resume.user_id,
+        resume_id=resume.id,
+        version=resume.version,
+        updated_at=resume.updated_at or resume.created_at
+    )
+
+def _add_history(db: Session, **values: Any) -> List[Dict[str, Any]]:
+    """
+    Add a history row to the edit's transaction or, with the write-behind
+    buffer on, return it for _queue_history() once the edit has committed.
+    """
+    if not buffering():
+        db.add(ResumeHistory(**values))
+        return []
+    values.setdefault("improved_content", None)
+    values.setdefault("created_at", datetime.utcnow())
+    return [values]
+
+def _queue_history(db: Session, rows: List[Dict[str, Any]]) -> None:
+    for row in rows:
+        history_buffer.add(db, row)
+
+@traced()
+def index_content(db: Session, user_id: int, resumes: Sequence[tuple]) -> None:
+    """
+    Store what is derived from the content of a user's (id, version, content)
+    triples, in the caller's transaction: term counts for job matching and the
+    MinHash signature and LSH buckets for duplicate detection.
+    """
+    # Lock the resumes, in id order, so that concurrent indexers of a resume
+    # (the startup job in every worker, lookups finding it stale) queue up
+    # instead of colliding on the primary keys of the rows they replace. A
+    # triple older than the locked row was read before an edit committed, and
+    # that edit has indexed the newer content itself
+    current = dict(db.execute(
+        select(Resume.id, Resume.version)
+        .where(Resume.id.in_([resume_id for resume_id, _, _ in resumes]))
+        .order_by(Resume.id)
+        .with_for_update()
+    ).all())
+    resumes = [
+        (resume_id, version, content) for resume_id, version, content in resumes
+        if resume_id in current and version >= current[resume_id]
+    ]
+    if not resumes:
+        return
+    resume_ids = [resume_id for resume_id, _, _ in resumes]
+    for model in (ResumeTerms, ResumeSignature, ResumeLSHBucket):
+        db.execute(
+            delete(model)
+            .where(model.resume_id.in_(resume_ids))
+            .execution_options(synchronize_session=False)
+        )
+    terms, signatures, buckets = [], [], []
+    for resume_id, version, content in resumes:
+        length, counts = term_vector(content)
+        terms.append({"resume_id": resume_id, "version": version, "length": length, "terms": counts})
+        sig = minhash.signature(content)
+        signatures.append({"resume_id": resume_id, "version": version, "signature": minhash.to_bytes(sig)})
+        # Bands can collide into the same bucket
+        buckets.extend(
+            {"user_id": user_id, "bucket": bucket, "resume_id": resume_id} for bucket in set(minhash.buckets(sig))
+        )
+    db.execute(insert(ResumeTerms), terms)
+    db.execute(insert(ResumeSignature), signatures)
+    db.execute(insert(ResumeLSHBucket), buckets)
+
+@traced()
+def get_resume(db: Session, resume_id: int, user_id: int, for_update: bool = False) -> Optional[Resume]:
+    """The user's resume, or a 404; for_update locks its row until the transaction ends"""
+    stmt = statements.RESUME_BY_OWNER_FOR_UPDATE if for_update else statements.RESUME_BY_OWNER
+    resume = db.scalars(stmt, {"resume_id": resume_id, "user_id": user_id}).first()
     if not resume:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -14,9 +111,45 @@ def get_resume(db: Session, resume_id: int, user_id: int) -> Optional[Resume]:
         )
     return resume
 
-def get_resumes(db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[Resume]:
-    return db.query(Resume).filter(Resume.user_id == user_id).offset(skip).limit(limit).all()
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Turn a ?fields= value into a list of Resume attributes: "summary" or a comma
+    separated subset of RESUME_FIELDS. None means the full resume.
+    """
+    if not fields:
+        return None
+    if fields == "summary":
+        return list(SUMMARY_FIELDS)
+    selected = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in selected if f not in RESUME_FIELDS]
+    if unknown or not selected:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}. Choose from: summary, {', '.join(RESUME_FIELDS)}"
+        )
+    return selected
 
+@traced()
+def get_resumes(
+    db: Session,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    fields: Optional[Sequence[str]] = None
+) -> List[Resume]:
+    """
+    With fields, only those columns are loaded; touching any other attribute of
+    the returned resumes raises instead of silently fetching it row by row.
+    """
+    stmt = statements.RESUMES_BY_USER if fields is None else statements.resumes_by_user_fields(tuple(fields))
+    return db.scalars(stmt, {"user_id": user_id, "skip": skip, "limit": limit}).all()
+
+@traced()
+def get_recent_resumes(db: Session, user_id: int, limit: int) -> List[Resume]:
+    """The user's most recently updated resumes, summary fields only"""
+    return db.scalars(statements.RECENT_RESUMES, {"user_id": user_id, "limit": limit}).all()
+
+@traced()
 def create_resume(db: Session, resume: ResumeCreate, user_id: int) -> Resume:
     db_resume = Resume(**resume.dict(), user_id=user_id)
     db.add(db_resume)
@@ -24,89 +157,441 @@ def create_resume(db: Session, resume: ResumeCreate, user_id: int) -> Resume:
     db.refresh(db_resume)
     
     # Create history entry
-    history_entry = ResumeHistory(
-        resume_id=db_resume.id,
-        content=resume.content
-    )
-    db.add(history_entry)
+    history = _add_history(db, resume_id=db_resume.id, content=resume.content)
+    index_content(db, user_id, [(db_resume.id, db_resume.version, db_resume.content)])
+    bump_user_stats(db, user_id, resumes=1, history=1)
+    relax_commit(db)
     db.commit()
+    _queue_history(db, history)
+    db.refresh(db_resume)
+    _announce(db, db_resume, "created")
     
     return db_resume
 
+def _capture_edit_in_db(
+    db: Session,
+    resume_id: int,
+    user_id: int,
+    title: Optional[str] = None,
+    content: Optional[str] = None,
+    suffix: Optional[str] = None
+) -> Resume:
+    """
+    Apply an edit and snapshot the previous content into resume_history without
+    loading the old text into the application. On PostgreSQL this is a single
+    call to resume_capture_edit(); elsewhere an INSERT ... SELECT followed by an
+    UPDATE ... RETURNING on the same connection.
+    """
+    if db.bind.dialect.name == "postgresql":
+        stmt = select(Resume).from_statement(
+            text("SELECT * FROM resume_capture_edit(:resume_id, :user_id, :title, :content, :suffix)")
+        ).params(resume_id=resume_id, user_id=user_id, title=title, content=content, suffix=suffix)
+    else:
+        if content is not None:
+            new_content = literal(content + (suffix or ""), Text)
+        elif suffix:
+            new_content = Resume.content + suffix
+        else:
+            new_content = Resume.content
+        if content is not None or suffix:
+            db.execute(
+                insert(ResumeHistory).from_select(
+                    ["resume_id", "content", "improved_content", "created_at"],
+                    select(Resume.id, Resume.content, new_content, func.now())
+                    .where(Resume.id == resume_id, Resume.user_id == user_id)
+                )
+            )
+        values = {"content": new_content, "version": Resume.version + 1}
+        if title is not None:
+            values["title"] = title
+        stmt = (
+            update(Resume)
+            .where(Resume.id == resume_id, Resume.user_id == user_id)
+            .values(**values)
+            .returning(Resume)
+            .execution_options(synchronize_session=False)
+        )
+
+    db_resume = db.execute(
+        stmt.execution_options(populate_existing=True)
+    ).scalar_one_or_none()
+    if not db_resume:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Resume not found"
+        )
+
+    if content is not None or suffix:
+        index_content(db, user_id, [(db_resume.id, db_resume.version, db_resume.content)])
+    bump_user_stats(
+        db, user_id,
+        history=1 if content is not None or suffix else 0,
+        improvements=1 if suffix else 0
+    )
+    # Keep the RETURNING values loaded instead of re-selecting them after commit
+    db.expunge(db_resume)
+    relax_commit(db)
+    db.commit()
+    _announce(db, db_resume, "improved" if suffix else "updated")
+    return db_resume
+
+@traced()
 def update_resume(
     db: Session, 
     resume_id: int, 
     resume_update: ResumeUpdate, 
     user_id: int
 ) -> Resume:
-    db_resume = get_resume(db, resume_id, user_id)
-    
     update_data = resume_update.dict(exclude_unset=True)
+
+    if settings.HISTORY_CAPTURE_MODE == "database":
+        return _capture_edit_in_db(
+            db, resume_id, user_id,
+            title=update_data.get('title'),
+            content=update_data.get('content')
+        )
+
+    db_resume = get_resume(db, resume_id, user_id)
     
     # Create history entry before updating
+    history = []
     if 'content' in update_data:
-        history_entry = ResumeHistory(
+        history = _add_history(
+            db,
             resume_id=resume_id,
             content=db_resume.content,
             improved_content=update_data.get('content'),
             created_at=datetime.utcnow()
         )
-        db.add(history_entry)
     
     # Update the resume
     for field, value in update_data.items():
         setattr(db_resume, field, value)
+    db_resume.version = Resume.version + 1
+    if 'content' in update_data:
+        db.flush()
+        index_content(db, user_id, [(db_resume.id, db_resume.version, db_resume.content)])
+    bump_user_stats(db, user_id, history=1 if 'content' in update_data else 0)
     
+    relax_commit(db)
     db.commit()
+    _queue_history(db, history)
     db.refresh(db_resume)
+    _announce(db, db_resume, "updated")
     return db_resume
 
-def delete_resume(db: Session, resume_id: int, user_id: int) -> None:
+@traced()
+def delete_resume(db: Session, resume_id: int, user_id: int) -> bool:
+    """
+    Delete a resume and its history. History rows go through ON DELETE CASCADE;
+    past RESUME_PURGE_ASYNC_THRESHOLD versions the resume is only detached from
+    its owner and True is returned: the caller should schedule
+    purge_detached_resumes() to remove it, which also takes the stored history
+    off the owner's stats.
+    """
     db_resume = get_resume(db, resume_id, user_id)
-    db.delete(db_resume)
+    discarded = history_buffer.discard(db, resume_id)
+    stored = select(ResumeHistory.id).where(ResumeHistory.resume_id == resume_id)
+    threshold = settings.RESUME_PURGE_ASYNC_THRESHOLD
+    if threshold:
+        # Only tell whether there are more than threshold rows, without
+        # counting all of a very long history
+        stored = stored.limit(threshold + 1)
+    history_count = db.scalar(select(func.count()).select_from(stored.subquery()))
+    deferred = bool(threshold) and history_count > threshold
+    if deferred:
+        db_resume.user_id = None
+        db_resume.detached_user_id = user_id
+        history_count = 0
+    else:
+        if db.bind.dialect.name == "sqlite":
+            # SQLite only honours ON DELETE CASCADE with PRAGMA foreign_keys=ON
+            delete_dependants(db, resume_id)
+        db.delete(db_resume)
+    bump_user_stats(db, user_id, resumes=-1, history=-(discarded + history_count), edited=False)
     db.commit()
+    resume_reads.forget(user_id)
+    publish_resume_change(db, "deleted", user_id=user_id, resume_id=resume_id)
+    return deferred
 
+def delete_dependants(db: Session, resume_id: int) -> None:
+    """Explicit version of the ON DELETE CASCADE from resumes, for SQLite"""
+    for model in (ResumeHistory, ResumeHistoryArchive, ResumeTerms, ResumeSignature, ResumeLSHBucket):
+        db.execute(
+            delete(model)
+            .where(model.resume_id == resume_id)
+            .execution_options(synchronize_session=False)
+        )
+
+@traced()
 def improve_resume(
     db: Session, 
     resume_id: int, 
     user_id: int
 ) -> Resume:
-    db_resume = get_resume(db, resume_id, user_id)
+    engine = get_engine()
+    if settings.HISTORY_CAPTURE_MODE == "database":
+        if not engine.changes_content:
+            return _capture_edit_in_db(db, resume_id, user_id, suffix=IMPROVED_SUFFIX)
+        # Locked so a concurrent edit can't land between reading and overwriting the content
+        original_content = get_resume(db, resume_id, user_id, for_update=True).content
+        return _capture_edit_in_db(
+            db, resume_id, user_id,
+            content=engine.improve(original_content),
+            suffix=IMPROVED_SUFFIX
+        )
+
+    db_resume = get_resume(db, resume_id, user_id, for_update=True)
     
     original_content = db_resume.content
-    improved_content = f"{original_content} [Improved]"
+    improved_content = f"{engine.improve(original_content)}{IMPROVED_SUFFIX}"
     
     # Save current version to history
-    history_entry = ResumeHistory(
+    history = _add_history(
+        db,
         resume_id=resume_id,
         content=original_content,
         improved_content=improved_content,
         created_at=datetime.utcnow()
     )
-    db.add(history_entry)
     
     # Update resume with improved content
     db_resume.content = improved_content
+    db_resume.version = Resume.version + 1
+    db.flush()
+    index_content(db, user_id, [(db_resume.id, db_resume.version, improved_content)])
+    bump_user_stats(db, user_id, history=1, improvements=1)
+    relax_commit(db)
     db.commit()
+    _queue_history(db, history)
     db.refresh(db_resume)
+    _announce(db, db_resume, "improved")
     
     return db_resume
 
+@traced()
+def improve_resumes(db: Session, resume_ids: Sequence[int], user_id: int) -> Dict[str, Any]:
+    """
+    Improve many of a user's resumes at once: the engine runs over all of them
+    (in the process pool for big batches) and every history row and content
+    update is written in a single transaction. Ids that are not the user's
+    resumes are reported in "missing" rather than failing the batch.
+    """
+    resume_ids = list(dict.fromkeys(resume_ids))
+    if len(resume_ids) > settings.IMPROVE_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.IMPROVE_BATCH_MAX_SIZE} resumes can be improved at once"
+        )
+
+    # Locked so a concurrent edit can't land between reading and overwriting the content
+    rows = db.execute(
+        select(Resume.id, Resume.content, Resume.version)
+        .where(Resume.id.in_(resume_ids), Resume.user_id == user_id)
+        .order_by(Resume.id)
+        .with_for_update()
+    ).all()
+    originals = {row.id: row.content for row in rows}
+    versions = {row.id: row.version for row in rows}
+    found = [resume_id for resume_id in resume_ids if resume_id in originals]
+    missing = [resume_id for resume_id in resume_ids if resume_id not in originals]
+    if not found:
+        db.rollback()
+        return {"improved": [], "missing": missing}
+
+    improved = {
+        resume_id: f"{content}{IMPROVED_SUFFIX}"
+        for resume_id, content in zip(found, improve_many([originals[resume_id] for resume_id in found]))
+    }
+    now = datetime.utcnow()
+    db.execute(insert(ResumeHistory), [
+        {
+            "resume_id": resume_id,
+            "content": originals[resume_id],
+            "improved_content": improved[resume_id],
+            "created_at": now,
+        }
+        for resume_id in found
+    ])
+    resumes = Resume.__table__
+    db.connection().execute(
+        update(resumes)
+        .where(resumes.c.id == bindparam("b_id"))
+        .values(content=bindparam("b_content"), version=resumes.c.version + 1),
+        [{"b_id": resume_id, "b_content": improved[resume_id]} for resume_id in found]
+    )
+    index_content(db, user_id, [(resume_id, versions[resume_id] + 1, improved[resume_id]) for resume_id in found])
+    bump_user_stats(db, user_id, history=len(found), improvements=len(found))
+    relax_commit(db)
+    db.commit()
+
+    db_resumes = {
+        resume.id: resume
+        for resume in db.scalars(
+            select(Resume)
+            .where(Resume.id.in_(found))
+            .execution_options(populate_existing=True)
+        )
+    }
+    for resume_id in found:
+        _announce(db, db_resumes[resume_id], "improved")
+    return {"improved": [db_resumes[resume_id] for resume_id in found], "missing": missing}
+
+@traced()
+def match_resumes(db: Session, user_id: int, job_description: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    The user's resumes that best fit a job description, best first, with the
+    description's keywords each one has and lacks. Uses the stored term counts;
+    resumes whose counts are missing or outdated are indexed first.
+    """
+    rows = db.execute(
+        select(
+            Resume.id, Resume.title, Resume.version,
+            ResumeTerms.version.label("indexed_version"), ResumeTerms.length, ResumeTerms.terms
+        )
+        .outerjoin(ResumeTerms, ResumeTerms.resume_id == Resume.id)
+        .where(Resume.user_id == user_id)
+        .order_by(Resume.id)
+    ).all()
+    documents = {row.id: (row.length, row.terms) for row in rows if row.indexed_version == row.version}
+
+    stale = [row.id for row in rows if row.id not in documents]
+    if stale:
+        outdated = db.execute(
+            select(Resume.id, Resume.version, Resume.content).where(Resume.id.in_(stale))
+        ).all()
+        index_content(db, user_id, [tuple(row) for row in outdated])
+        db.commit()
+        for resume_id, _, content in outdated:
+            documents[resume_id] = term_vector(content)
+
+    rows = [row for row in rows if row.id in documents]
+    matches = rank(
+        job_description,
+        [documents[row.id] for row in rows],
+        keyword_limit=settings.MATCH_KEYWORD_LIMIT
+    )
+    return [
+        {
+            "id": rows[match.index].id,
+            "title": rows[match.index].title,
+            "score": match.score,
+            "matched_keywords": match.matched,
+            "missing_keywords": match.missing,
+        }
+        for match in matches[:limit]
+    ]
+
+@traced()
+def find_similar_resumes(
+    db: Session,
+    resume_id: int,
+    user_id: int,
+    min_similarity: float = 0.7,
+    limit: int = 10
+) -> List[Dict[str, Any]]:
+    """
+    The user's other resumes whose estimated similarity to resume_id is at
+    least min_similarity, most similar first. Candidates come from the user's
+    LSH buckets (see app/core/minhash.py), so the cost depends on how many
+    resumes are alike, not on how many the user or anyone else has. Only the
+    target's own signature is refreshed here when stale.
+    """
+    resume = get_resume(db, resume_id, user_id)
+    stored = db.execute(
+        select(ResumeSignature.version, ResumeSignature.signature).where(ResumeSignature.resume_id == resume_id)
+    ).first()
+    if stored is None or stored.version != resume.version:
+        # Only the target is checked here; other resumes from before signatures
+        # existed, or written behind the crud's back, are indexed by
+        # app/jobs/content_index.py and missed as candidates until then
+        index_content(db, user_id, [(resume.id, resume.version, resume.content)])
+        db.commit()
+        sig = minhash.signature(resume.content)
+    else:
+        sig = minhash.from_bytes(stored.signature)
+
+    # One primary key range per band: (user_id, bucket) never reaches other users' resumes
+    candidates = (
+        select(ResumeLSHBucket.resume_id)
+        .where(
+            ResumeLSHBucket.user_id == user_id,
+            ResumeLSHBucket.bucket.in_(set(minhash.buckets(sig))),
+            ResumeLSHBucket.resume_id != resume_id
+        )
+        .distinct()
+        .scalar_subquery()
+    )
+    rows = db.execute(
+        select(Resume.id, Resume.title, ResumeSignature.signature)
+        .join(ResumeSignature, ResumeSignature.resume_id == Resume.id)
+        .where(Resume.id.in_(candidates), Resume.user_id == user_id)
+    ).all()
+    if not rows:
+        return []
+
+    scores = minhash.similarity(sig, [minhash.from_bytes(row.signature) for row in rows])
+    similar = sorted(
+        (
+            {"id": row.id, "title": row.title, "similarity": round(float(score), 3)}
+            for row, score in zip(rows, scores) if score >= min_similarity
+        ),
+        key=lambda resume: (-resume["similarity"], resume["id"])
+    )
+    return similar[:limit]
+
+@traced()
 def get_resume_history(
     db: Session, 
     resume_id: int, 
     user_id: int,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    with_content: bool = True
 ) -> List[ResumeHistory]:
     # Verify the resume belongs to the user
     resume = get_resume(db, resume_id, user_id)
     if not resume:
         return []
     
-    return (db.query(ResumeHistory)
-             .filter(ResumeHistory.resume_id == resume_id)
-             .order_by(ResumeHistory.created_at.desc())
-             .offset(skip)
-             .limit(limit)
-             .all())
+    stmt = statements.HISTORY_BY_RESUME if with_content else statements.HISTORY_METADATA_BY_RESUME
+    return history_buffer.read_page(
+        db, resume_id, skip, limit,
+        lambda skip, limit: db.scalars(stmt, {"resume_id": resume_id, "skip": skip, "limit": limit}).all()
+    )
+
+@traced()
+def get_resume_history_page(
+    db: Session,
+    resume_id: int,
+    before: Optional[int] = None,
+    limit: int = 10
+) -> List[ResumeHistory]:
+    """
+    Version metadata (no content), newest first, starting after the version with
+    id `before`. Keyset pagination on (created_at, id), so deep pages cost the
+    same as the first. Ownership must already have been checked by the caller.
+    The first page also starts with every version still in the write-behind
+    buffer, on top of limit stored ones; those have no id.
+    """
+    query = (
+        select(ResumeHistory)
+        .options(defer(ResumeHistory.content), defer(ResumeHistory.improved_content))
+        .where(ResumeHistory.resume_id == resume_id)
+    )
+    if before is not None:
+        cursor = db.scalar(
+            select(ResumeHistory.created_at)
+            .where(ResumeHistory.id == before, ResumeHistory.resume_id == resume_id)
+        )
+        if cursor is None:
+            return []
+        query = query.where(or_(
+            ResumeHistory.created_at < cursor,
+            (ResumeHistory.created_at == cursor) & (ResumeHistory.id < before)
+        ))
+    query = query.order_by(ResumeHistory.created_at.desc(), ResumeHistory.id.desc()).limit(limit)
+    if before is not None:
+        return db.scalars(query).all()
+    return history_buffer.read(db, resume_id, lambda queued: queued + db.scalars(query).all())
@@ -1,10 +1,23 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from sqlalchemy.orm import Session
+from fastapi import HTTPException, status
 from datetime import datetime
 
-from app.models.resume import ResumeHistory
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.diff import diff_texts
+from app.core.tracing import traced
+from app.db import statements
+from app.db.history_buffer import history_buffer
+from app.models.resume import Resume, ResumeHistory
 from app.schemas.resume_history import ResumeHistoryCreate
 
+# History rows never change once written, so a diff between two of them can be
+# cached for as long as it stays in the LRU. Ids alone don't identify a resume:
+# every shard has its own sequences and SQLite reuses the highest id after a
+# delete, so keys also carry the database, the owner and the creation time.
+_diff_cache = LRUCache(maxsize=settings.DIFF_CACHE_SIZE)
+
 def create_resume_history(db: Session, history: ResumeHistoryCreate) -> ResumeHistory:
     """Create a new resume history entry"""
     db_history = ResumeHistory(**history.dict())
@@ -13,22 +26,71 @@ def create_resume_history(db: Session, history: ResumeHistoryCreate) -> ResumeHi
     db.refresh(db_history)
     return db_history
 
+@traced()
 def get_resume_history(db: Session, resume_id: int, skip: int = 0, limit: int = 100) -> List[ResumeHistory]:
-    """Get history for a specific resume"""
-    return (
-        db.query(ResumeHistory)
-        .filter(ResumeHistory.resume_id == resume_id)
-        .order_by(ResumeHistory.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+    """Get history for a specific resume, including versions still in the write-behind buffer"""
+    return history_buffer.read_page(
+        db, resume_id, skip, limit,
+        lambda skip, limit: db.scalars(
+            statements.HISTORY_BY_RESUME, {"resume_id": resume_id, "skip": skip, "limit": limit}
+        ).all()
     )
 
+@traced()
 def get_latest_resume_history(db: Session, resume_id: int) -> Optional[ResumeHistory]:
-    """Get the most recent history entry for a resume"""
-    return (
-        db.query(ResumeHistory)
-        .filter(ResumeHistory.resume_id == resume_id)
-        .order_by(ResumeHistory.created_at.desc())
-        .first()
+    """Get the most recent history entry for a resume; it has no id while still in the write-behind buffer"""
+    return history_buffer.read(
+        db, resume_id,
+        lambda queued: queued[0] if queued else db.scalars(statements.LATEST_HISTORY, {"resume_id": resume_id}).first()
     )
+
+@traced()
+def get_history_entry(db: Session, resume_id: int, history_id: int) -> ResumeHistory:
+    """Get one history entry of a resume, loading only the columns a diff needs"""
+    entry = db.scalars(statements.HISTORY_ENTRY, {"resume_id": resume_id, "history_id": history_id}).first()
+    if not entry:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="History version not found"
+        )
+    return entry
+
+def version_text(entry: ResumeHistory) -> str:
+    """The resume text a history entry left behind"""
+    return entry.improved_content if entry.improved_content is not None else entry.content
+
+@traced()
+def diff_versions(
+    db: Session,
+    resume: Resume,
+    from_id: int,
+    to_id: Optional[int] = None,
+    granularity: str = "line",
+    context: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Diff history version from_id against version to_id, or against the resume's
+    current content when to_id is None. The caller must have checked ownership.
+    """
+    if to_id is None:
+        # The current content is mutable; updated_at alone can be too coarse
+        # (second resolution on SQLite), so key on the text's hash as well
+        revision = ("current", resume.updated_at, hash(resume.content))
+    else:
+        revision = to_id
+    key = (db.get_bind(), resume.user_id, resume.id, resume.created_at, from_id, revision, granularity, context)
+
+    cached = _diff_cache.get(key)
+    if cached is not None:
+        return cached
+
+    old = version_text(get_history_entry(db, resume.id, from_id))
+    new = resume.content if to_id is None else version_text(get_history_entry(db, resume.id, to_id))
+    result = {
+        "resume_id": resume.id,
+        "from_version": from_id,
+        "to_version": to_id,
+        **diff_texts(old, new, granularity=granularity, context=context, max_tokens=settings.DIFF_MAX_TOKENS),
+    }
+    _diff_cache.set(key, result)
+    return result
@@ -0,0 +1,94 @@
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import Iterable, Optional
+
+from ..core.tracing import traced
+from ..models.resume import Resume, ResumeHistory
+from ..models.stats import UserStats
+from ..models.user import User
+
+IMPROVED_MARKER = "%[Improved]"
+
+def bump_user_stats(
+    db: Session,
+    user_id: int,
+    resumes: int = 0,
+    history: int = 0,
+    improvements: int = 0,
+    edited: bool = True
+) -> None:
+    """
+    Adjust a user's counters in the caller's transaction, so they commit or roll
+    back together with the change they describe. A user without a stats row is
+    left alone: the row is computed from the tables on first read.
+    """
+    values = {}
+    if resumes:
+        values["resume_count"] = UserStats.resume_count + resumes
+    if history:
+        values["history_count"] = UserStats.history_count + history
+    if improvements:
+        values["improvement_count"] = UserStats.improvement_count + improvements
+    if edited:
+        values["last_edited_at"] = func.now()
+    if not values:
+        return
+    db.execute(
+        update(UserStats)
+        .where(UserStats.user_id == user_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+def _computed_stats(user_ids: Optional[Iterable[int]] = None):
+    """SELECT producing fresh user_stats rows from resumes and resume_history"""
+    owned = Resume.user_id == User.id
+    history = (
+        select(func.count(ResumeHistory.id))
+        .join(Resume, Resume.id == ResumeHistory.resume_id)
+    )
+    stmt = select(
+        User.id,
+        select(func.count(Resume.id)).where(owned).scalar_subquery(),
+        # History of deleted resumes still being purged counts until the purge
+        # removes it (see app/jobs/resume_purge.py)
+        history.where(owned | (Resume.detached_user_id == User.id)).scalar_subquery(),
+        history.where(owned, ResumeHistory.improved_content.like(IMPROVED_MARKER)).scalar_subquery(),
+        select(func.max(func.coalesce(Resume.updated_at, Resume.created_at))).where(owned).scalar_subquery(),
+    )
+    if user_ids is not None:
+        stmt = stmt.where(User.id.in_(list(user_ids)))
+    return stmt
+
+def recompute_user_stats(db: Session, user_ids: Optional[Iterable[int]] = None) -> None:
+    """
+    Rebuild stats rows from the underlying tables (all users when user_ids is
+    None). Used to seed missing rows and after bulk history removal. The
+    improvement count is estimated from history rows carrying the improve marker.
+    """
+    if user_ids is not None:
+        user_ids = list(user_ids)
+    clear = delete(UserStats)
+    if user_ids is not None:
+        clear = clear.where(UserStats.user_id.in_(user_ids))
+    db.execute(clear)
+    db.execute(
+        UserStats.__table__.insert().from_select(
+            ["user_id", "resume_count", "history_count", "improvement_count", "last_edited_at"],
+            _computed_stats(user_ids)
+        )
+    )
+
+@traced()
+def get_user_stats(db: Session, user_id: int) -> UserStats:
+    stats = db.get(UserStats, user_id)
+    if stats is not None:
+        return stats
+    try:
+        recompute_user_stats(db, [user_id])
+        db.commit()
+    except IntegrityError:
+        # A concurrent request seeded the row first
+        db.rollback()
+    return db.get(UserStats, user_id)
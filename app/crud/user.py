@@ -2,11 +2,16 @@ from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
 from ..models.user import User
-from ..core.security import get_password_hash, verify_password
+from ..core.security import get_password_hash, verify_password, password_needs_rehash
+from ..core.tracing import traced
+from ..db import statements
+from ..db.sharding import shard_router
 
+@traced()
 def get_user_by_email(db: Session, email: str) -> User | None:
-    return db.query(User).filter(User.email == email).first()
+    return db.scalars(statements.USER_BY_EMAIL, {"email": email}).first()
 
+@traced()
 def create_user(db: Session, email: str, password: str) -> User:
     hashed_password = get_password_hash(password)
     db_user = User(email=email, hashed_password=hashed_password)
@@ -14,18 +19,26 @@ def create_user(db: Session, email: str, password: str) -> User:
         db.add(db_user)
         db.commit()
         db.refresh(db_user)
-        return db_user
     except IntegrityError:
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
+    shard_router.register_user(db, db_user)
+    return db_user
 
+@traced()
 def authenticate_user(db: Session, email: str, password: str) -> User | bool:
     user = get_user_by_email(db, email)
     if not user:
         return False
     if not verify_password(password, user.hashed_password):
         return False
+    # The plain password is only available here: move the stored hash to the
+    # currently configured cost
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = get_password_hash(password)
+        db.commit()
+        shard_router.sync_user(user)
     return user
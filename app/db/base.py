@@ -1,8 +1,10 @@
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import Session
 from typing import Generator
+from starlette.requests import Request
 import os
 from dotenv import load_dotenv
 
@@ -10,13 +12,32 @@ load_dotenv()
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Server-side prepared statements, with the psycopg (3) driver only
+# (postgresql+psycopg:// URLs): a statement is prepared on a connection once it
+# has run this many times there. "none" disables them, as PgBouncer in
+# transaction pooling mode requires. psycopg2 never prepares server-side.
+DB_PREPARE_THRESHOLD = os.getenv("DB_PREPARE_THRESHOLD", "5")
+
+def engine_options(url: str) -> dict:
+    """Driver-specific create_engine() arguments for a database URL"""
+    if make_url(url).drivername == "postgresql+psycopg":
+        threshold = None if DB_PREPARE_THRESHOLD.lower() == "none" else int(DB_PREPARE_THRESHOLD)
+        return {"connect_args": {"prepare_threshold": threshold}}
+    return {}
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
-def get_db() -> Generator[Session, None, None]:
-    db = SessionLocal()
+def get_db(request: Request = None) -> Generator[Session, None, None]:
+    """Session for the request: on the authenticated user's shard when sharding is enabled"""
+    # Imported here: the router is built on this module's engine
+    from app.db.sharding import shard_router
+    if request is not None and shard_router.enabled:
+        db = shard_router.session_for_request(request)
+    else:
+        db = SessionLocal()
     try:
         yield db
     finally:
@@ -0,0 +1,240 @@
+"""
+Write-behind buffer for resume history rows.
+
+With HISTORY_DURABILITY "buffered" or "relaxed", edits no longer insert their
+history row in their own transaction: HistoryBuffer.add() queues it in this
+worker, and a background thread writes the queue with one multi-row INSERT per
+database, in its own transaction, once HISTORY_BUFFER_MAX_ROWS rows are
+waiting or HISTORY_BUFFER_FLUSH_SECONDS after the oldest was queued. The
+lifespan flushes what is left on shutdown; a worker that is killed loses the
+rows it had queued, never the edits themselves.
+
+Queued rows are visible to this worker's reads through read(), as transient
+ResumeHistory objects without an id. Other workers see them once flushed.
+
+"relaxed" additionally commits edits and flushes with synchronous_commit off
+on PostgreSQL (see relax_commit()): commits stop waiting for their WAL flush,
+which the WAL writer then does for many of them at once. A crash of the
+database server can lose the last moments of acknowledged edits, but never
+leaves them half-written.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.resume import Resume, ResumeHistory
+
+logger = logging.getLogger(__name__)
+
+DURABILITY_MODES = ("sync", "buffered", "relaxed")
+if settings.HISTORY_DURABILITY not in DURABILITY_MODES:
+    raise ValueError(f"Unknown HISTORY_DURABILITY {settings.HISTORY_DURABILITY!r}")
+
+
+def buffering() -> bool:
+    """Whether history rows go through the buffer (they never do with database-side capture)"""
+    return settings.HISTORY_DURABILITY != "sync" and settings.HISTORY_CAPTURE_MODE == "app"
+
+
+def relax_commit(db: Session) -> None:
+    """In "relaxed" mode, let the current PostgreSQL transaction commit without waiting for its WAL flush"""
+    if settings.HISTORY_DURABILITY == "relaxed" and db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SET LOCAL synchronous_commit TO off"))
+
+
+class HistoryBuffer:
+    def __init__(self, max_rows: int, flush_seconds: float):
+        self.max_rows = max_rows
+        self.flush_seconds = flush_seconds
+        # Queued rows per database, oldest first, and when the oldest was queued
+        self._rows: Dict[Engine, List[Dict[str, Any]]] = {}
+        self._oldest: Optional[float] = None
+        self._cond = threading.Condition()
+        # Flushes between taking their rows off the queue and committing them
+        self._flushing = 0
+        # Bumped when a flush ends, so reads can tell they overlapped one
+        self._generation = 0
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.flushed = 0
+        self.batches = 0
+        self.dropped = 0
+        self.failures = 0
+
+    def add(self, db: Session, row: Dict[str, Any]) -> None:
+        """
+        Queue a history row (resume_id, content, improved_content, created_at)
+        for the database db is bound to. Once the buffer is closed, the row is
+        added to db's transaction instead.
+        """
+        with self._cond:
+            if not self._closed:
+                self._rows.setdefault(db.get_bind(), []).append(row)
+                if self._oldest is None:
+                    self._oldest = time.monotonic()
+                self._start()
+                if sum(len(rows) for rows in self._rows.values()) >= self.max_rows:
+                    self._cond.notify_all()
+                return
+        db.add(ResumeHistory(**row))
+
+    def read(self, db: Session, resume_id: int, fetch: Callable[[List[ResumeHistory]], Any]) -> Any:
+        """
+        fetch(queued rows of the resume, newest first), which reads the rest
+        from the database and merges them. It is repeated if a flush ran
+        meanwhile, so that no row is seen twice, or not at all.
+        """
+        engine = db.get_bind()
+        while True:
+            with self._cond:
+                while self._flushing:
+                    self._cond.wait()
+                generation = self._generation
+                queued = [row for row in self._rows.get(engine, ()) if row["resume_id"] == resume_id]
+            result = fetch([ResumeHistory(**row) for row in reversed(queued)])
+            with self._cond:
+                if not self._flushing and self._generation == generation:
+                    return result
+
+    def read_page(
+        self, db: Session, resume_id: int, skip: int, limit: int, fetch: Callable[[int, int], List[ResumeHistory]]
+    ) -> List[ResumeHistory]:
+        """Entries skip to skip + limit of the resume's history, newest first; fetch(skip, limit) reads stored ones"""
+        def merge(queued: List[ResumeHistory]) -> List[ResumeHistory]:
+            head = queued[skip:skip + limit]
+            if len(head) == limit:
+                return head
+            return head + list(fetch(max(0, skip - len(queued)), limit - len(head)))
+        return self.read(db, resume_id, merge)
+
+    def discard(self, db: Session, resume_id: int) -> int:
+        """Drop the queued rows of a resume that is being deleted; how many there were"""
+        engine = db.get_bind()
+        with self._cond:
+            while self._flushing:
+                self._cond.wait()
+            rows = self._rows.get(engine, [])
+            kept = [row for row in rows if row["resume_id"] != resume_id]
+            if rows:
+                self._rows[engine] = kept
+            return len(rows) - len(kept)
+
+    def flush(self) -> int:
+        """Write every queued row now; how many were written"""
+        with self._flush_lock:
+            with self._cond:
+                engines = list(self._rows)
+            return sum(self._flush_engine(engine) for engine in engines)
+
+    def _flush_engine(self, engine: Engine) -> int:
+        with Session(bind=engine) as session:
+            # Check a connection out before taking the rows: reads wait for the
+            # flush to finish, possibly holding every other pooled connection
+            session.connection()
+            with self._cond:
+                rows = self._rows.pop(engine, [])
+                if not any(self._rows.values()):
+                    self._oldest = None
+                if not rows:
+                    return 0
+                self._flushing += 1
+            written = 0
+            try:
+                written = self._write(session, rows)
+            except Exception:
+                self.failures += 1
+                logger.exception("Could not write %d buffered history rows, will retry", len(rows))
+                with self._cond:
+                    self._rows[engine] = rows + self._rows.get(engine, [])
+                    self._oldest = self._oldest or time.monotonic()
+            finally:
+                with self._cond:
+                    self._flushing -= 1
+                    self._generation += 1
+                    self._cond.notify_all()
+            return written
+
+    def _write(self, session: Session, rows: List[Dict[str, Any]]) -> int:
+        relax_commit(session)
+        try:
+            session.execute(insert(ResumeHistory), rows)
+            session.commit()
+        except IntegrityError:
+            # Resumes deleted since their rows were queued (by another worker)
+            session.rollback()
+            existing = set(session.scalars(
+                select(Resume.id).where(Resume.id.in_({row["resume_id"] for row in rows}))
+            ))
+            kept = [row for row in rows if row["resume_id"] in existing]
+            self.dropped += len(rows) - len(kept)
+            if not kept:
+                return 0
+            relax_commit(session)
+            session.execute(insert(ResumeHistory), kept)
+            session.commit()
+            rows = kept
+        self.flushed += len(rows)
+        self.batches += 1
+        return len(rows)
+
+    def _start(self) -> None:
+        # Called with self._cond held
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="history-buffer", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed:
+                    queued = sum(len(rows) for rows in self._rows.values())
+                    if queued >= self.max_rows:
+                        break
+                    if self._oldest is None:
+                        self._cond.wait()
+                        continue
+                    remaining = self._oldest + self.flush_seconds - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._closed:
+                    return
+            failures = self.failures
+            self.flush()
+            if self.failures != failures:
+                # The rows are back in the queue; give the database a moment
+                with self._cond:
+                    self._cond.wait_for(lambda: self._closed, timeout=self.flush_seconds)
+
+    def close(self) -> int:
+        """Stop the flush thread and write what is left; later rows are written synchronously"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+        return self.flush()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "mode": settings.HISTORY_DURABILITY,
+                "queued": sum(len(rows) for rows in self._rows.values()),
+                "flushed": self.flushed,
+                "batches": self.batches,
+                "rows_per_batch": round(self.flushed / self.batches, 2) if self.batches else 0.0,
+                "dropped": self.dropped,
+                "failures": self.failures,
+            }
+
+
+history_buffer = HistoryBuffer(settings.HISTORY_BUFFER_MAX_ROWS, settings.HISTORY_BUFFER_FLUSH_SECONDS)
@@ -0,0 +1,154 @@
+"""
+Partition maintenance for resume_history.
+
+On PostgreSQL deployments that ran migration 520862c3aed4, resume_history is
+range-partitioned by created_at into one partition per calendar month plus a
+DEFAULT partition. These helpers create upcoming monthly partitions ahead of
+time and drop partitions that have aged out.
+
+The DEFAULT partition catches rows no monthly partition covers, e.g. when
+maintenance has not run for a while. PostgreSQL refuses to create a partition
+for a month the DEFAULT partition already holds rows of, so such a month's
+partition is built as a standalone table, the month's rows are moved into it
+out of the DEFAULT partition, and it is attached afterwards. On SQLite, or on PostgreSQL
+databases where the table is still a plain heap, they do nothing, so the same
+code path runs in tests.
+"""
+import logging
+from datetime import date, datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "resume_history"
+PARTITION_PREFIX = "resume_history_y"
+DEFAULT_PARTITION = "resume_history_default"
+COLUMNS = "id, resume_id, content, improved_content, created_at"
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARTITION_PREFIX}{month.year:04d}m{month.month:02d}"
+
+
+def partition_bounds(month: date) -> Tuple[date, date]:
+    start = month_start(month)
+    return start, add_months(start, 1)
+
+
+def months_between(first: date, last: date) -> List[date]:
+    """Month starts from first's month through last's month inclusive"""
+    months = []
+    current = month_start(first)
+    while current <= month_start(last):
+        months.append(current)
+        current = add_months(current, 1)
+    return months
+
+
+def create_partition_sql(month: date) -> str:
+    start, end = partition_bounds(month)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(start)} "
+        f"PARTITION OF {PARENT_TABLE} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def create_partition_from_default_sql(month: date) -> List[str]:
+    """Statements creating a month's partition with its rows moved out of the DEFAULT partition"""
+    start, end = partition_bounds(month)
+    name = partition_name(start)
+    return [
+        f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS)",
+        f"WITH moved AS ("
+        f"DELETE FROM {DEFAULT_PARTITION} "
+        f"WHERE created_at >= '{start.isoformat()}' AND created_at < '{end.isoformat()}' "
+        f"RETURNING {COLUMNS}"
+        f") INSERT INTO {name} ({COLUMNS}) SELECT {COLUMNS} FROM moved",
+        f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')",
+    ]
+
+
+def _exists(connection: Connection, name: str) -> bool:
+    return connection.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None
+
+
+def is_partitioned(connection: Connection) -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+    return bool(connection.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p "
+        "JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"
+    ), {"name": PARENT_TABLE}).scalar())
+
+
+def ensure_history_partitions(
+    engine: Engine,
+    months_ahead: int,
+    today: Optional[date] = None
+) -> List[str]:
+    """
+    Create partitions for the current month and the next months_ahead months.
+    Returns the names of partitions that are now in place.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    with engine.begin() as connection:
+        if not is_partitioned(connection):
+            return []
+        has_default = _exists(connection, DEFAULT_PARTITION)
+        months = months_between(today, add_months(today, months_ahead))
+        for month in months:
+            if _exists(connection, partition_name(month)):
+                continue
+            if not has_default:
+                connection.execute(text(create_partition_sql(month)))
+                continue
+            create, move, attach = create_partition_from_default_sql(month)
+            connection.execute(text(create))
+            moved = connection.execute(text(move)).rowcount
+            connection.execute(text(attach))
+            if moved:
+                logger.warning(
+                    f"Moved {moved} rows out of {DEFAULT_PARTITION} into {partition_name(month)}; "
+                    "partition maintenance fell behind"
+                )
+    names = [partition_name(month) for month in months]
+    logger.info(f"resume_history partitions ensured through {names[-1]}")
+    return names
+
+
+def drop_history_partitions_before(engine: Engine, cutoff: date) -> List[str]:
+    """
+    Drop whole monthly partitions whose upper bound is on or before cutoff.
+    Dropping a partition is a catalog operation, unlike deleting its rows.
+    """
+    dropped = []
+    with engine.begin() as connection:
+        if not is_partitioned(connection):
+            return []
+        names = connection.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :parent AND c.relname LIKE :prefix"
+        ), {"parent": PARENT_TABLE, "prefix": f"{PARTITION_PREFIX}%"}).scalars().all()
+        for name in sorted(names):
+            month = date(int(name[-7:-3]), int(name[-2:]), 1)
+            if partition_bounds(month)[1] <= cutoff:
+                connection.execute(text(f"DROP TABLE {name}"))
+                dropped.append(name)
+    return dropped
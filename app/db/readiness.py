@@ -0,0 +1,105 @@
+"""
+Cached readiness verdict for GET /api/ready.
+
+A background loop in each worker probes every database it may query (the
+directory and each shard) and inspects their connection pools every
+HEALTH_CHECK_INTERVAL_SECONDS. Probes then only read the
+cached verdict, so they cost no I/O and no pool checkouts however often the
+load balancer calls them. A worker whose pool is fully checked out reports not
+ready before it starts queueing requests for connections. So does a worker
+that can't reach one of its databases, as the users on that shard would get
+errors from it, and a worker whose checker has stopped updating.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def pool_status(engine: Engine) -> Dict[str, Any]:
+    """Checked-out connections against capacity, for pools that track them (QueuePool)"""
+    pool = engine.pool
+    if not hasattr(pool, "checkedout") or not hasattr(pool, "size"):
+        return {"class": type(pool).__name__}
+    max_overflow = getattr(pool, "_max_overflow", 0)
+    capacity = pool.size() + max_overflow if max_overflow >= 0 else None  # -1 = unbounded
+    return {
+        "class": type(pool).__name__,
+        "checked_out": pool.checkedout(),
+        "size": pool.size(),
+        "overflow": pool.overflow(),
+        "capacity": capacity,
+    }
+
+
+def check_readiness(engine: Engine) -> Dict[str, Any]:
+    pool = pool_status(engine)
+    verdict = {"ready": True, "reason": None, "database": None, "pool": pool}
+    capacity = pool.get("capacity")
+    if capacity and pool["checked_out"] / capacity >= settings.HEALTH_POOL_SATURATION:
+        # Checking out another connection would wait for pool_timeout
+        verdict.update(ready=False, reason="connection pool saturated")
+        return verdict
+    started = time.perf_counter()
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        verdict["database"] = {"status": "connected", "latency_ms": round((time.perf_counter() - started) * 1000, 1)}
+    except Exception as e:
+        verdict.update(ready=False, reason="database unreachable", database={"status": "error", "error": str(e)})
+    return verdict
+
+
+def check_databases(engines: Dict[str, Engine]) -> Dict[str, Any]:
+    """check_readiness() of every named database; not ready when any of them is not"""
+    checks = {name: check_readiness(engine) for name, engine in engines.items()}
+    failed = [f"{name}: {check['reason']}" for name, check in checks.items() if not check["ready"]]
+    return {
+        "ready": not failed,
+        "reason": "; ".join(failed) or None,
+        "databases": {name: {"database": check["database"], "pool": check["pool"]} for name, check in checks.items()},
+    }
+
+
+class ReadinessChecker:
+    def __init__(self):
+        self._verdict: Optional[Dict[str, Any]] = None
+        self._checked_at: Optional[datetime] = None
+        self._checked_monotonic = 0.0
+
+    def update(self, verdict: Dict[str, Any]) -> None:
+        self._verdict = verdict
+        self._checked_at = datetime.now(timezone.utc)
+        self._checked_monotonic = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        if self._verdict is None:
+            return {"ready": False, "reason": "starting", "checked_at": None, "age_seconds": None}
+        age = time.monotonic() - self._checked_monotonic
+        snapshot = {**self._verdict, "checked_at": self._checked_at.isoformat(), "age_seconds": round(age, 1)}
+        if age > settings.HEALTH_CHECK_INTERVAL_SECONDS * 3:
+            snapshot.update(ready=False, reason="readiness check is stale")
+        return snapshot
+
+    async def run(self, engines: Dict[str, Engine]) -> None:
+        while True:
+            try:
+                verdict = await run_in_threadpool(check_databases, engines)
+            except Exception as e:
+                verdict = {"ready": False, "reason": f"readiness check failed: {str(e)}"}
+            if not verdict["ready"] and (self._verdict or {}).get("ready", True):
+                logger.warning(f"Worker not ready: {verdict['reason']}")
+            self.update(verdict)
+            await asyncio.sleep(settings.HEALTH_CHECK_INTERVAL_SECONDS)
+
+
+readiness = ReadinessChecker()
@@ -0,0 +1,254 @@
+"""
+User-id sharding.
+
+With DATABASE_SHARDS set, DATABASE_URL becomes the user directory: the
+authoritative users table (login by email), user_shards (which shard holds each
+user) and revoked_tokens. Everything a user owns (resumes, history, stats,
+idempotency keys) lives on a single shard, next to a copy of their users row so
+foreign keys and the per-request user lookup stay local. Users rows are written
+in the directory and copied to the shard with sync_user(). Every query in
+app/crud is scoped by user id, so a request only ever needs its user's shard.
+
+New users are placed by SHARD_STRATEGY (a hash of the id, or ranges of
+SHARD_RANGE_SIZE ids dealt round robin) and the placement is recorded in the
+directory, so the rebalancer (app/jobs/shard_rebalance.py) can move users
+without changing the rule. Users without a directory row predate sharding, or
+failed to be copied at registration, and are served from the directory
+database until rebalanced.
+
+get_db() routes authenticated requests through shard_router. Each shard has its
+own engine and connection pool, created on first use. Without DATABASE_SHARDS
+the router is disabled and everything stays on the single engine.
+"""
+import hashlib
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from jose import JWTError, jwt
+from sqlalchemy import create_engine, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.db.base import engine, engine_options
+from app.models.shard import UserShard
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Name under which the directory database serves users that have no shard yet
+DIRECTORY = "directory"
+CACHE_SIZE = 10000
+RETRY_AFTER_SECONDS = 5
+
+
+def parse_shards(value: str) -> Dict[str, str]:
+    """'a=postgresql://...,b=postgresql://...' -> {"a": url, "b": url}, in order"""
+    shards: Dict[str, str] = {}
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, separator, url = item.partition("=")
+        name, url = name.strip(), url.strip()
+        if not separator or not name or not url:
+            raise ValueError(f"DATABASE_SHARDS entry {item!r} is not name=url")
+        if name == DIRECTORY or name in shards:
+            raise ValueError(f"Shard name {name!r} is reserved or repeated")
+        shards[name] = url
+    return shards
+
+
+class ShardRouter:
+    def __init__(
+        self,
+        directory_engine: Engine,
+        shard_urls: Dict[str, str],
+        strategy: str = "hash",
+        range_size: int = 100000,
+        cache_seconds: float = 30
+    ):
+        if strategy not in ("hash", "range"):
+            raise ValueError(f"Unknown SHARD_STRATEGY {strategy!r}")
+        self.directory_engine = directory_engine
+        self.shard_urls = dict(shard_urls)
+        self.names: List[str] = list(shard_urls)
+        self.strategy = strategy
+        self.range_size = range_size
+        self.cache_seconds = cache_seconds
+        self._factories: Dict[str, sessionmaker] = {
+            DIRECTORY: sessionmaker(autocommit=False, autoflush=False, bind=directory_engine)
+        }
+        self._assignments = LRUCache(CACHE_SIZE)  # user id -> (shard, moving, expires)
+        self._user_ids = LRUCache(CACHE_SIZE)  # email -> user id, for tokens without uid
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.names)
+
+    def place(self, user_id: int) -> str:
+        """The shard the placement rule picks for a user"""
+        if self.strategy == "range":
+            index = (user_id - 1) // self.range_size
+        else:
+            digest = hashlib.blake2b(str(user_id).encode(), digest_size=8).digest()
+            index = int.from_bytes(digest, "little")
+        return self.names[index % len(self.names)]
+
+    def session_factory(self, name: str) -> sessionmaker:
+        factory = self._factories.get(name)
+        if factory is None:
+            url = self.shard_urls[name]
+            if url == str(self.directory_engine.url):
+                shard_engine = self.directory_engine
+            else:
+                shard_engine = create_engine(url, pool_pre_ping=True, **engine_options(url))
+            factory = self._factories.setdefault(
+                name, sessionmaker(autocommit=False, autoflush=False, bind=shard_engine)
+            )
+        return factory
+
+    def session_factories(self) -> Dict[str, sessionmaker]:
+        """Directory first, then every shard; each database appears once"""
+        factories = {DIRECTORY: self._factories[DIRECTORY]}
+        seen = {id(self.directory_engine)}
+        for name in self.names:
+            factory = self.session_factory(name)
+            if id(factory.kw["bind"]) not in seen:
+                seen.add(id(factory.kw["bind"]))
+                factories[name] = factory
+        return factories
+
+    def engines(self) -> List[Engine]:
+        return [factory.kw["bind"] for factory in self.session_factories().values()]
+
+    def directory_session(self) -> Session:
+        return self._factories[DIRECTORY]()
+
+    @contextmanager
+    def on_directory(self, db: Session) -> Iterator[Session]:
+        """db itself when it already talks to the directory, else a short-lived directory session"""
+        if not self.enabled or db.get_bind() is self.directory_engine:
+            yield db
+            return
+        directory = self.directory_session()
+        try:
+            yield directory
+        finally:
+            directory.close()
+
+    def lookup(self, user_id: int, fresh: bool = False) -> Tuple[str, bool]:
+        """(shard, moving) for a user, cached for SHARD_DIRECTORY_CACHE_SECONDS"""
+        now = time.monotonic()
+        cached = None if fresh else self._assignments.get(user_id)
+        if cached is not None and cached[2] > now:
+            return cached[0], cached[1]
+        with self.directory_session() as db:
+            row = db.execute(
+                select(UserShard.shard, UserShard.moving).where(UserShard.user_id == user_id)
+            ).one_or_none()
+        shard, moving = (row.shard, row.moving) if row else (DIRECTORY, False)
+        self._assignments.set(user_id, (shard, moving, now + self.cache_seconds))
+        return shard, moving
+
+    def invalidate(self, user_id: int) -> None:
+        self._assignments.set(user_id, (None, False, 0.0))
+
+    def session_for_user(self, user_id: int) -> Session:
+        shard, moving = self.lookup(user_id)
+        if moving:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Your data is being moved; try again shortly",
+                headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+            )
+        return self.session_factory(shard)()
+
+    def user_id_for_token(self, token: Optional[str]) -> Optional[int]:
+        """User id of a valid access token: its uid claim, else a directory lookup by email"""
+        if not token:
+            return None
+        if token.startswith("Bearer "):
+            token = token.split("Bearer ")[1]
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except JWTError:
+            return None
+        user_id = payload.get("uid")
+        if isinstance(user_id, int):
+            return user_id
+        email = payload.get("sub")
+        if not email:
+            return None
+        user_id = self._user_ids.get(email)
+        if user_id is None:
+            with self.directory_session() as db:
+                user_id = db.scalar(select(User.id).where(User.email == email))
+            if user_id is not None:
+                self._user_ids.set(email, user_id)
+        return user_id
+
+    def session_for_request(self, request) -> Session:
+        """The authenticated user's shard session; the directory for anonymous requests"""
+        token = request.cookies.get("access_token") or request.headers.get("Authorization")
+        user_id = self.user_id_for_token(token)
+        if user_id is None:
+            return self.directory_session()
+        return self.session_for_user(user_id)
+
+    def register_user(self, db: Session, user: User) -> None:
+        """Place a new user (already committed to the directory via db) on their shard"""
+        if not self.enabled:
+            return
+        shard = self.place(user.id)
+        try:
+            with self.session_factory(shard)() as shard_db:
+                shard_db.merge(copy_user(user))
+                shard_db.commit()
+            db.add(UserShard(user_id=user.id, shard=shard))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Could not place user {user.id} on shard {shard}, serving from the directory: {str(e)}")
+
+    def sync_user(self, user: User) -> None:
+        """
+        Copy a users row just changed in the directory (password hash, is_active)
+        to the user's shard, whose copy is what authenticated requests read.
+        Every write to a users row must be followed by this.
+        """
+        if not self.enabled:
+            return
+        shard, _ = self.lookup(user.id, fresh=True)
+        if shard == DIRECTORY:
+            return
+        try:
+            with self.session_factory(shard)() as shard_db:
+                shard_db.merge(copy_user(user))
+                shard_db.commit()
+        except Exception as e:
+            logger.error(f"Could not copy user {user.id} to shard {shard}, its copy there is stale: {str(e)}")
+
+
+def copy_user(user: User) -> User:
+    """Detached copy of a users row, for the shard holding the user's data"""
+    return User(
+        id=user.id,
+        email=user.email,
+        hashed_password=user.hashed_password,
+        is_active=user.is_active,
+        created_at=user.created_at,
+    )
+
+
+shard_router = ShardRouter(
+    directory_engine=engine,
+    shard_urls=parse_shards(settings.DATABASE_SHARDS),
+    strategy=settings.SHARD_STRATEGY,
+    range_size=settings.SHARD_RANGE_SIZE,
+    cache_seconds=settings.SHARD_DIRECTORY_CACHE_SECONDS,
+)
@@ -0,0 +1,250 @@
+"""
+Slow query log.
+
+install_slow_query_log(engine) times every statement with cursor events.
+Statements slower than SLOW_QUERY_THRESHOLD_MS are recorded with their
+normalized SQL, the shape of their parameters (types only, never values), the
+duration and the route being served. Each one is logged as JSON to
+logs/slow_queries.log and kept in memory for GET /api/admin/slow-queries.
+
+Offending statements are also EXPLAINed: EXPLAIN (ANALYZE, BUFFERS) for plain
+PostgreSQL SELECTs, plain EXPLAIN for everything else there, and EXPLAIN QUERY
+PLAN on SQLite. ANALYZE executes the statement again on the live database, so
+it is kept from writes, locking reads (FOR UPDATE / SHARE) and SELECTs from a
+function (SELECT * FROM resume_capture_edit(...) performs an edit), whose
+side effects and lock waits a rollback would not undo. The EXPLAIN runs in a
+background thread on its own connection, at most once per
+SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS for each distinct statement and within a
+global per-minute budget. Log lines have a per-minute budget too; past it,
+occurrences are only counted. The detector can slow a request by no more
+than the bookkeeping.
+"""
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.request_context import current_route
+
+logger = logging.getLogger("app.slow_queries")
+
+RECENT_SIZE = 200
+STATEMENT_STATS_SIZE = 500
+EXPLAIN_QUEUE_SIZE = 16
+# Execution option that keeps the detector's own EXPLAINs out of the log
+SKIP_OPTION = "slow_query_log"
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"%\(\w+\)s|%s|(?<!:):\w+|\$\d+")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+_WRITE_RE = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|CREATE|ALTER|DROP|TRUNCATE)\b", re.I)
+_READ_RE = re.compile(r"^[\s(]*(SELECT|WITH)\b", re.I)
+_LOCKING_RE = re.compile(r"\bFOR\s+(NO\s+KEY\s+UPDATE|UPDATE|KEY\s+SHARE|SHARE)\b", re.I)
+_FROM_FUNCTION_RE = re.compile(r"\b(FROM|JOIN|LATERAL)\s+(ONLY\s+)?[\w.\"]+\s*\(", re.I)
+_SEQUENCE_RE = re.compile(r"\b(nextval|setval)\s*\(", re.I)
+
+
+def normalize_sql(statement: str) -> str:
+    """Statement with literals and placeholders replaced by ?, so repeats group together"""
+    statement = _STRING_RE.sub("?", statement)
+    statement = _PLACEHOLDER_RE.sub("?", statement)
+    statement = _NUMBER_RE.sub("?", statement)
+    statement = _IN_LIST_RE.sub("(?, ...)", statement)
+    return _SPACE_RE.sub(" ", statement).strip()
+
+
+def _value_shape(parameters: Any) -> Any:
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__ if parameters is not None else None
+
+
+def params_shape(parameters: Any, executemany: bool) -> Any:
+    if executemany and parameters:
+        return {"rows": len(parameters), "row": _value_shape(parameters[0])}
+    return _value_shape(parameters)
+
+
+class _RateLimit:
+    """Allows `per_minute` events per rolling minute (token bucket)"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(max(per_minute, 0))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / 60)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+def _analyzable(statement: str) -> bool:
+    """Whether running the statement again can't change data or take row locks"""
+    return bool(_READ_RE.match(statement)) and not any(
+        pattern.search(statement) for pattern in (_WRITE_RE, _LOCKING_RE, _FROM_FUNCTION_RE, _SEQUENCE_RE)
+    )
+
+
+def explain_prefix(dialect: str, statement: str) -> str:
+    if dialect == "postgresql":
+        if _analyzable(statement):
+            return "EXPLAIN (ANALYZE, BUFFERS) "
+        return "EXPLAIN "
+    if dialect == "sqlite":
+        return "EXPLAIN QUERY PLAN "
+    return "EXPLAIN "
+
+
+class SlowQueryLog:
+    def __init__(self):
+        self.recent: deque = deque(maxlen=RECENT_SIZE)
+        self.statements: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.suppressed = 0
+        self._lock = threading.Lock()
+        self._log_limit = _RateLimit(settings.SLOW_QUERY_LOG_PER_MINUTE)
+        self._explain_limit = _RateLimit(settings.SLOW_QUERY_EXPLAINS_PER_MINUTE)
+        self._last_explained: "OrderedDict[str, float]" = OrderedDict()
+        self._queue: queue.Queue = queue.Queue(maxsize=EXPLAIN_QUEUE_SIZE)
+        self._worker_pid: Optional[int] = None
+
+    def record(self, engine: Engine, statement: str, parameters: Any, executemany: bool, duration_ms: float) -> None:
+        normalized = normalize_sql(statement)
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(duration_ms, 1),
+            "statement": normalized,
+            "params": params_shape(parameters, executemany),
+            "route": current_route(),
+            "plan": None,
+        }
+        with self._lock:
+            self.recent.append(entry)
+            stats = self.statements.pop(normalized, None) or {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+            stats["count"] += 1
+            stats["total_ms"] += duration_ms
+            stats["max_ms"] = max(stats["max_ms"], duration_ms)
+            stats["last_route"] = entry["route"]
+            self.statements[normalized] = stats
+            while len(self.statements) > STATEMENT_STATS_SIZE:
+                self.statements.popitem(last=False)
+
+        if self._log_limit.allow():
+            logger.warning(json.dumps({k: v for k, v in entry.items() if k != "plan"}))
+        else:
+            self.suppressed += 1
+
+        if not executemany and self._should_explain(normalized):
+            try:
+                self._ensure_worker()
+                self._queue.put_nowait((engine, statement, parameters, entry))
+            except queue.Full:
+                pass
+
+    def _should_explain(self, normalized: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_explained.get(normalized)
+            if last is not None and now - last < settings.SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS:
+                return False
+            if not self._explain_limit.allow():
+                return False
+            self._last_explained.pop(normalized, None)
+            self._last_explained[normalized] = now
+            while len(self._last_explained) > STATEMENT_STATS_SIZE:
+                self._last_explained.popitem(last=False)
+            return True
+
+    def _ensure_worker(self) -> None:
+        # A thread started before a fork doesn't exist in the child
+        if self._worker_pid == os.getpid():
+            return
+        self._worker_pid = os.getpid()
+        threading.Thread(target=self._explain_loop, name="slow-query-explain", daemon=True).start()
+
+    def _explain_loop(self) -> None:
+        while True:
+            engine, statement, parameters, entry = self._queue.get()
+            try:
+                entry["plan"] = explain(engine, statement, parameters)
+                logger.warning(json.dumps({"statement": entry["statement"], "plan": entry["plan"]}))
+            except Exception as e:
+                entry["plan"] = f"EXPLAIN failed: {str(e)}"
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            statements = [
+                {"statement": statement, **stats, "avg_ms": round(stats["total_ms"] / stats["count"], 1)}
+                for statement, stats in self.statements.items()
+            ]
+            recent = list(self.recent)
+        statements.sort(key=lambda s: s["total_ms"], reverse=True)
+        return {
+            "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+            "suppressed_log_lines": self.suppressed,
+            "statements": statements,
+            "recent": recent[::-1],
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self.recent.clear()
+            self.statements.clear()
+            self._last_explained.clear()
+            self.suppressed = 0
+
+
+def explain(engine: Engine, statement: str, parameters: Any) -> str:
+    prefix = explain_prefix(engine.dialect.name, statement)
+    with engine.connect().execution_options(**{SKIP_OPTION: False}) as connection:
+        if engine.dialect.name == "postgresql":
+            connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(settings.SLOW_QUERY_EXPLAIN_TIMEOUT_MS)}")
+        rows = connection.exec_driver_sql(prefix + statement, parameters or ()).fetchall()
+        # Never keep anything an EXPLAIN ANALYZE may have touched
+        connection.rollback()
+    return "\n".join(" | ".join(str(column) for column in row) for row in rows)
+
+
+slow_query_log = SlowQueryLog()
+
+
+def install_slow_query_log(engine: Engine) -> None:
+    if settings.SLOW_QUERY_THRESHOLD_MS <= 0:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._slow_query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _check_duration(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_slow_query_started", None)
+        if started is None:
+            return
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms < settings.SLOW_QUERY_THRESHOLD_MS:
+            return
+        if not context.execution_options.get(SKIP_OPTION, True):
+            return
+        slow_query_log.record(engine, statement, parameters, executemany, duration_ms)
@@ -0,0 +1,83 @@
+"""
+Prebuilt statements for the hot-path queries.
+
+Each is built once at import, with bound parameters for every value, and run
+with db.execute(STATEMENT, {params}). Reusing the same construct skips
+building a Query per call, and SQLAlchemy memoizes its cache key, so the
+compiled SQL comes straight from the engine's compiled cache. Callers must
+not add clauses to them per call; variants that depend on arguments (column
+subsets, deferred content) are built once per variant and kept here too.
+"""
+from functools import lru_cache
+from typing import Sequence
+
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.orm import defer, load_only
+
+from app.models.resume import Resume, ResumeHistory
+from app.models.user import User
+
+USER_BY_EMAIL = select(User).where(User.email == bindparam("email")).limit(1)
+
+RESUME_BY_OWNER = (
+    select(Resume)
+    .where(Resume.id == bindparam("resume_id"), Resume.user_id == bindparam("user_id"))
+    .limit(1)
+)
+
+# For read-modify-write edits: a concurrent edit waits instead of being overwritten
+RESUME_BY_OWNER_FOR_UPDATE = RESUME_BY_OWNER.with_for_update().execution_options(populate_existing=True)
+
+RESUMES_BY_USER = (
+    select(Resume)
+    .where(Resume.user_id == bindparam("user_id"))
+    .offset(bindparam("skip"))
+    .limit(bindparam("limit"))
+)
+
+
+@lru_cache(maxsize=64)
+def resumes_by_user_fields(fields: Sequence[str]):
+    """RESUMES_BY_USER loading only the given columns; fields must be a tuple"""
+    return RESUMES_BY_USER.options(load_only(*(getattr(Resume, f) for f in fields), raiseload=True))
+
+
+# The most recently edited resumes with crud.resume.SUMMARY_FIELDS only, for the
+# dashboard. Never-edited resumes have no updated_at and count from their creation
+# (PostgreSQL would sort the NULLs first)
+RECENT_RESUMES = (
+    select(Resume)
+    .options(load_only(
+        Resume.id, Resume.title, Resume.created_at, Resume.updated_at, Resume.content_length, Resume.snippet,
+        raiseload=True
+    ))
+    .where(Resume.user_id == bindparam("user_id"))
+    .order_by(func.coalesce(Resume.updated_at, Resume.created_at).desc())
+    .limit(bindparam("limit"))
+)
+
+HISTORY_BY_RESUME = (
+    select(ResumeHistory)
+    .where(ResumeHistory.resume_id == bindparam("resume_id"))
+    .order_by(ResumeHistory.created_at.desc())
+    .offset(bindparam("skip"))
+    .limit(bindparam("limit"))
+)
+
+HISTORY_METADATA_BY_RESUME = HISTORY_BY_RESUME.options(
+    defer(ResumeHistory.content), defer(ResumeHistory.improved_content)
+)
+
+LATEST_HISTORY = (
+    select(ResumeHistory)
+    .where(ResumeHistory.resume_id == bindparam("resume_id"))
+    .order_by(ResumeHistory.created_at.desc())
+    .limit(1)
+)
+
+HISTORY_ENTRY = (
+    select(ResumeHistory)
+    .options(load_only(ResumeHistory.id, ResumeHistory.content, ResumeHistory.improved_content))
+    .where(ResumeHistory.id == bindparam("history_id"), ResumeHistory.resume_id == bindparam("resume_id"))
+    .limit(1)
+)
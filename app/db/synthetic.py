@@ -0,0 +1,268 @@
+"""
+Synthetic dataset generator for capacity testing.
+
+generate() appends users, resumes and deep resume_history chains to the
+database behind an engine. Counts per user and per resume are drawn from
+log-normal distributions, so a few users own many resumes and a few resumes
+carry very long histories, as in production. Text is cut from a generated
+corpus at log-normal lengths, and history timestamps are increasing within each
+resume and spread over the requested period.
+
+Rows bypass the ORM: they are streamed in batches through COPY ... FROM STDIN
+on PostgreSQL and executemany() on SQLite, committing once per batch, so memory
+stays flat however many rows are produced. user_stats rows are written
+alongside, and the id sequences are moved past the generated ids at the end.
+On a partitioned resume_history, rows older than the existing monthly
+partitions land in the DEFAULT partition.
+"""
+import csv
+import io
+import math
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.core.security import get_password_hash
+from app.crud.resume import IMPROVED_SUFFIX
+
+EMAIL_TEMPLATE = "synthetic-{id}@example.com"
+MIN_TEXT_LENGTH = 40
+CORPUS_LENGTH = 1 << 21
+
+TITLES = (
+    "Software Engineer", "Senior Backend Developer", "Data Analyst", "Product Manager",
+    "DevOps Engineer", "UX Designer", "Marketing Specialist", "Accountant",
+    "Project Coordinator", "Machine Learning Engineer", "Sales Representative", "QA Engineer",
+)
+WORDS = (
+    "led", "built", "designed", "improved", "managed", "delivered", "migrated", "reduced",
+    "increased", "automated", "mentored", "launched", "scaled", "owned", "analysed", "shipped",
+    "team", "platform", "service", "pipeline", "customers", "revenue", "latency", "costs",
+    "python", "postgres", "kubernetes", "react", "aws", "api", "dashboard", "reports",
+    "experience", "years", "project", "stakeholders", "quality", "performance", "release",
+    "the", "a", "of", "and", "to", "with", "for", "across", "by", "in", "over", "per",
+    "10%", "30%", "2x", "5", "12", "monthly", "daily", "cross-functional", "agile", "roadmap",
+)
+
+# (table, columns) in foreign key order; batches are flushed in this order
+TABLES: Sequence[Tuple[str, Tuple[str, ...]]] = (
+    ("users", ("id", "email", "hashed_password", "is_active", "created_at")),
+    ("resumes", ("id", "title", "content", "user_id", "created_at", "updated_at", "version")),
+    ("resume_history", ("id", "resume_id", "content", "improved_content", "created_at")),
+    ("user_stats", ("user_id", "resume_count", "history_count", "improvement_count", "last_edited_at")),
+)
+SEQUENCE_TABLES = ("users", "resumes", "resume_history")
+
+
+@dataclass
+class SyntheticConfig:
+    users: int = 1000
+    # Means of the per-user and per-resume distributions; skew is the
+    # log-normal sigma (0 gives every user/resume the mean)
+    resumes_per_user: float = 3.0
+    max_resumes_per_user: int = 200
+    history_per_resume: float = 20.0
+    max_history_per_resume: int = 5000
+    skew: float = 1.0
+    # Median content length in characters
+    text_length: int = 2500
+    max_text_length: int = 50000
+    improve_ratio: float = 0.2
+    days: int = 730
+    password: str = "synthetic-password"
+    seed: int = 42
+    batch_size: int = 20000
+
+
+@dataclass
+class GenerationReport:
+    users: int = 0
+    resumes: int = 0
+    history: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows(self) -> int:
+        return self.users + self.resumes + self.history
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def skewed_count(rng: random.Random, mean: float, sigma: float, minimum: int, maximum: int) -> int:
+    """Log-normal integer with roughly the given mean, clamped to [minimum, maximum]"""
+    if mean <= 0:
+        return minimum
+    value = rng.lognormvariate(math.log(mean) - sigma * sigma / 2, sigma) if sigma > 0 else mean
+    return min(maximum, max(minimum, int(value + 0.5)))
+
+
+def build_corpus(rng: random.Random, length: int = CORPUS_LENGTH) -> str:
+    lines = []
+    total = 0
+    while total < length:
+        line = " ".join(rng.choices(WORDS, k=rng.randint(6, 18))).capitalize() + "."
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines)
+
+
+def _sqlite_time(timestamp: float) -> str:
+    # The format SQLAlchemy's SQLite DateTime type reads back
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def _postgres_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+class _SQLiteWriter:
+    def __init__(self, connection):
+        self.cursor = connection.cursor()
+        # A throwaway load: trade crash safety for speed
+        self.cursor.execute("PRAGMA synchronous = OFF")
+
+    def write(self, table: str, columns: Sequence[str], rows: List[tuple]) -> None:
+        placeholders = ", ".join("?" for _ in columns)
+        self.cursor.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows
+        )
+
+
+class _PostgresWriter:
+    def __init__(self, connection):
+        self.cursor = connection.cursor()
+
+    def write(self, table: str, columns: Sequence[str], rows: List[tuple]) -> None:
+        # CSV COPY reads an unquoted empty field as NULL
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        self.cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+
+
+def _next_ids(engine: Engine) -> Dict[str, int]:
+    with engine.connect() as connection:
+        return {
+            table: connection.execute(text(f"SELECT COALESCE(MAX(id), 0) FROM {table}")).scalar() + 1
+            for table in SEQUENCE_TABLES
+        }
+
+
+def _advance_sequences(engine: Engine) -> None:
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as connection:
+        for table in SEQUENCE_TABLES:
+            connection.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), MAX(id)) "
+                f"FROM {table} HAVING MAX(id) IS NOT NULL"
+            ))
+
+
+def generate(
+    engine: Engine,
+    config: SyntheticConfig,
+    progress: Optional[Callable[[GenerationReport], None]] = None
+) -> GenerationReport:
+    """Append a synthetic dataset; progress is called after every committed batch"""
+    rng = random.Random(config.seed)
+    corpus = build_corpus(rng, max(CORPUS_LENGTH, 2 * config.max_text_length))
+    corpus_end = len(corpus)
+    text_mu = math.log(max(config.text_length, MIN_TEXT_LENGTH))
+    max_text = min(config.max_text_length, corpus_end)
+    # One hash for everyone: hashing per user would dominate the run
+    hashed_password = get_password_hash(config.password)
+    timestamp = _postgres_time if engine.dialect.name == "postgresql" else _sqlite_time
+
+    ids = _next_ids(engine)
+    user_id, resume_id, history_id = ids["users"], ids["resumes"], ids["resume_history"]
+    now = time.time()
+    start = now - config.days * 86400
+
+    def random_text() -> str:
+        length = min(max_text, max(MIN_TEXT_LENGTH, int(rng.lognormvariate(text_mu, 0.5))))
+        offset = rng.randrange(corpus_end - length + 1)
+        return corpus[offset:offset + length]
+
+    report = GenerationReport()
+    started = time.perf_counter()
+    raw = engine.raw_connection()
+    try:
+        writer = _PostgresWriter(raw) if engine.dialect.name == "postgresql" else _SQLiteWriter(raw)
+        batches: List[List[tuple]] = [[] for _ in TABLES]
+        users, resumes, history, stats = batches
+
+        def flush() -> None:
+            for (table, columns), rows in zip(TABLES, batches):
+                if rows:
+                    writer.write(table, columns, rows)
+                    rows.clear()
+            raw.commit()
+            report.seconds = time.perf_counter() - started
+            if progress is not None:
+                progress(report)
+
+        for _ in range(config.users):
+            user_created = rng.uniform(start, now)
+            users.append((user_id, EMAIL_TEMPLATE.format(id=user_id), hashed_password, True, timestamp(user_created)))
+            resume_count = skewed_count(
+                rng, config.resumes_per_user, config.skew, 0, config.max_resumes_per_user
+            )
+            user_history = user_improvements = 0
+            last_edited = None
+            for _ in range(resume_count):
+                created = rng.uniform(user_created, now)
+                edits = skewed_count(
+                    rng, config.history_per_resume, config.skew, 1, config.max_history_per_resume
+                ) - 1
+                content = random_text()
+                history.append((history_id, resume_id, content, None, timestamp(created)))
+                history_id += 1
+                for edited_at in sorted(rng.uniform(created, now) for _ in range(edits)):
+                    if rng.random() < config.improve_ratio:
+                        improved = content + IMPROVED_SUFFIX
+                        user_improvements += 1
+                    else:
+                        improved = random_text()
+                    history.append((history_id, resume_id, content, improved, timestamp(edited_at)))
+                    history_id += 1
+                    content = improved
+                updated = edited_at if edits else None
+                resumes.append((
+                    resume_id, rng.choice(TITLES), content, user_id, timestamp(created),
+                    timestamp(updated) if updated else None, edits + 1,
+                ))
+                resume_id += 1
+                user_history += edits + 1
+                last_edited = max(last_edited or 0, updated or created)
+                if len(history) >= config.batch_size:
+                    flush()
+            stats.append((
+                user_id, resume_count, user_history, user_improvements,
+                timestamp(last_edited) if last_edited else None,
+            ))
+            report.users += 1
+            report.resumes += resume_count
+            report.history += user_history
+            user_id += 1
+            if len(users) >= config.batch_size or len(resumes) >= config.batch_size:
+                flush()
+        flush()
+    except BaseException:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+
+    _advance_sequences(engine)
+    report.seconds = time.perf_counter() - started
+    return report
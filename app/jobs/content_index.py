@@ -0,0 +1,66 @@
+"""
+Background indexing of resume content.
+
+Edits made through the crud keep each resume's terms, MinHash signature and
+LSH buckets up to date (crud.resume.index_content). Resumes from before these
+existed, or written behind the crud's back (shard moves, manual fixes), are
+indexed here instead of on the request path: index_stale_resumes() walks the
+resumes in id order, CONTENT_INDEX_BATCH_SIZE per transaction, and indexes
+those whose signature is missing or older than the resume. It runs once when a
+worker starts. index_content() locks the resumes it indexes, so concurrent
+runs in several workers wait for each other on a resume and then index it
+again rather than failing; a run that read a resume before an edit leaves the
+edit's index alone.
+"""
+import logging
+from collections import defaultdict
+from typing import Callable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud.resume import index_content
+from app.models.resume import Resume, ResumeSignature
+
+logger = logging.getLogger(__name__)
+
+
+def index_stale_resumes(
+    session_factory: Callable[[], Session],
+    batch_size: Optional[int] = None
+) -> int:
+    """Index every resume whose signature is missing or stale; returns how many were indexed"""
+    batch_size = batch_size or settings.CONTENT_INDEX_BATCH_SIZE
+    indexed = 0
+    last_id = 0
+    db = session_factory()
+    try:
+        while True:
+            rows = db.execute(
+                select(Resume.id, Resume.user_id, Resume.version, Resume.content)
+                .outerjoin(ResumeSignature, ResumeSignature.resume_id == Resume.id)
+                .where(Resume.id > last_id, Resume.user_id.is_not(None))
+                .where((ResumeSignature.version.is_(None)) | (ResumeSignature.version != Resume.version))
+                .order_by(Resume.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                return indexed
+
+            by_user = defaultdict(list)
+            for row in rows:
+                by_user[row.user_id].append((row.id, row.version, row.content))
+            for user_id, resumes in by_user.items():
+                index_content(db, user_id, resumes)
+            db.commit()
+            indexed += len(rows)
+            last_id = rows[-1].id
+    except Exception:
+        db.rollback()
+        logger.exception("Content indexing failed; it will be retried on the next restart")
+        return indexed
+    finally:
+        if indexed:
+            logger.info(f"Indexed the content of {indexed} resumes")
+        db.close()
@@ -0,0 +1,24 @@
+"""
+Keeps monthly resume_history partitions created ahead of time on PostgreSQL.
+"""
+import asyncio
+import logging
+
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+
+from app.db.partitions import ensure_history_partitions
+
+logger = logging.getLogger(__name__)
+
+CHECK_INTERVAL_SECONDS = 24 * 60 * 60
+
+
+async def partition_maintenance_loop(engine: Engine, months_ahead: int) -> None:
+    """Ensure upcoming partitions at startup and once a day afterwards"""
+    while True:
+        try:
+            await run_in_threadpool(ensure_history_partitions, engine, months_ahead)
+        except Exception as e:
+            logger.error(f"resume_history partition maintenance failed: {str(e)}")
+        await asyncio.sleep(CHECK_INTERVAL_SECONDS)
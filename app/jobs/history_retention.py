@@ -0,0 +1,300 @@
+"""
+Resume history retention.
+
+Thins old resume_history rows according to a tiered policy (every version for a
+while, then one per day, then one per month) and optionally moves the thinned
+rows into the compressed resume_history_archive table. The job walks resumes in
+id order, one bounded transaction per chunk, and records its position in
+job_checkpoints so an interrupted run picks up where it stopped.
+"""
+import asyncio
+import json
+import logging
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.crud.stats import bump_user_stats, recompute_user_stats
+from app.db.partitions import drop_history_partitions_before
+from app.models.job import JobCheckpoint
+from app.models.resume import Resume, ResumeHistory, ResumeHistoryArchive
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = "history_retention"
+DELETE_BATCH_SIZE = 500
+# Arbitrary constant identifying this job for pg_try_advisory_xact_lock
+ADVISORY_LOCK_KEY = 727_001
+
+_DROP = ("drop",)
+
+
+@dataclass
+class RetentionPolicy:
+    keep_all_days: int = 30
+    daily_days: int = 365
+    monthly_days: int = 0  # 0 keeps one version per month forever
+
+    @classmethod
+    def from_settings(cls) -> "RetentionPolicy":
+        return cls(
+            keep_all_days=settings.HISTORY_RETENTION_KEEP_ALL_DAYS,
+            daily_days=settings.HISTORY_RETENTION_DAILY_DAYS,
+            monthly_days=settings.HISTORY_RETENTION_MONTHLY_DAYS,
+        )
+
+    def keep_all_cutoff(self, now: datetime) -> datetime:
+        return now - timedelta(days=self.keep_all_days)
+
+    def bucket(self, created_at: datetime, now: datetime) -> Optional[tuple]:
+        """
+        Return the bucket a version belongs to, or None if it is young enough to
+        be kept unconditionally. Only the newest version of each bucket survives.
+        """
+        age = now - created_at
+        if age < timedelta(days=self.keep_all_days):
+            return None
+        if age < timedelta(days=self.daily_days):
+            return ("day", created_at.date())
+        if self.monthly_days and age >= timedelta(days=self.monthly_days):
+            return _DROP
+        return ("month", created_at.year, created_at.month)
+
+
+@dataclass
+class RetentionStats:
+    resumes_scanned: int = 0
+    versions_removed: int = 0
+    versions_archived: int = 0
+    chunks: int = 0
+    finished: bool = False
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes even for timezone-aware columns
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def select_victims(
+    rows: Iterable[Tuple[int, int, datetime]],
+    policy: RetentionPolicy,
+    now: datetime
+) -> List[int]:
+    """
+    Given (id, resume_id, created_at) rows ordered newest first within each
+    resume, return the ids the policy no longer wants to keep.
+    """
+    seen = set()
+    victims = []
+    for history_id, resume_id, created_at in rows:
+        bucket = policy.bucket(_as_utc(created_at), now)
+        if bucket is None:
+            continue
+        if bucket == _DROP:
+            victims.append(history_id)
+            continue
+        key = (resume_id, bucket)
+        if key in seen:
+            victims.append(history_id)
+        else:
+            seen.add(key)
+    return victims
+
+
+def _batches(ids: Sequence[int], size: int) -> Iterable[Sequence[int]]:
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def _archive(db: Session, ids: Sequence[int]) -> int:
+    rows = db.execute(
+        select(
+            ResumeHistory.id,
+            ResumeHistory.resume_id,
+            ResumeHistory.content,
+            ResumeHistory.improved_content,
+            ResumeHistory.created_at,
+        ).where(ResumeHistory.id.in_(ids))
+    ).all()
+    db.bulk_insert_mappings(ResumeHistoryArchive, [
+        {
+            "id": row.id,
+            "resume_id": row.resume_id,
+            "created_at": row.created_at,
+            "payload": zlib.compress(
+                json.dumps({"content": row.content, "improved_content": row.improved_content}).encode("utf-8"),
+                9
+            ),
+        }
+        for row in rows
+    ])
+    return len(rows)
+
+
+def load_archived_version(archived: ResumeHistoryArchive) -> Dict[str, Optional[str]]:
+    """Decompress an archived version back into its content fields"""
+    return json.loads(zlib.decompress(archived.payload).decode("utf-8"))
+
+
+def _get_checkpoint(db: Session) -> JobCheckpoint:
+    checkpoint = db.get(JobCheckpoint, JOB_NAME)
+    if checkpoint is None:
+        checkpoint = JobCheckpoint(name=JOB_NAME, position=0)
+        db.add(checkpoint)
+        db.flush()
+    return checkpoint
+
+
+def _try_lock(db: Session) -> bool:
+    # Keeps two workers (or a worker and the CLI) from thinning the same chunk
+    if db.bind.dialect.name != "postgresql":
+        return True
+    return bool(db.execute(
+        text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY}
+    ).scalar())
+
+
+def reset_checkpoint(session_factory: Callable[[], Session]) -> None:
+    db = session_factory()
+    try:
+        _get_checkpoint(db).position = 0
+        db.commit()
+    finally:
+        db.close()
+
+
+def _uncount(db: Session, history_ids: Sequence[int]) -> None:
+    """Take the removed versions off their owners' dashboard history counts"""
+    removed_per_user = db.execute(
+        select(Resume.user_id, func.count())
+        .join(ResumeHistory, ResumeHistory.resume_id == Resume.id)
+        .where(ResumeHistory.id.in_(history_ids))
+        .group_by(Resume.user_id)
+    ).all()
+    for user_id, removed in removed_per_user:
+        bump_user_stats(db, user_id, history=-removed, edited=False)
+
+
+def run_retention(
+    session_factory: Callable[[], Session],
+    policy: Optional[RetentionPolicy] = None,
+    chunk_size: Optional[int] = None,
+    archive: Optional[bool] = None,
+    max_chunks: Optional[int] = None,
+    dry_run: bool = False,
+    now: Optional[datetime] = None
+) -> RetentionStats:
+    """
+    Process resumes from the saved checkpoint onwards, committing once per chunk.
+    Stops after max_chunks chunks (resumable later) or once every resume has been
+    visited, in which case the checkpoint wraps back to the start.
+    """
+    policy = policy or RetentionPolicy.from_settings()
+    chunk_size = chunk_size or settings.HISTORY_RETENTION_CHUNK_SIZE
+    archive = settings.HISTORY_RETENTION_ARCHIVE if archive is None else archive
+    now = now or datetime.now(timezone.utc)
+    cutoff = policy.keep_all_cutoff(now)
+    stats = RetentionStats()
+    position = None
+
+    if policy.monthly_days and not archive and not dry_run:
+        # Whole monthly partitions past the window go in one catalog operation
+        # instead of row-by-row deletes (no-op unless resume_history is partitioned)
+        db = session_factory()
+        try:
+            engine = db.get_bind()
+        finally:
+            db.close()
+        expired_before = (now - timedelta(days=policy.monthly_days)).date()
+        dropped = drop_history_partitions_before(engine, expired_before)
+        for name in dropped:
+            logger.info(f"Dropped expired history partition {name}")
+        if dropped:
+            db = session_factory()
+            try:
+                recompute_user_stats(db)
+                db.commit()
+            finally:
+                db.close()
+
+    while max_chunks is None or stats.chunks < max_chunks:
+        db = session_factory()
+        try:
+            if not _try_lock(db):
+                logger.info("History retention already running elsewhere, skipping")
+                break
+
+            checkpoint = _get_checkpoint(db)
+            if position is None:
+                position = checkpoint.position
+            resume_ids = db.scalars(
+                select(Resume.id)
+                .where(Resume.id > position)
+                .order_by(Resume.id)
+                .limit(chunk_size)
+            ).all()
+            if not resume_ids:
+                if not dry_run:
+                    checkpoint.position = 0
+                    db.commit()
+                stats.finished = True
+                break
+
+            rows = db.execute(
+                select(ResumeHistory.id, ResumeHistory.resume_id, ResumeHistory.created_at)
+                .where(
+                    ResumeHistory.resume_id.in_(resume_ids),
+                    ResumeHistory.created_at < cutoff,
+                )
+                .order_by(
+                    ResumeHistory.resume_id,
+                    ResumeHistory.created_at.desc(),
+                    ResumeHistory.id.desc(),
+                )
+            ).all()
+            victims = select_victims(rows, policy, now)
+            position = resume_ids[-1]
+
+            if dry_run:
+                db.rollback()
+            else:
+                for batch in _batches(victims, DELETE_BATCH_SIZE):
+                    if archive:
+                        stats.versions_archived += _archive(db, batch)
+                    _uncount(db, batch)
+                    db.execute(delete(ResumeHistory).where(ResumeHistory.id.in_(batch)))
+                checkpoint.position = position
+                db.commit()
+
+            stats.chunks += 1
+            stats.resumes_scanned += len(resume_ids)
+            stats.versions_removed += len(victims)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    logger.info(
+        "History retention: scanned %d resumes, removed %d versions (%d archived)",
+        stats.resumes_scanned, stats.versions_removed, stats.versions_archived
+    )
+    return stats
+
+
+async def retention_loop(session_factory: Callable[[], Session], interval_minutes: int) -> None:
+    """Background task that runs a full retention pass every interval_minutes"""
+    while True:
+        await asyncio.sleep(interval_minutes * 60)
+        try:
+            await run_in_threadpool(run_retention, session_factory)
+        except Exception as e:
+            logger.error(f"History retention run failed: {str(e)}")
@@ -0,0 +1,79 @@
+"""
+Background purge of deleted resumes.
+
+Deleting a resume with a very long history only detaches it from its owner
+(user_id set to NULL, see crud.resume.delete_resume), which takes constant time
+and already hides it from every query. purge_detached_resumes() then removes the
+history in batches of RESUME_PURGE_BATCH_SIZE rows, each in its own short
+transaction that also lowers the former owner's history count by the rows it
+removed, and finally the resume row itself. It is scheduled after such a
+delete and run once when a worker starts, to finish purges interrupted by a
+restart. Concurrent runs are harmless: a row deleted twice is deleted once.
+"""
+import logging
+from typing import Callable, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud.resume import delete_dependants
+from app.crud.stats import bump_user_stats
+from app.models.resume import Resume, ResumeHistory
+
+logger = logging.getLogger(__name__)
+
+
+def purge_detached_resumes(
+    session_factory: Callable[[], Session],
+    batch_size: Optional[int] = None
+) -> int:
+    """Delete every detached resume and its history; returns how many were purged"""
+    batch_size = batch_size or settings.RESUME_PURGE_BATCH_SIZE
+    purged = 0
+    db = session_factory()
+    try:
+        while True:
+            detached = db.execute(
+                select(Resume.id, Resume.detached_user_id)
+                .where(Resume.user_id.is_(None))
+                .order_by(Resume.id)
+                .limit(1)
+            ).first()
+            if detached is None:
+                return purged
+            resume_id, owner_id = detached
+
+            removed = batch_size
+            while removed == batch_size:
+                batch = (
+                    select(ResumeHistory.id)
+                    .where(ResumeHistory.resume_id == resume_id)
+                    .limit(batch_size)
+                    .scalar_subquery()
+                )
+                removed = db.execute(
+                    delete(ResumeHistory)
+                    .where(ResumeHistory.id.in_(batch))
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                if owner_id is not None and removed:
+                    bump_user_stats(db, owner_id, history=-removed, edited=False)
+                db.commit()
+
+            if db.bind.dialect.name == "sqlite":
+                delete_dependants(db, resume_id)
+            db.execute(
+                delete(Resume)
+                .where(Resume.id == resume_id, Resume.user_id.is_(None))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            purged += 1
+            logger.info(f"Purged deleted resume {resume_id}")
+    except Exception:
+        db.rollback()
+        logger.exception("Resume purge failed; it will be retried on the next delete or restart")
+        return purged
+    finally:
+        db.close()
@@ -0,0 +1,206 @@
+"""
+Shard rebalancing.
+
+plan_moves() lists users whose data is not where the placement rule wants it:
+users from before sharding was enabled (still in the directory database) and,
+after a shard was added, users the rule now assigns elsewhere. move_users()
+relocates them one at a time:
+
+1. the directory marks the user as moving, and the mover waits out every
+   worker's cached assignment (SHARD_DIRECTORY_CACHE_SECONDS), after which the
+   user's requests get 503 + Retry-After instead of touching either copy;
+2. resumes, history, archived history and stats are copied to the target in
+   batches (resumes get new ids there: ids are only unique per database);
+3. the directory points the user at the target and clears the flag;
+4. the source copy is detached and purged like a deleted resume.
+
+A move that fails part way leaves the user on the source, still flagged; it is
+retried from the start (the target copy is cleared first) by the next run.
+Stored idempotency responses are not carried over.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.db.sharding import DIRECTORY, ShardRouter, copy_user
+from app.jobs.resume_purge import purge_detached_resumes
+from app.models.idempotency import IdempotencyKey
+from app.models.resume import Resume, ResumeHistory, ResumeHistoryArchive
+from app.models.shard import UserShard
+from app.models.stats import UserStats
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+COPY_BATCH_SIZE = 1000
+
+
+@dataclass
+class MoveStats:
+    users: int = 0
+    resumes: int = 0
+    history: int = 0
+
+
+def plan_moves(router: ShardRouter, limit: Optional[int] = None) -> Iterator[Tuple[int, str, str]]:
+    """(user id, current shard, target shard) for every misplaced user, in id order"""
+    found = 0
+    last_id = 0
+    with router.directory_session() as db:
+        while limit is None or found < limit:
+            rows = db.execute(
+                select(User.id, UserShard.shard, UserShard.moving)
+                .outerjoin(UserShard, UserShard.user_id == User.id)
+                .where(User.id > last_id)
+                .order_by(User.id)
+                .limit(COPY_BATCH_SIZE)
+            ).all()
+            if not rows:
+                return
+            for user_id, shard, moving in rows:
+                last_id = user_id
+                current = shard or DIRECTORY
+                target = router.place(user_id)
+                if current != target or moving:
+                    yield user_id, current, target
+                    found += 1
+                    if limit is not None and found >= limit:
+                        return
+
+
+def _set_assignment(directory: Session, user_id: int, shard: str, moving: bool) -> None:
+    updated = directory.execute(
+        update(UserShard)
+        .where(UserShard.user_id == user_id)
+        .values(shard=shard, moving=moving)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not updated:
+        directory.add(UserShard(user_id=user_id, shard=shard, moving=moving))
+    directory.commit()
+
+
+def _clear_user_data(db: Session, user_id: int) -> None:
+    """Remove a user's resumes from a database, through the background purge path"""
+    db.execute(
+        update(Resume)
+        .where(Resume.user_id == user_id)
+        .values(user_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    for model in (UserStats, IdempotencyKey):
+        db.execute(delete(model).where(model.user_id == user_id))
+    db.commit()
+
+
+def _copy_rows(source: Session, target: Session, model, columns, resume_id: int, new_resume_id: int) -> int:
+    result = source.execute(
+        select(*(getattr(model, column) for column in columns))
+        .where(model.resume_id == resume_id)
+        .order_by(model.id)
+        .execution_options(yield_per=COPY_BATCH_SIZE)
+    )
+    copied = 0
+    for batch in result.partitions():
+        target.execute(insert(model), [
+            {"resume_id": new_resume_id, **dict(zip(columns, row))} for row in batch
+        ])
+        copied += len(batch)
+    return copied
+
+
+def _copy_user_data(router: ShardRouter, user_id: int, source_name: str, target_name: str, stats: MoveStats) -> None:
+    source = router.session_factory(source_name)()
+    target = router.session_factory(target_name)()
+    try:
+        with router.directory_session() as directory:
+            user = directory.get(User, user_id)
+            target.merge(copy_user(user))
+        target.commit()
+
+        resumes = source.execute(
+            select(Resume.id, Resume.title, Resume.content, Resume.created_at, Resume.updated_at, Resume.version)
+            .where(Resume.user_id == user_id)
+            .order_by(Resume.id)
+        ).all()
+        for resume in resumes:
+            new_id = target.scalar(
+                insert(Resume).values(
+                    title=resume.title, content=resume.content, user_id=user_id,
+                    created_at=resume.created_at, updated_at=resume.updated_at, version=resume.version
+                ).returning(Resume.id)
+            )
+            stats.history += _copy_rows(
+                source, target, ResumeHistory, ("content", "improved_content", "created_at"), resume.id, new_id
+            )
+            _copy_rows(
+                source, target, ResumeHistoryArchive, ("created_at", "archived_at", "payload"), resume.id, new_id
+            )
+            # One transaction per resume keeps them short; a failed move is redone from scratch
+            target.commit()
+            stats.resumes += 1
+
+        user_stats = source.get(UserStats, user_id)
+        if user_stats is not None:
+            target.merge(UserStats(
+                user_id=user_id,
+                resume_count=user_stats.resume_count,
+                history_count=user_stats.history_count,
+                improvement_count=user_stats.improvement_count,
+                last_edited_at=user_stats.last_edited_at,
+            ))
+            target.commit()
+    finally:
+        source.close()
+        target.close()
+
+
+def move_users(
+    router: ShardRouter,
+    moves: List[Tuple[int, str, str]],
+    settle_seconds: Optional[float] = None
+) -> MoveStats:
+    """Move each (user id, source, target); flags them all first so only one settle wait is needed"""
+    stats = MoveStats()
+    if not moves:
+        return stats
+    with router.directory_session() as directory:
+        for user_id, source, _ in moves:
+            _set_assignment(directory, user_id, source, moving=True)
+    for user_id, _, _ in moves:
+        router.invalidate(user_id)
+    time.sleep(router.cache_seconds if settle_seconds is None else settle_seconds)
+
+    for user_id, source, target in moves:
+        target_factory = router.session_factory(target)
+        if target_factory.kw["bind"] is router.session_factory(source).kw["bind"]:
+            # Same database under another name: nothing to copy
+            with router.directory_session() as directory:
+                _set_assignment(directory, user_id, target, moving=False)
+            router.invalidate(user_id)
+            stats.users += 1
+            continue
+        # Leftovers of an earlier failed attempt
+        with target_factory() as target_db:
+            _clear_user_data(target_db, user_id)
+        purge_detached_resumes(target_factory)
+
+        _copy_user_data(router, user_id, source, target, stats)
+        with router.directory_session() as directory:
+            _set_assignment(directory, user_id, target, moving=False)
+        router.invalidate(user_id)
+
+        source_factory = router.session_factory(source)
+        with source_factory() as source_db:
+            _clear_user_data(source_db, user_id)
+            if source != DIRECTORY and source_factory.kw["bind"] is not router.directory_engine:
+                source_db.execute(delete(User).where(User.id == user_id))
+                source_db.commit()
+        purge_detached_resumes(source_factory)
+        stats.users += 1
+        logger.info(f"Moved user {user_id} from {source} to {target}")
+    return stats
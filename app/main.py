@@ -1,5 +1,4 @@
 from fastapi import FastAPI, Request, Depends, HTTPException, status
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.authentication import AuthenticationMiddleware
@@ -9,6 +8,8 @@ from fastapi.security import OAuth2PasswordBearer
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from contextlib import asynccontextmanager
+import asyncio
 import os
 import logging
 from .core.config import settings
@@ -19,13 +20,59 @@ setup_logging()
 logger = logging.getLogger(__name__)
 
 from . import crud, models, schemas
-from .db.base import Base, engine, get_db
+from .db.base import Base, engine, get_db, SessionLocal
 from .core.security import get_current_active_user, get_current_user_from_token
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI(title="Resume Manager API", version="1.0.0")
+from .jobs import content_index, history_retention, history_partitions, resume_purge
+from .core.events import broker as events_broker
+from .core.improvement import shutdown_pool as shutdown_improvement_pool
+from .core.assets import PrecompressedStaticFiles, asset_url
+from .core.request_context import RequestContextMiddleware
+from .core.tracing import trace_templates
+from .db.slow_queries import install_slow_query_log
+from .db.readiness import readiness
+from .db.history_buffer import history_buffer
+from .db.sharding import shard_router
+
+# Create database tables (on the directory and every shard)
+for database in shard_router.engines():
+    Base.metadata.create_all(bind=database)
+    install_slow_query_log(database)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    events_broker.start(engine)
+    databases = {name: factory.kw["bind"] for name, factory in shard_router.session_factories().items()}
+    background_tasks = [asyncio.create_task(readiness.run(databases))]
+    # History maintenance runs against every database holding resumes
+    for session_factory in shard_router.session_factories().values():
+        database = session_factory.kw["bind"]
+        # Finish purges of deleted resumes that a restart interrupted
+        background_tasks.append(asyncio.create_task(
+            asyncio.to_thread(resume_purge.purge_detached_resumes, session_factory)
+        ))
+        # Index resumes that duplicate detection has not seen yet
+        background_tasks.append(asyncio.create_task(
+            asyncio.to_thread(content_index.index_stale_resumes, session_factory)
+        ))
+        if settings.HISTORY_PARTITION_MONTHS_AHEAD > 0 and database.dialect.name == "postgresql":
+            background_tasks.append(asyncio.create_task(
+                history_partitions.partition_maintenance_loop(database, settings.HISTORY_PARTITION_MONTHS_AHEAD)
+            ))
+        if settings.HISTORY_RETENTION_INTERVAL_MINUTES > 0:
+            background_tasks.append(asyncio.create_task(
+                history_retention.retention_loop(session_factory, settings.HISTORY_RETENTION_INTERVAL_MINUTES)
+            ))
+
+    yield
+
+    for task in background_tasks:
+        task.cancel()
+    events_broker.stop()
+    shutdown_improvement_pool()
+    # Write the history rows still queued by the write-behind buffer
+    await asyncio.to_thread(history_buffer.close)
+
+app = FastAPI(title="Resume Manager API", version="1.0.0", lifespan=lifespan)
 
 # Setup CORS
 app.add_middleware(
@@ -42,25 +89,31 @@ app.add_middleware(
     backend=JWTAuthBackend()
 )
 
+# Exposes the route being served to engine events and logging
+app.add_middleware(RequestContextMiddleware)
+
 # Include API routers
-from .api import auth, resume, health
+from .api import auth, resume, health, admin
 from .views import resume_views
 
 # Include routers
 app.include_router(health.router, prefix="/api")
 app.include_router(auth.router)
 app.include_router(resume.router, prefix="/api")
+app.include_router(admin.router, prefix="/api")
 app.include_router(resume_views.router)
 
-# Mount static files
+# Mount static files (fingerprinted build output under /static/dist, see build_assets.py)
 static_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
 os.makedirs(static_dir, exist_ok=True)
-app.mount("/static", StaticFiles(directory=static_dir), name="static")
+app.mount("/static", PrecompressedStaticFiles(directory=static_dir), name="static")
 
 # Setup templates
 import os
 templates_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
 templates = Jinja2Templates(directory=templates_dir)
+templates.env.globals["asset_url"] = asset_url
+trace_templates(templates.env)
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
@@ -110,19 +163,19 @@ async def register_page(request: Request):
 @app.get("/dashboard", response_class=HTMLResponse)
 async def dashboard_page(
     request: Request,
+    db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
     # If we get here, the user is authenticated
     try:
-        # Get the user's resumes
-        db = next(get_db())
-        resumes = db.query(models.Resume).filter(
-            models.Resume.user_id == current_user.id
-        ).order_by(models.Resume.updated_at.desc()).all()
+        # Counters plus a fixed number of recent resumes: cost doesn't grow with the account
+        stats = crud.get_user_stats(db, current_user.id)
+        resumes = crud.get_recent_resumes(db, current_user.id, limit=settings.DASHBOARD_RECENT_RESUMES)
         
         return templates.TemplateResponse("dashboard.html", {
             "request": request,
             "user": current_user,
+            "stats": stats,
             "resumes": resumes
         })
     except Exception as e:
@@ -1,6 +1,11 @@
 # Import all models here for proper initialization
 from app.models.user import User
-from app.models.resume import Resume, ResumeHistory
+from app.models.resume import Resume, ResumeHistory, ResumeHistoryArchive, ResumeTerms, ResumeSignature, ResumeLSHBucket
+from app.models.job import JobCheckpoint
+from app.models.stats import UserStats
+from app.models.token import RevokedToken
+from app.models.idempotency import IdempotencyKey
+from app.models.shard import UserShard
 
 # This makes sure SQLAlchemy discovers all models
-__all__ = ['User', 'Resume', 'ResumeHistory']
+__all__ = ['User', 'Resume', 'ResumeHistory', 'ResumeHistoryArchive', 'ResumeTerms', 'ResumeSignature', 'ResumeLSHBucket', 'JobCheckpoint', 'UserStats', 'RevokedToken', 'IdempotencyKey', 'UserShard']
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
+from app.db.base import Base
+
+class IdempotencyKey(Base):
+    """Outcome of a mutating request sent with an Idempotency-Key header, for replaying retries"""
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    # Hash of method, path and body; reusing a key for a different request is an error
+    request_hash = Column(String(64), nullable=False)
+    # NULL while the first request is still being processed
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    locked_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+class JobCheckpoint(Base):
+    """Resume position of a long-running maintenance job"""
+    __tablename__ = "job_checkpoints"
+
+    name = Column(String, primary_key=True)
+    position = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,28 +1,101 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, LargeBinary, Index, JSON, BigInteger, PrimaryKeyConstraint
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import column_property, relationship
 from app.db.base import Base
 
+# Characters of content exposed as Resume.snippet in list views
+SNIPPET_LENGTH = 100
+
 class Resume(Base):
     __tablename__ = "resumes"
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     content = Column(Text, nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # NULL while a deleted resume waits for its history to be purged in the
+    # background (see app/jobs/resume_purge.py); every query filters on the
+    # owner, so detached resumes are invisible
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    # Former owner of a detached resume, whose history count the purge lowers
+    # as it removes the rows
+    detached_user_id = Column(Integer, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Bumped on every title or content change
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Computed by the database, so list views can show them without reading content
+    content_length = column_property(func.length(content), deferred=True)
+    snippet = column_property(func.substr(content, 1, SNIPPET_LENGTH), deferred=True)
     
     user = relationship("User", back_populates="resumes")
-    history = relationship("ResumeHistory", back_populates="resume", cascade="all, delete-orphan")
+    # History rows are removed by ON DELETE CASCADE, never loaded to be deleted
+    history = relationship(
+        "ResumeHistory", back_populates="resume", cascade="all, delete-orphan", passive_deletes=True
+    )
+
+    __table_args__ = (
+        # Serves the dashboard's "most recently edited" query; updated_at is
+        # NULL until the first edit
+        Index("ix_resumes_user_id_edited_at", user_id, func.coalesce(updated_at, created_at)),
+    )
 
 class ResumeHistory(Base):
+    # On PostgreSQL this may be range-partitioned by month on created_at, with a
+    # (id, created_at) primary key (see app/db/partitions.py). ids come from a
+    # single sequence either way, so mapping the identity on id alone is safe.
     __tablename__ = "resume_history"
     
     id = Column(Integer, primary_key=True, index=True)
-    resume_id = Column(Integer, ForeignKey("resumes.id"), nullable=False)
+    resume_id = Column(Integer, ForeignKey("resumes.id", ondelete="CASCADE"), nullable=False)
     content = Column(Text, nullable=False)
     improved_content = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     resume = relationship("Resume", back_populates="history")
+
+    __table_args__ = (
+        Index("ix_resume_history_resume_id_created_at", "resume_id", "created_at"),
+    )
+
+class ResumeHistoryArchive(Base):
+    """Cold storage for history versions thinned out by the retention job"""
+    __tablename__ = "resume_history_archive"
+
+    id = Column(Integer, primary_key=True)
+    resume_id = Column(Integer, ForeignKey("resumes.id", ondelete="CASCADE"), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), nullable=True)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+    # zlib-compressed JSON of {"content": ..., "improved_content": ...}
+    payload = Column(LargeBinary, nullable=False)
+
+class ResumeTerms(Base):
+    """Term counts of a resume's content, kept for job matching (see app/core/matching.py)"""
+    __tablename__ = "resume_terms"
+
+    resume_id = Column(Integer, ForeignKey("resumes.id", ondelete="CASCADE"), primary_key=True)
+    # Resume.version the counts were computed from; older ones are recomputed on use
+    version = Column(Integer, nullable=False)
+    length = Column(Integer, nullable=False)
+    terms = Column(JSON, nullable=False)
+
+class ResumeSignature(Base):
+    """MinHash signature of a resume's content, for near-duplicate detection (see app/core/minhash.py)"""
+    __tablename__ = "resume_signatures"
+
+    resume_id = Column(Integer, ForeignKey("resumes.id", ondelete="CASCADE"), primary_key=True)
+    # Resume.version the signature was computed from
+    version = Column(Integer, nullable=False)
+    signature = Column(LargeBinary, nullable=False)
+
+class ResumeLSHBucket(Base):
+    """One row per LSH band of a resume's signature; a user's resumes sharing a bucket are candidate duplicates"""
+    __tablename__ = "resume_lsh_buckets"
+
+    # Owner of the resume, copied so that a lookup only reads its user's part of the index
+    user_id = Column(Integer, nullable=False)
+    bucket = Column(BigInteger, nullable=False)
+    resume_id = Column(Integer, ForeignKey("resumes.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    __table_args__ = (
+        PrimaryKeyConstraint("user_id", "bucket", "resume_id", name="pk_resume_lsh_buckets"),
+    )
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy.sql import func, false
+from app.db.base import Base
+
+class UserShard(Base):
+    """
+    User directory entry: the shard holding a user's data. Lives in the
+    directory database (DATABASE_URL). Users without a row predate sharding and
+    still have their data in the directory database.
+    """
+    __tablename__ = "user_shards"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    shard = Column(String(64), nullable=False, index=True)
+    # Set while the rebalancer copies the user's data; their requests get 503
+    moving = Column(Boolean, nullable=False, default=False, server_default=false())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
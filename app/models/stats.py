@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from app.db.base import Base
+
+class UserStats(Base):
+    """
+    Per-user dashboard counters, adjusted by the resume write paths in the same
+    transaction as the change itself (see app/crud/stats.py).
+    """
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    resume_count = Column(Integer, nullable=False, default=0, server_default="0")
+    history_count = Column(Integer, nullable=False, default=0, server_default="0")
+    improvement_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Most recent create/update/improve, including edits to since-deleted resumes
+    last_edited_at = Column(DateTime(timezone=True), nullable=True)
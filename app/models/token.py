@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+class RevokedToken(Base):
+    """Access tokens invalidated before their expiry (e.g. by logout), keyed by JWT id"""
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(32), primary_key=True)
+    # Rows can be purged once the token would have expired anyway
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    revoked_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
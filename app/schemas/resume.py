@@ -22,8 +22,20 @@ class ResumeInDB(ResumeBase):
     class Config:
         from_attributes = True
 
+class ResumeFields(BaseModel):
+    """A resume reduced to the fields selected with ?fields= (unselected ones are omitted)"""
+    id: Optional[int] = None
+    user_id: Optional[int] = None
+    title: Optional[str] = None
+    content: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    version: Optional[int] = None
+    content_length: Optional[int] = None
+    snippet: Optional[str] = None
+
 class ResumeHistoryBase(BaseModel):
-    id: int
+    id: Optional[int] = None  # None while still in the write-behind buffer (app/db/history_buffer.py)
     resume_id: int
     content: str
     improved_content: Optional[str] = None
@@ -46,7 +58,7 @@ class ResumeHistory(ResumeHistoryBase):
         orm_mode = True
 
 class ResumeWithHistory(ResumeInDB):
-    history: List[ResumeHistory] = []
+    history: List[ResumeHistoryBase] = []
     improved_content: Optional[str] = None
     created_at: datetime
 
@@ -55,3 +67,33 @@ class ResumeWithHistory(ResumeInDB):
 
 class ResumeImprove(BaseModel):
     content: str
+
+class ResumeImproveBatch(BaseModel):
+    resume_ids: List[int] = Field(..., min_length=1)
+
+class ResumeImproveBatchResult(BaseModel):
+    improved: List[ResumeInDB]
+    # Requested ids that are not the current user's resumes
+    missing: List[int] = []
+
+class ResumeMatchRequest(BaseModel):
+    job_description: str = Field(..., min_length=1, max_length=50000)
+    limit: int = Field(10, ge=1, le=100)
+
+class ResumeMatch(BaseModel):
+    id: int
+    title: str
+    # BM25 relevance; only comparable between resumes of the same request
+    score: float
+    matched_keywords: List[str]
+    missing_keywords: List[str]
+
+class SimilarResume(BaseModel):
+    id: int
+    title: str
+    # Estimated share of 3-word phrases the two resumes have in common
+    similarity: float
+
+class ResumeCreated(ResumeInDB):
+    # Near-duplicates of the new resume among the user's others
+    duplicates: List[SimilarResume] = []
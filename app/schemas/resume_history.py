@@ -1,6 +1,6 @@
 from datetime import datetime
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 class ResumeHistoryBase(BaseModel):
     content: str
@@ -11,7 +11,7 @@ class ResumeHistoryCreate(ResumeHistoryBase):
     resume_id: int
 
 class ResumeHistoryInDBBase(ResumeHistoryBase):
-    id: int
+    id: Optional[int] = None  # None while still in the write-behind buffer (app/db/history_buffer.py)
     resume_id: int
     
     class Config:
@@ -19,3 +19,18 @@ class ResumeHistoryInDBBase(ResumeHistoryBase):
 
 class ResumeHistory(ResumeHistoryInDBBase):
     pass
+
+class DiffChunk(BaseModel):
+    op: str  # "equal", "insert", "delete" or "skip"
+    text: str = ""
+    skipped: int = 0
+
+class ResumeDiff(BaseModel):
+    resume_id: int
+    from_version: int
+    to_version: Optional[int] = None  # None when compared against the current resume
+    granularity: str
+    chunks: List[DiffChunk]
+    insertions: int
+    deletions: int
+    truncated: bool = False
@@ -0,0 +1,292 @@
+"""
+Production launcher: python -m app.server
+
+The master process imports the application once, freezes the garbage collector
+so the imported objects are never touched again (keeping their memory pages
+shared copy-on-write with every worker), binds the listening socket and then
+forks uvicorn workers from that preloaded state. Workers skip the import cost
+entirely, so they start in milliseconds and share most of their RSS.
+
+Signals to the master:
+    SIGTERM / SIGINT  graceful shutdown (workers finish in-flight requests)
+    SIGHUP            graceful restart: fork a fresh set of workers, then retire the old ones
+    SIGTTIN / SIGTTOU add / remove one worker
+
+SIGHUP forks the new workers from the application and settings the master
+imported when it started, so it never loads new code or configuration; it only
+replaces the worker processes (fresh pools and caches). Deploying code or
+changing .env.prod takes a restart of the master itself (e.g. recreating the
+container).
+
+Each worker exits after WEB_MAX_REQUESTS requests plus a random jitter, so
+workers recycle at different times; the master replaces them as they exit.
+A worker that exits within WORKER_MIN_UPTIME seconds of its start failed to
+start (database down, broken configuration): its replacement is delayed
+exponentially, up to RESPAWN_BACKOFF_MAX seconds, and after
+WEB_MAX_STARTUP_FAILURES such failures in a row the master exits with status 1
+so that its supervisor can notice.
+"""
+import gc
+
+# Nothing allocated during import should be collected later; keeping the GC off
+# until the freeze avoids collections dirtying the pages we want to share.
+gc.disable()
+
+import logging
+import math
+import os
+import random
+import signal
+import socket
+import sys
+import time
+from typing import Dict, Optional
+
+import uvicorn
+
+from app.core.config import settings
+from app.main import app
+from app.db.sharding import shard_router
+
+logger = logging.getLogger("app.server")
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+WORKER_MIN_UPTIME = 5.0
+RESPAWN_BACKOFF_MIN = 0.5
+RESPAWN_BACKOFF_MAX = 30.0
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def available_cpus() -> float:
+    """CPUs this process may use, honouring affinity and cgroup (v2 or v1) quotas"""
+    try:
+        cpus = float(len(os.sched_getaffinity(0)))
+    except AttributeError:
+        cpus = float(os.cpu_count() or 1)
+
+    quota = None
+    cpu_max = _read(f"{CGROUP_ROOT}/cpu.max")
+    if cpu_max:
+        limit, period = cpu_max.split()
+        if limit != "max":
+            quota = int(limit) / int(period)
+    else:
+        limit, period = _read(f"{CGROUP_ROOT}/cpu/cpu.cfs_quota_us"), _read(f"{CGROUP_ROOT}/cpu/cpu.cfs_period_us")
+        if limit and period and int(limit) > 0:
+            quota = int(limit) / int(period)
+    return min(cpus, quota) if quota else cpus
+
+
+def memory_limit_bytes() -> Optional[int]:
+    """cgroup memory limit, or None when unlimited or unknown"""
+    for path in (f"{CGROUP_ROOT}/memory.max", f"{CGROUP_ROOT}/memory/memory.limit_in_bytes"):
+        value = _read(path)
+        if value and value != "max":
+            limit = int(value)
+            # cgroup v1 reports "unlimited" as a huge page-aligned number
+            if limit < 1 << 60:
+                return limit
+    return None
+
+
+def autotune_workers() -> int:
+    if settings.WEB_CONCURRENCY > 0:
+        return settings.WEB_CONCURRENCY
+    by_cpu = max(1, math.ceil(available_cpus() * settings.WEB_WORKERS_PER_CORE))
+    limit = memory_limit_bytes()
+    if limit is None:
+        return by_cpu
+    by_memory = max(1, limit // (settings.WEB_WORKER_MEMORY_MB * 1024 * 1024))
+    return int(min(by_cpu, by_memory))
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Master:
+    def __init__(self, sock: socket.socket, workers: int):
+        self.sock = sock
+        self.target = workers
+        self.workers: Dict[int, float] = {}  # pid -> start time
+        self.retiring: Dict[int, float] = {}  # pid -> deadline for graceful exit
+        self.stopping = False
+        self.pending_restart = False
+        # Workers in a row that exited before WORKER_MIN_UPTIME, and when the
+        # next one may be forked
+        self.startup_failures = 0
+        self.respawn_at = 0.0
+        self.exit_code = 0
+
+    # Signal handlers only set flags; the main loop does the work
+    def _on_stop(self, signum, frame):
+        self.stopping = True
+
+    def _on_restart(self, signum, frame):
+        self.pending_restart = True
+
+    def _on_more(self, signum, frame):
+        self.target += 1
+
+    def _on_fewer(self, signum, frame):
+        self.target = max(1, self.target - 1)
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = time.monotonic()
+            return
+        try:
+            run_worker(self.sock)
+        finally:
+            os._exit(0)
+
+    def retire(self, pid: int) -> None:
+        self.workers.pop(pid, None)
+        self.retiring[pid] = time.monotonic() + settings.WEB_GRACEFUL_TIMEOUT
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            self.retiring.pop(pid, None)
+
+    def reap(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pid in self.workers:
+                uptime = time.monotonic() - self.workers.pop(pid)
+                if uptime < WORKER_MIN_UPTIME:
+                    self.startup_failures += 1
+                    delay = min(RESPAWN_BACKOFF_MAX, RESPAWN_BACKOFF_MIN * 2 ** (self.startup_failures - 1))
+                    self.respawn_at = time.monotonic() + delay
+                    logger.warning(
+                        f"Worker {pid} exited after {uptime:.1f}s (status {status}), "
+                        f"startup failure {self.startup_failures}; respawning in {delay:.1f}s"
+                    )
+                else:
+                    self.startup_failures = 0
+                    logger.info(f"Worker {pid} exited after {uptime:.0f}s (status {status})")
+            self.retiring.pop(pid, None)
+
+    def kill_overdue(self) -> None:
+        now = time.monotonic()
+        for pid, deadline in list(self.retiring.items()):
+            if now > deadline:
+                logger.warning(f"Worker {pid} did not stop in time, killing it")
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                self.retiring.pop(pid, None)
+
+    def run(self) -> int:
+        """Supervise the workers until told to stop; returns the exit status"""
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_restart)
+        signal.signal(signal.SIGTTIN, self._on_more)
+        signal.signal(signal.SIGTTOU, self._on_fewer)
+
+        logger.info(f"Master {os.getpid()} starting {self.target} workers")
+        while not self.stopping:
+            if self.pending_restart:
+                self.pending_restart = False
+                old = list(self.workers)
+                logger.info(f"Graceful restart: replacing {len(old)} workers")
+                for _ in range(self.target):
+                    self.spawn()
+                for pid in old:
+                    self.retire(pid)
+
+            if self.startup_failures >= settings.WEB_MAX_STARTUP_FAILURES:
+                logger.error(f"{self.startup_failures} workers in a row failed to start, giving up")
+                self.exit_code = 1
+                break
+            if time.monotonic() >= self.respawn_at:
+                while len(self.workers) < self.target:
+                    self.spawn()
+            while len(self.workers) > self.target:
+                self.retire(max(self.workers, key=self.workers.get))
+
+            self.reap()
+            self.kill_overdue()
+            time.sleep(0.2)
+
+        logger.info("Shutting down workers")
+        for pid in list(self.workers):
+            self.retire(pid)
+        while self.retiring:
+            self.reap()
+            self.kill_overdue()
+            time.sleep(0.1)
+        self.sock.close()
+        return self.exit_code
+
+
+def dispose_engines(close: bool = True) -> None:
+    """
+    Empty the pool of the directory and of every shard. In a forked worker,
+    close=False forgets the inherited connections without closing them, as
+    they still belong to the master.
+    """
+    for database in shard_router.engines():
+        database.dispose(close=close)
+
+
+def run_worker(sock: socket.socket) -> None:
+    # Forked children inherit the master's handlers; uvicorn installs its own
+    for signum in (signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU):
+        signal.signal(signum, signal.SIG_DFL)
+    random.seed()
+    # Connections opened by the master must not be shared across processes
+    dispose_engines(close=False)
+    gc.enable()
+
+    max_requests = None
+    if settings.WEB_MAX_REQUESTS > 0:
+        max_requests = settings.WEB_MAX_REQUESTS + random.randint(0, max(0, settings.WEB_MAX_REQUESTS_JITTER))
+
+    config = uvicorn.Config(
+        app,
+        proxy_headers=True,
+        forwarded_allow_ips=settings.WEB_FORWARDED_ALLOW_IPS,
+        limit_max_requests=max_requests,
+        timeout_graceful_shutdown=settings.WEB_GRACEFUL_TIMEOUT,
+        log_config=None,
+    )
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main() -> None:
+    sock = bind_socket(settings.WEB_HOST, settings.WEB_PORT)
+    workers = autotune_workers()
+
+    # Drop connections made during import (create_all) before they get inherited
+    dispose_engines()
+    gc.collect()
+    gc.freeze()
+
+    logger.info(f"Listening on {settings.WEB_HOST}:{settings.WEB_PORT} with {workers} workers")
+    sys.exit(Master(sock, workers).run())
+
+
+if __name__ == "__main__":
+    main()
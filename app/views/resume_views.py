@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
+from markupsafe import Markup
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
 from ..db.base import get_db
 from ..models.user import User
@@ -10,9 +11,63 @@ from ..models.resume import Resume, ResumeHistory
 from ..schemas.resume import ResumeCreate, ResumeUpdate, ResumeImprove
 from ..crud import resume as crud_resume
 from ..core.security import get_current_active_user
+from ..core.assets import asset_url
+from ..core import tracing
+from ..core.config import settings
+
+# Streamed pages are sent in chunks of at least this many characters, and
+# wherever a template calls flush()
+STREAM_CHUNK_SIZE = 16 * 1024
+FLUSH_MARKER = "<!--flush-->"
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
+templates.env.globals["asset_url"] = asset_url
+templates.env.globals["flush"] = lambda: Markup(FLUSH_MARKER)
+tracing.trace_templates(templates.env)
+
+def _stream_template(name: str, context: Dict[str, Any]) -> Iterator[str]:
+    """Render a template incrementally, so the top of the page goes out before slow parts below it run"""
+    parts: List[str] = []
+    size = 0
+    # Spans the whole streamed render, including the time spent sending chunks
+    render_span = tracing.start_span("template.stream", **{"template.name": name})
+    error = None
+    try:
+        for chunk in templates.get_template(name).generate(context):
+            if chunk == FLUSH_MARKER:
+                if parts:
+                    yield "".join(parts)
+                    parts, size = [], 0
+                continue
+            parts.append(chunk)
+            size += len(chunk)
+            if size >= STREAM_CHUNK_SIZE:
+                yield "".join(parts)
+                parts, size = [], 0
+        if parts:
+            yield "".join(parts)
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        if render_span is not None:
+            render_span.finish(error)
+
+def _history_page(db: Session, resume_id: int, before: Optional[int] = None) -> Dict[str, Any]:
+    """One page of versions, each paired with the version before it for the diff buttons"""
+    page_size = settings.HISTORY_PAGE_SIZE
+    # One extra row: the previous version of the last entry, and proof there is more
+    versions = crud_resume.get_resume_history_page(db, resume_id, before=before, limit=page_size + 1)
+    # Versions still in the write-behind buffer come on top of a full page, so
+    # the cursor is always a stored version
+    page_size += sum(1 for version in versions if version.id is None)
+    shown = versions[:page_size]
+    return {
+        "entries": list(zip(shown, versions[1:] + [None])),
+        "first": before is None,
+        "before": shown[-1].id if len(versions) > page_size else None,
+    }
 
 @router.get("/resumes", response_class=HTMLResponse)
 async def list_resumes(
@@ -23,7 +78,9 @@ async def list_resumes(
     current_user: User = Depends(get_current_active_user)
 ):
     """List all resumes for the current user"""
-    resumes = crud_resume.get_resumes(db, user_id=current_user.id, skip=skip, limit=limit)
+    resumes = crud_resume.get_resumes(
+        db, user_id=current_user.id, skip=skip, limit=limit, fields=crud_resume.SUMMARY_FIELDS
+    )
     return templates.TemplateResponse(
         "resumes/list.html",
         {"request": request, "resumes": resumes, "user": current_user}
@@ -51,20 +108,43 @@ async def view_resume(
     resume = crud_resume.get_resume(db, resume_id=resume_id, user_id=current_user.id)
     if not resume:
         raise HTTPException(status_code=404, detail="Resume not found")
-        
-    # Get resume history
-    history = crud_resume.get_resume_history(
-        db, resume_id=resume_id, user_id=current_user.id
-    )
-    
+
+    # The resume is sent before the history query runs; only the first page of
+    # version metadata is rendered, older pages are fetched by htmx on scroll.
+    # The request's session may be closed by the time the body is sent, so the
+    # stream reads the history in a session of its own on the same database
+    bind = db.get_bind()
+
+    def page() -> Iterator[str]:
+        with Session(bind=bind, autoflush=False) as history_db:
+            yield from _stream_template(
+                "resumes/detail.html",
+                {
+                    "request": request,
+                    "resume": resume,
+                    "load_history": lambda: _history_page(history_db, resume_id),
+                    "user": current_user
+                }
+            )
+
+    return StreamingResponse(page(), media_type="text/html")
+
+@router.get("/resumes/{resume_id}/history", response_class=HTMLResponse)
+async def resume_history_fragment(
+    request: Request,
+    resume_id: int,
+    before: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Next page of version history, as list items for htmx to append"""
+    resume = crud_resume.get_resume(db, resume_id=resume_id, user_id=current_user.id)
+    if not resume:
+        raise HTTPException(status_code=404, detail="Resume not found")
+
     return templates.TemplateResponse(
-        "resumes/detail.html",
-        {
-            "request": request, 
-            "resume": resume,
-            "history": history,
-            "user": current_user
-        }
+        "resumes/_history.html",
+        {"request": request, "resume": resume, "page": _history_page(db, resume_id, before=before)}
     )
 
 @router.get("/resumes/{resume_id}/edit", response_class=HTMLResponse)
@@ -0,0 +1,92 @@
+import argparse
+import os
+import sys
+import time
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, defer
+
+from app.db import statements
+from app.db.base import Base
+from app.models.resume import Resume, ResumeHistory
+from app.models.user import User
+
+
+def _cases(user_id: int, email: str, resume_id: int):
+    """(name, the query as built per call before app/db/statements.py, the prebuilt equivalent)"""
+    return [
+        (
+            "user by email",
+            lambda db: db.query(User).filter(User.email == email).first(),
+            lambda db: db.scalars(statements.USER_BY_EMAIL, {"email": email}).first(),
+        ),
+        (
+            "resume by (id, user_id)",
+            lambda db: db.query(Resume).filter(Resume.id == resume_id, Resume.user_id == user_id).first(),
+            lambda db: db.scalars(statements.RESUME_BY_OWNER, {"resume_id": resume_id, "user_id": user_id}).first(),
+        ),
+        (
+            "resumes by user_id",
+            lambda db: db.query(Resume).filter(Resume.user_id == user_id).offset(0).limit(100).all(),
+            lambda db: db.scalars(statements.RESUMES_BY_USER, {"user_id": user_id, "skip": 0, "limit": 100}).all(),
+        ),
+        (
+            "history by resume_id",
+            lambda db: (db.query(ResumeHistory)
+                        .options(defer(ResumeHistory.content), defer(ResumeHistory.improved_content))
+                        .filter(ResumeHistory.resume_id == resume_id)
+                        .order_by(ResumeHistory.created_at.desc())
+                        .offset(0).limit(100).all()),
+            lambda db: db.scalars(
+                statements.HISTORY_METADATA_BY_RESUME, {"resume_id": resume_id, "skip": 0, "limit": 100}
+            ).all(),
+        ),
+    ]
+
+
+def _time(db: Session, query, iterations: int) -> float:
+    """Microseconds per call"""
+    for _ in range(min(iterations, 100)):
+        query(db)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        query(db)
+        # Drop the loaded objects, as a new request's session would not have them
+        db.expunge_all()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Per-query cost of the hot-path queries, built per call vs prebuilt (app/db/statements.py)"
+    )
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    # In-memory SQLite: the database does next to nothing, so the difference
+    # is the Python-side cost of building and compiling each query
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        user = User(email="benchmark@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        resumes = [Resume(title=f"Resume {n}", content="Benchmark content", user_id=user.id) for n in range(5)]
+        db.add_all(resumes)
+        db.flush()
+        db.add_all(ResumeHistory(resume_id=resumes[0].id, content=f"Version {n}") for n in range(10))
+        db.commit()
+        cases = _cases(user.id, user.email, resumes[0].id)
+
+        print(f"{'query':<26}{'Query API':>12}{'prebuilt':>12}{'saved':>9}")
+        for name, legacy, prebuilt in cases:
+            before = _time(db, legacy, args.iterations)
+            after = _time(db, prebuilt, args.iterations)
+            print(f"{name:<26}{before:>10.1f}us{after:>10.1f}us{1 - after / before:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import argparse
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.assets import build_assets, load_manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Vendor, minify and fingerprint the frontend assets into app/static/dist"
+    )
+    parser.add_argument("--if-missing", action="store_true",
+                        help="do nothing when a manifest from an earlier build is present")
+    args = parser.parse_args()
+
+    if args.if_missing and load_manifest():
+        print("Assets already built, skipping")
+        return
+
+    manifest = build_assets()
+    for name, path in sorted(manifest.items()):
+        print(f"{name} -> /static/{path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import argparse
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.hash_calibration import MAX_ROUNDS, MIN_ROUNDS, calibrate, write_env_setting
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark bcrypt on this host and store the cost that fits a login latency budget"
+    )
+    parser.add_argument("--target-ms", type=float, default=250,
+                        help="hashing time budget per login in milliseconds")
+    parser.add_argument("--min-rounds", type=int, default=MIN_ROUNDS,
+                        help="never choose a cost below this, even if it exceeds the budget")
+    parser.add_argument("--max-rounds", type=int, default=MAX_ROUNDS)
+    parser.add_argument("--samples", type=int, default=5, help="hashes timed per cost (median is used)")
+    # Settings reads no env file itself: the value must land in the file
+    # docker-compose.prod.yml passes to the container
+    parser.add_argument("--env-file", default=".env.prod",
+                        help="env file the deployment loads, to write BCRYPT_ROUNDS to (default: .env.prod)")
+    parser.add_argument("--dry-run", action="store_true", help="print the result without writing it")
+    args = parser.parse_args()
+
+    rounds, timings = calibrate(args.target_ms, args.min_rounds, args.max_rounds, args.samples)
+    for cost, ms in timings.items():
+        marker = "  <- chosen" if cost == rounds else ""
+        print(f"cost {cost:2d}: {ms:8.1f} ms{marker}")
+    if timings[rounds] > args.target_ms:
+        print(f"Warning: even the minimum cost {rounds} exceeds the {args.target_ms:.0f} ms budget on this host")
+
+    if args.dry_run:
+        print(f"BCRYPT_ROUNDS={rounds}")
+        return
+    write_env_setting(args.env_file, "BCRYPT_ROUNDS", str(rounds))
+    print(f"Wrote BCRYPT_ROUNDS={rounds} to {args.env_file}; existing hashes are upgraded on next login")
+    print("The running app keeps its current cost until its containers are recreated with the new file: "
+          "docker-compose -f docker-compose.prod.yml up -d")
+
+
+if __name__ == "__main__":
+    main()
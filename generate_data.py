@@ -0,0 +1,48 @@
+import argparse
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.base import engine
+from app.db.synthetic import SyntheticConfig, generate
+
+
+def main():
+    defaults = SyntheticConfig()
+    parser = argparse.ArgumentParser(description="Append a synthetic dataset for capacity testing")
+    parser.add_argument("--users", type=int, default=defaults.users, help="users to create")
+    parser.add_argument("--resumes-per-user", type=float, default=defaults.resumes_per_user,
+                        help="mean resumes per user")
+    parser.add_argument("--max-resumes-per-user", type=int, default=defaults.max_resumes_per_user)
+    parser.add_argument("--history-per-resume", type=float, default=defaults.history_per_resume,
+                        help="mean history versions per resume, including the initial one")
+    parser.add_argument("--max-history-per-resume", type=int, default=defaults.max_history_per_resume)
+    parser.add_argument("--skew", type=float, default=defaults.skew,
+                        help="log-normal sigma of both counts (0 = every user and resume gets the mean)")
+    parser.add_argument("--text-length", type=int, default=defaults.text_length,
+                        help="median content length in characters")
+    parser.add_argument("--max-text-length", type=int, default=defaults.max_text_length)
+    parser.add_argument("--improve-ratio", type=float, default=defaults.improve_ratio,
+                        help="share of edits that are improvements")
+    parser.add_argument("--days", type=int, default=defaults.days, help="spread timestamps over this many past days")
+    parser.add_argument("--password", default=defaults.password, help="password shared by all generated users")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--batch-size", type=int, default=defaults.batch_size, help="rows per COPY/executemany batch")
+    args = parser.parse_args()
+
+    config = SyntheticConfig(**{name: value for name, value in vars(args).items()})
+
+    def progress(report):
+        print(f"\r{report.users} users, {report.resumes} resumes, {report.history} history rows "
+              f"({report.rows_per_second:,.0f} rows/s)", end="", flush=True)
+
+    report = generate(engine, config, progress=progress)
+    print()
+    print(f"Generated {report.rows} rows in {report.seconds:.1f}s ({report.rows_per_second:,.0f} rows/s)")
+    print(f"Users can log in as synthetic-<id>@example.com with password {config.password!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.db.base import engine
+from app.db.partitions import drop_history_partitions_before, ensure_history_partitions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain monthly resume_history partitions (PostgreSQL)")
+    parser.add_argument("--months-ahead", type=int, default=settings.HISTORY_PARTITION_MONTHS_AHEAD,
+                        help="create partitions through this many months from now")
+    parser.add_argument("--drop-older-than-days", type=int, default=None,
+                        help="drop monthly partitions that ended more than this many days ago")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        print("resume_history is only partitioned on PostgreSQL; nothing to do")
+        return
+
+    created = ensure_history_partitions(engine, args.months_ahead)
+    if not created:
+        print("resume_history is not partitioned; run `alembic upgrade head` first")
+        return
+    print(f"Partitions in place through {created[-1]}")
+
+    if args.drop_older_than_days is not None:
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=args.drop_older_than_days)).date()
+        for name in drop_history_partitions_before(engine, cutoff):
+            print(f"Dropped {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""history retention: archive table, job checkpoints, history lookup index
+
+Revision ID: 1b1f572341cf
+Revises: 979b066dd4a9
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b1f572341cf'
+down_revision: Union[str, None] = '979b066dd4a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_resume_history_resume_id_created_at',
+        'resume_history',
+        ['resume_id', 'created_at'],
+    )
+
+    op.create_table(
+        'resume_history_archive',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('resume_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+        sa.Column('payload', sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(['resume_id'], ['resumes.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_resume_history_archive_resume_id', 'resume_history_archive', ['resume_id'])
+
+    op.create_table(
+        'job_checkpoints',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+        sa.PrimaryKeyConstraint('name'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('job_checkpoints')
+    op.drop_index('ix_resume_history_archive_resume_id', table_name='resume_history_archive')
+    op.drop_table('resume_history_archive')
+    op.drop_index('ix_resume_history_resume_id_created_at', table_name='resume_history')
@@ -0,0 +1,54 @@
+"""per-user dashboard statistics
+
+Adds user_stats, seeded from the existing resumes and history, and an index
+for the dashboard's recently-updated resumes query.
+
+Revision ID: 3c8e51f0a7d2
+Revises: f6ade3c94e60
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c8e51f0a7d2'
+down_revision: Union[str, None] = 'f6ade3c94e60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SEED_STATS = """
+INSERT INTO user_stats (user_id, resume_count, history_count, improvement_count, last_edited_at)
+SELECT u.id,
+       (SELECT count(*) FROM resumes r WHERE r.user_id = u.id),
+       (SELECT count(*) FROM resume_history h JOIN resumes r ON r.id = h.resume_id
+        WHERE r.user_id = u.id),
+       (SELECT count(*) FROM resume_history h JOIN resumes r ON r.id = h.resume_id
+        WHERE r.user_id = u.id AND h.improved_content LIKE '%[Improved]'),
+       (SELECT max(coalesce(r.updated_at, r.created_at)) FROM resumes r WHERE r.user_id = u.id)
+FROM users u
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_stats',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('resume_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('history_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('improvement_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('last_edited_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+    op.execute(SEED_STATS)
+    op.create_index('ix_resumes_user_id_updated_at', 'resumes', ['user_id', 'updated_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_resumes_user_id_updated_at', table_name='resumes')
+    op.drop_table('user_stats')
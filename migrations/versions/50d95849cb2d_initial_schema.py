@@ -0,0 +1,75 @@
+"""initial schema
+
+Revision ID: 50d95849cb2d
+Revises:
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '50d95849cb2d'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing deployments created these tables through Base.metadata.create_all
+    # at startup, so only create what is missing.
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'users' not in existing:
+        op.create_table(
+            'users',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('email', sa.String(), nullable=False),
+            sa.Column('hashed_password', sa.String(), nullable=False),
+            sa.Column('is_active', sa.Boolean(), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_users_id', 'users', ['id'])
+        op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+    if 'resumes' not in existing:
+        op.create_table(
+            'resumes',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('title', sa.String(), nullable=False),
+            sa.Column('content', sa.Text(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_resumes_id', 'resumes', ['id'])
+
+    if 'resume_history' not in existing:
+        op.create_table(
+            'resume_history',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('resume_id', sa.Integer(), nullable=False),
+            sa.Column('content', sa.Text(), nullable=False),
+            sa.Column('improved_content', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+            sa.ForeignKeyConstraint(['resume_id'], ['resumes.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_resume_history_id', 'resume_history', ['id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_resume_history_id', table_name='resume_history')
+    op.drop_table('resume_history')
+    op.drop_index('ix_resumes_id', table_name='resumes')
+    op.drop_table('resumes')
+    op.drop_index('ix_users_email', table_name='users')
+    op.drop_index('ix_users_id', table_name='users')
+    op.drop_table('users')
@@ -0,0 +1,117 @@
+"""partition resume_history by month (PostgreSQL only)
+
+Rebuilds resume_history as a table range-partitioned on created_at, with one
+partition per calendar month covering existing rows and the next few months,
+plus a DEFAULT partition as a safety net. The primary key becomes
+(id, created_at) because PostgreSQL requires the partition key in it; ids still
+come from the original sequence, so they stay unique. Later partitions are
+created by app.db.partitions.ensure_history_partitions, which moves rows
+the DEFAULT partition caught out of it first.
+
+SQLite keeps the plain table; this migration is a no-op there.
+
+Revision ID: 520862c3aed4
+Revises: 1b1f572341cf
+Create Date: 2026-10-19 10:30:00.000000
+
+"""
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '520862c3aed4'
+down_revision: Union[str, None] = '1b1f572341cf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+
+# Frozen copies of app.db.partitions' helpers as of this revision, so the
+# migration keeps doing the same thing however that module changes
+def _add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_partition_sql(month: date) -> str:
+    end = _add_months(month, 1)
+    return (
+        f"CREATE TABLE IF NOT EXISTS resume_history_y{month.year:04d}m{month.month:02d} "
+        f"PARTITION OF resume_history "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    op.execute("ALTER TABLE resume_history RENAME TO resume_history_legacy")
+    op.execute("ALTER TABLE resume_history_legacy RENAME CONSTRAINT resume_history_pkey TO resume_history_legacy_pkey")
+    op.execute("ALTER INDEX ix_resume_history_id RENAME TO ix_resume_history_legacy_id")
+    op.execute("ALTER INDEX ix_resume_history_resume_id_created_at RENAME TO ix_resume_history_legacy_resume_id_created_at")
+
+    op.execute("""
+        CREATE TABLE resume_history (
+            id integer NOT NULL DEFAULT nextval('resume_history_id_seq'),
+            resume_id integer NOT NULL REFERENCES resumes (id),
+            content text NOT NULL,
+            improved_content text,
+            created_at timestamp with time zone NOT NULL DEFAULT now(),
+            CONSTRAINT resume_history_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    # Keep the id sequence alive when the legacy table is dropped
+    op.execute("ALTER SEQUENCE resume_history_id_seq OWNED BY resume_history.id")
+    op.execute("CREATE INDEX ix_resume_history_resume_id_created_at ON resume_history (resume_id, created_at)")
+    op.execute("CREATE TABLE resume_history_default PARTITION OF resume_history DEFAULT")
+
+    today = datetime.now(timezone.utc).date()
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM resume_history_legacy")).scalar()
+    first = oldest.date() if oldest else today
+    month, last = date(first.year, first.month, 1), _add_months(today, MONTHS_AHEAD)
+    while month <= last:
+        op.execute(_create_partition_sql(month))
+        month = _add_months(month, 1)
+
+    op.execute("""
+        INSERT INTO resume_history (id, resume_id, content, improved_content, created_at)
+        SELECT id, resume_id, content, improved_content, COALESCE(created_at, now())
+        FROM resume_history_legacy
+    """)
+    op.execute("DROP TABLE resume_history_legacy")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("ALTER TABLE resume_history RENAME TO resume_history_partitioned")
+    op.execute("ALTER TABLE resume_history_partitioned RENAME CONSTRAINT resume_history_pkey TO resume_history_partitioned_pkey")
+    op.execute("ALTER INDEX ix_resume_history_resume_id_created_at RENAME TO ix_resume_history_partitioned_resume_id_created_at")
+
+    op.execute("""
+        CREATE TABLE resume_history (
+            id integer NOT NULL DEFAULT nextval('resume_history_id_seq'),
+            resume_id integer NOT NULL REFERENCES resumes (id),
+            content text NOT NULL,
+            improved_content text,
+            created_at timestamp with time zone DEFAULT now(),
+            CONSTRAINT resume_history_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute("ALTER SEQUENCE resume_history_id_seq OWNED BY resume_history.id")
+    op.execute("CREATE INDEX ix_resume_history_id ON resume_history (id)")
+    op.execute("CREATE INDEX ix_resume_history_resume_id_created_at ON resume_history (resume_id, created_at)")
+    op.execute("""
+        INSERT INTO resume_history (id, resume_id, content, improved_content, created_at)
+        SELECT id, resume_id, content, improved_content, created_at
+        FROM resume_history_partitioned
+    """)
+    op.execute("DROP TABLE resume_history_partitioned")
@@ -0,0 +1,68 @@
+"""database-side resume history capture
+
+Adds ``resume_capture_edit()``, which snapshots the current resume content into
+``resume_history`` and applies the edit in a single call, so the old text never
+leaves the server. Used when ``HISTORY_CAPTURE_MODE=database``.
+
+SQLite has no stored functions; there the application issues the equivalent
+``INSERT ... SELECT`` / ``UPDATE ... RETURNING`` pair on one connection, so
+nothing needs to be installed.
+
+Revision ID: 979b066dd4a9
+Revises: 50d95849cb2d
+Create Date: 2026-10-19 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '979b066dd4a9'
+down_revision: Union[str, None] = '50d95849cb2d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+CREATE_FUNCTION = """
+CREATE OR REPLACE FUNCTION resume_capture_edit(
+    p_resume_id integer,
+    p_user_id integer,
+    p_title varchar,
+    p_content text,
+    p_suffix text
+) RETURNS SETOF resumes
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF p_content IS NOT NULL OR p_suffix IS NOT NULL THEN
+        INSERT INTO resume_history (resume_id, content, improved_content, created_at)
+        SELECT r.id, r.content, COALESCE(p_content, r.content) || COALESCE(p_suffix, ''), now()
+        FROM resumes r
+        WHERE r.id = p_resume_id AND r.user_id = p_user_id
+        FOR UPDATE;
+    END IF;
+
+    RETURN QUERY
+    UPDATE resumes r
+    SET title = COALESCE(p_title, r.title),
+        content = COALESCE(p_content, r.content) || COALESCE(p_suffix, ''),
+        updated_at = now()
+    WHERE r.id = p_resume_id AND r.user_id = p_user_id
+    RETURNING r.*;
+END;
+$$;
+"""
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute(CREATE_FUNCTION)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("DROP FUNCTION IF EXISTS resume_capture_edit(integer, integer, varchar, text, text)")
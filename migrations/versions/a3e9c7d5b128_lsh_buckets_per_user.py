@@ -0,0 +1,60 @@
+"""key resume_lsh_buckets on (user_id, bucket)
+
+Duplicate lookups then read only their user's part of the index. Rows of
+detached resumes (user_id NULL) are not copied; they are being purged.
+
+Revision ID: a3e9c7d5b128
+Revises: c8a2e6f4d193
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3e9c7d5b128'
+down_revision: Union[str, None] = 'c8a2e6f4d193'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'resume_lsh_buckets_new',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('bucket', sa.BigInteger(), nullable=False),
+        sa.Column('resume_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['resume_id'], ['resumes.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'bucket', 'resume_id', name='pk_resume_lsh_buckets'),
+    )
+    op.execute(
+        "INSERT INTO resume_lsh_buckets_new (user_id, bucket, resume_id) "
+        "SELECT resumes.user_id, resume_lsh_buckets.bucket, resume_lsh_buckets.resume_id "
+        "FROM resume_lsh_buckets JOIN resumes ON resumes.id = resume_lsh_buckets.resume_id "
+        "WHERE resumes.user_id IS NOT NULL"
+    )
+    op.drop_index('ix_resume_lsh_buckets_resume_id', table_name='resume_lsh_buckets')
+    op.drop_table('resume_lsh_buckets')
+    op.rename_table('resume_lsh_buckets_new', 'resume_lsh_buckets')
+    op.create_index('ix_resume_lsh_buckets_resume_id', 'resume_lsh_buckets', ['resume_id'])
+
+
+def downgrade() -> None:
+    op.create_table(
+        'resume_lsh_buckets_old',
+        sa.Column('bucket', sa.BigInteger(), nullable=False),
+        sa.Column('resume_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['resume_id'], ['resumes.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('bucket', 'resume_id'),
+    )
+    op.execute(
+        "INSERT INTO resume_lsh_buckets_old (bucket, resume_id) "
+        "SELECT DISTINCT bucket, resume_id FROM resume_lsh_buckets"
+    )
+    op.drop_index('ix_resume_lsh_buckets_resume_id', table_name='resume_lsh_buckets')
+    op.drop_table('resume_lsh_buckets')
+    op.rename_table('resume_lsh_buckets_old', 'resume_lsh_buckets')
+    op.create_index('ix_resume_lsh_buckets_resume_id', 'resume_lsh_buckets', ['resume_id'])
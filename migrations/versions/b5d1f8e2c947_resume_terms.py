@@ -0,0 +1,36 @@
+"""resume term counts for job matching
+
+Existing resumes are indexed the first time their owner runs a match.
+
+Revision ID: b5d1f8e2c947
+Revises: e7c3a5b9d210
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d1f8e2c947'
+down_revision: Union[str, None] = 'e7c3a5b9d210'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'resume_terms',
+        sa.Column('resume_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('length', sa.Integer(), nullable=False),
+        sa.Column('terms', sa.JSON(), nullable=False),
+        sa.ForeignKeyConstraint(['resume_id'], ['resumes.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('resume_id'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('resume_terms')
@@ -0,0 +1,26 @@
+"""resumes.detached_user_id: former owner of a resume waiting to be purged
+
+Revision ID: b7f2d4a8c316
+Revises: a3e9c7d5b128
+Create Date: 2026-10-19 21:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7f2d4a8c316'
+down_revision: Union[str, None] = 'a3e9c7d5b128'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('resumes', sa.Column('detached_user_id', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('resumes', 'detached_user_id')
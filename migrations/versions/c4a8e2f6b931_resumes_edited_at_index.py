@@ -0,0 +1,33 @@
+"""index resumes on (user_id, coalesce(updated_at, created_at)) for the dashboard
+
+updated_at is NULL until a resume's first edit, so the dashboard orders by the
+creation time for those; the index follows the new ORDER BY.
+
+Revision ID: c4a8e2f6b931
+Revises: b7f2d4a8c316
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a8e2f6b931'
+down_revision: Union[str, None] = 'b7f2d4a8c316'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index('ix_resumes_user_id_updated_at', table_name='resumes')
+    op.create_index(
+        'ix_resumes_user_id_edited_at', 'resumes', ['user_id', sa.text('coalesce(updated_at, created_at)')]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_resumes_user_id_edited_at', table_name='resumes')
+    op.create_index('ix_resumes_user_id_updated_at', 'resumes', ['user_id', 'updated_at'])
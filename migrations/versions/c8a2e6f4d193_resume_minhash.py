@@ -0,0 +1,45 @@
+"""resume MinHash signatures and LSH buckets for near-duplicate detection
+
+Existing resumes are indexed in the background (app/jobs/content_index.py).
+
+Revision ID: c8a2e6f4d193
+Revises: b5d1f8e2c947
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8a2e6f4d193'
+down_revision: Union[str, None] = 'b5d1f8e2c947'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'resume_signatures',
+        sa.Column('resume_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('signature', sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(['resume_id'], ['resumes.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('resume_id'),
+    )
+    op.create_table(
+        'resume_lsh_buckets',
+        sa.Column('bucket', sa.BigInteger(), nullable=False),
+        sa.Column('resume_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['resume_id'], ['resumes.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('bucket', 'resume_id'),
+    )
+    op.create_index('ix_resume_lsh_buckets_resume_id', 'resume_lsh_buckets', ['resume_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_resume_lsh_buckets_resume_id', table_name='resume_lsh_buckets')
+    op.drop_table('resume_lsh_buckets')
+    op.drop_table('resume_signatures')
@@ -0,0 +1,67 @@
+"""cascade resume deletes to resume_history; nullable resumes.user_id
+
+resume_history.resume_id gets ON DELETE CASCADE, so deleting a resume no longer
+loads its history into the application. On a partitioned resume_history the
+constraint lives on the parent and applies to every partition; adding it
+validates all existing rows under a lock, so run it in a quiet period.
+SQLite does not enforce foreign keys here and keeps its constraint as it is.
+
+resumes.user_id becomes nullable: a NULL owner marks a deleted resume whose
+history is being purged in the background.
+
+Revision ID: d4b8e1f3a692
+Revises: c2f7a9d4e815
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4b8e1f3a692'
+down_revision: Union[str, None] = 'c2f7a9d4e815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CONSTRAINT = 'resume_history_resume_id_fkey'
+
+
+def _replace_history_fk(ondelete: str) -> None:
+    names = op.get_bind().execute(sa.text(
+        "SELECT conname FROM pg_constraint "
+        "WHERE conrelid = 'resume_history'::regclass AND confrelid = 'resumes'::regclass AND contype = 'f'"
+    )).scalars().all()
+    for name in names:
+        op.execute(f'ALTER TABLE resume_history DROP CONSTRAINT "{name}"')
+    op.execute(
+        f"ALTER TABLE resume_history ADD CONSTRAINT {CONSTRAINT} "
+        f"FOREIGN KEY (resume_id) REFERENCES resumes (id) ON DELETE {ondelete}"
+    )
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('resumes') as batch_op:
+        batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=True)
+
+    if op.get_bind().dialect.name == 'postgresql':
+        _replace_history_fk('CASCADE')
+
+
+def downgrade() -> None:
+    # Finish any pending purge, since detached resumes can't be kept
+    op.execute(
+        "DELETE FROM resume_history WHERE resume_id IN (SELECT id FROM resumes WHERE user_id IS NULL)"
+    )
+    op.execute(
+        "DELETE FROM resume_history_archive WHERE resume_id IN (SELECT id FROM resumes WHERE user_id IS NULL)"
+    )
+    op.execute("DELETE FROM resumes WHERE user_id IS NULL")
+
+    if op.get_bind().dialect.name == 'postgresql':
+        _replace_history_fk('NO ACTION')
+
+    with op.batch_alter_table('resumes') as batch_op:
+        batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=False)
@@ -0,0 +1,36 @@
+"""user directory: shard assignments
+
+Revision ID: e7c3a5b9d210
+Revises: d4b8e1f3a692
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7c3a5b9d210'
+down_revision: Union[str, None] = 'd4b8e1f3a692'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_shards',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('shard', sa.String(length=64), nullable=False),
+        sa.Column('moving', sa.Boolean(), server_default=sa.false(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+    op.create_index('ix_user_shards_shard', 'user_shards', ['shard'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_shards_shard', table_name='user_shards')
+    op.drop_table('user_shards')
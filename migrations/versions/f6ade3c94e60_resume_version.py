@@ -0,0 +1,65 @@
+"""resume version counter
+
+Adds resumes.version, bumped on every content or title change, so change
+notifications and clients can tell which revision they have. Replaces
+resume_capture_edit() on PostgreSQL so database-side edits bump it too.
+
+Revision ID: f6ade3c94e60
+Revises: 520862c3aed4
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6ade3c94e60'
+down_revision: Union[str, None] = '520862c3aed4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+CAPTURE_EDIT_FUNCTION = """
+CREATE OR REPLACE FUNCTION resume_capture_edit(
+    p_resume_id integer,
+    p_user_id integer,
+    p_title varchar,
+    p_content text,
+    p_suffix text
+) RETURNS SETOF resumes
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF p_content IS NOT NULL OR p_suffix IS NOT NULL THEN
+        INSERT INTO resume_history (resume_id, content, improved_content, created_at)
+        SELECT r.id, r.content, COALESCE(p_content, r.content) || COALESCE(p_suffix, ''), now()
+        FROM resumes r
+        WHERE r.id = p_resume_id AND r.user_id = p_user_id
+        FOR UPDATE;
+    END IF;
+
+    RETURN QUERY
+    UPDATE resumes r
+    SET title = COALESCE(p_title, r.title),
+        content = COALESCE(p_content, r.content) || COALESCE(p_suffix, ''),
+        updated_at = now(),
+        version = r.version + 1
+    WHERE r.id = p_resume_id AND r.user_id = p_user_id
+    RETURNING r.*;
+END;
+$$;
+"""
+
+
+def upgrade() -> None:
+    op.add_column('resumes', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(CAPTURE_EDIT_FUNCTION)
+
+
+def downgrade() -> None:
+    op.drop_column('resumes', 'version')
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(CAPTURE_EDIT_FUNCTION.replace(",\n        version = r.version + 1", ""))
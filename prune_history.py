@@ -0,0 +1,56 @@
+import argparse
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.db.base import SessionLocal
+from app.jobs.history_retention import RetentionPolicy, reset_checkpoint, run_retention
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Thin and optionally archive old resume history versions")
+    parser.add_argument("--keep-all-days", type=int, default=settings.HISTORY_RETENTION_KEEP_ALL_DAYS,
+                        help="keep every version younger than this")
+    parser.add_argument("--daily-days", type=int, default=settings.HISTORY_RETENTION_DAILY_DAYS,
+                        help="keep one version per day until this age")
+    parser.add_argument("--monthly-days", type=int, default=settings.HISTORY_RETENTION_MONTHLY_DAYS,
+                        help="keep one version per month until this age (0 = forever)")
+    parser.add_argument("--chunk-size", type=int, default=settings.HISTORY_RETENTION_CHUNK_SIZE,
+                        help="resumes processed per transaction")
+    parser.add_argument("--max-chunks", type=int, default=None,
+                        help="stop after this many chunks; the next run resumes from the checkpoint")
+    parser.add_argument("--archive", action=argparse.BooleanOptionalAction, default=settings.HISTORY_RETENTION_ARCHIVE,
+                        help="move thinned versions to resume_history_archive instead of deleting them outright")
+    parser.add_argument("--dry-run", action="store_true", help="report what would be removed without changing anything")
+    parser.add_argument("--restart", action="store_true", help="discard the saved checkpoint and start from the first resume")
+    args = parser.parse_args()
+
+    if args.restart and not args.dry_run:
+        reset_checkpoint(SessionLocal)
+
+    policy = RetentionPolicy(
+        keep_all_days=args.keep_all_days,
+        daily_days=args.daily_days,
+        monthly_days=args.monthly_days,
+    )
+    stats = run_retention(
+        SessionLocal,
+        policy=policy,
+        chunk_size=args.chunk_size,
+        archive=args.archive,
+        max_chunks=args.max_chunks,
+        dry_run=args.dry_run,
+    )
+
+    prefix = "[dry run] " if args.dry_run else ""
+    print(f"{prefix}Scanned {stats.resumes_scanned} resumes in {stats.chunks} chunks")
+    print(f"{prefix}Removed {stats.versions_removed} history versions ({stats.versions_archived} archived)")
+    if not stats.finished:
+        print("Stopped before the last resume; run again to continue from the checkpoint")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.sharding import shard_router
+from app.jobs.shard_rebalance import move_users, plan_moves
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move users' data to the shard the placement rule assigns them")
+    parser.add_argument("--limit", type=int, default=None, help="move at most this many users")
+    parser.add_argument("--user", type=int, default=None, help="move only this user")
+    parser.add_argument("--to", default=None, help="with --user: target shard instead of the placement rule's")
+    parser.add_argument("--group-size", type=int, default=100,
+                        help="users made unavailable together while they are moved")
+    parser.add_argument("--settle-seconds", type=float, default=None,
+                        help="wait after flagging users before copying (default: SHARD_DIRECTORY_CACHE_SECONDS)")
+    parser.add_argument("--dry-run", action="store_true", help="list the moves without making them")
+    args = parser.parse_args()
+
+    if not shard_router.enabled:
+        print("DATABASE_SHARDS is not set; nothing to rebalance")
+        return
+    if args.to is not None and (args.user is None or args.to not in shard_router.names):
+        parser.error(f"--to needs --user and one of: {', '.join(shard_router.names)}")
+
+    if args.user is not None:
+        current, _ = shard_router.lookup(args.user, fresh=True)
+        target = args.to or shard_router.place(args.user)
+        moves = [(args.user, current, target)] if current != target else []
+    else:
+        moves = list(plan_moves(shard_router, limit=args.limit))
+
+    for user_id, source, target in moves:
+        print(f"User {user_id}: {source} -> {target}")
+    if args.dry_run or not moves:
+        print(f"{len(moves)} users to move" + (" (dry run)" if args.dry_run else ""))
+        return
+
+    users = resumes = history = 0
+    for start in range(0, len(moves), args.group_size):
+        stats = move_users(shard_router, moves[start:start + args.group_size], settle_seconds=args.settle_seconds)
+        users, resumes, history = users + stats.users, resumes + stats.resumes, history + stats.history
+        print(f"Moved {users} users, {resumes} resumes, {history} history versions")
+
+
+if __name__ == "__main__":
+    main()
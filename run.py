@@ -7,5 +7,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from app.main import app
 
 if __name__ == "__main__":
+    # Development server; production uses `python -m app.server`
     import uvicorn
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8001, reload=True)
+    from app.core.config import settings
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8001, reload=settings.DEBUG)
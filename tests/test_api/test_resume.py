@@ -1,3 +1,5 @@
+import warnings
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
@@ -43,11 +45,10 @@ def test_user(client):
     user_email = "test@example.com"
     user_password = "testpass123"
     
-    # Delete user if it exists from a previous run
+    # Reuse the user created by an earlier test; it may already own resumes
     existing_user = db.query(User).filter(User.email == user_email).first()
     if existing_user:
-        db.delete(existing_user)
-        db.commit()
+        return existing_user
 
     user = User(
         email=user_email,
@@ -93,4 +94,329 @@ def test_get_resumes(client, test_user, auth_token):
     assert response.status_code == 200
     assert isinstance(response.json(), list)
 
+def test_update_and_improve_with_database_history_capture(client, test_user, auth_token, monkeypatch):
+    """History rows are captured server-side when HISTORY_CAPTURE_MODE=database"""
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "HISTORY_CAPTURE_MODE", "database")
+    headers = {"Authorization": f"Bearer {auth_token}"}
+
+    created = client.post(
+        "/api/resumes",
+        json={"title": "Capture", "content": "Original resume content."},
+        headers=headers
+    ).json()
+
+    response = client.put(
+        f"/api/resumes/{created['id']}",
+        json={"content": "Edited resume content."},
+        headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json()["content"] == "Edited resume content."
+    assert response.json()["title"] == "Capture"
+
+    response = client.post(f"/api/resumes/{created['id']}/improve", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["content"] == "Edited resume content. [Improved]"
+
+    history = client.get(f"/api/resumes/{created['id']}/history", headers=headers).json()
+    pairs = {(h["content"], h["improved_content"]) for h in history}
+    assert ("Original resume content.", "Edited resume content.") in pairs
+    assert ("Edited resume content.", "Edited resume content. [Improved]") in pairs
+
+    response = client.put("/api/resumes/999999", json={"content": "Nobody owns this one."}, headers=headers)
+    assert response.status_code == 404
+
+def test_history_diff_endpoints(client, test_user, auth_token):
+    """Diffs between history versions and against the current content"""
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    created = client.post(
+        "/api/resumes",
+        json={"title": "Diff", "content": "Python developer\nSQL\n"},
+        headers=headers
+    ).json()
+    client.put(
+        f"/api/resumes/{created['id']}",
+        json={"content": "Senior Python developer\nSQL\n"},
+        headers=headers
+    )
+    history = client.get(f"/api/resumes/{created['id']}/history", headers=headers).json()
+    newest, oldest = history[0]["id"], history[-1]["id"]
+
+    response = client.get(
+        f"/api/resumes/{created['id']}/history/{oldest}/diff/{newest}?granularity=word",
+        headers=headers
+    )
+    assert response.status_code == 200
+    chunks = response.json()["chunks"]
+    assert {"op": "insert", "text": "Senior ", "skipped": 0} in chunks
+
+    response = client.get(f"/api/resumes/{created['id']}/history/{newest}/diff/current", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["insertions"] == 0
+    assert response.json()["to_version"] is None
+
+    response = client.get(f"/api/resumes/{created['id']}/history/999999/diff/current", headers=headers)
+    assert response.status_code == 404
+
+def test_get_resumes_summary_fields(client, test_user, auth_token):
+    """?fields=summary returns the projection without reading content"""
+    from sqlalchemy import event
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    client.post("/api/resumes", json={"title": "Long", "content": "x" * 5000}, headers=headers)
+
+    statements = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        response = client.get("/api/resumes?fields=summary", headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    assert response.status_code == 200
+    long_resume = next(r for r in response.json() if r["title"] == "Long")
+    assert set(long_resume) == {"id", "title", "created_at", "updated_at", "content_length", "snippet"}
+    assert long_resume["content_length"] == 5000
+    assert long_resume["snippet"] == "x" * 100
+    listing = next(s for s in statements if "FROM resumes" in s and "users" not in s)
+    assert "resumes.content AS" not in listing
+
+    response = client.get("/api/resumes?fields=title,bogus", headers=headers)
+    assert response.status_code == 400
+
+    # The documented default stays the full resume
+    schema = client.get("/openapi.json").json()["paths"]["/api/resumes/"]["get"]["responses"]["200"]
+    assert schema["content"]["application/json"]["schema"]["items"]["$ref"].endswith("/ResumeInDB")
+
+def test_user_stats_follow_write_paths(client, test_user, auth_token):
+    """Dashboard counters are adjusted by every write and match a full recompute"""
+    from app.crud.stats import get_user_stats, recompute_user_stats
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    db = TestingSessionLocal()
+    try:
+        before = get_user_stats(db, test_user.id)
+        counts = (before.resume_count, before.history_count, before.improvement_count)
+
+        created = client.post("/api/resumes", json={"title": "Stats", "content": "Counting resumes"}, headers=headers).json()
+        client.put(f"/api/resumes/{created['id']}", json={"content": "Counting more resumes"}, headers=headers)
+        client.post(f"/api/resumes/{created['id']}/improve", headers=headers)
+        db.expire_all()
+        stats = get_user_stats(db, test_user.id)
+        assert (stats.resume_count, stats.history_count, stats.improvement_count) == (
+            counts[0] + 1, counts[1] + 3, counts[2] + 1
+        )
+        assert stats.last_edited_at is not None
+
+        client.delete(f"/api/resumes/{created['id']}", headers=headers)
+        db.expire_all()
+        stats = get_user_stats(db, test_user.id)
+        assert (stats.resume_count, stats.history_count) == counts[:2]
+
+        incremental = (stats.resume_count, stats.history_count)
+        recompute_user_stats(db, [test_user.id])
+        db.commit()
+        stats = get_user_stats(db, test_user.id)
+        assert (stats.resume_count, stats.history_count) == incremental
+    finally:
+        db.close()
+
+    response = client.get("/dashboard", headers=headers)
+    assert response.status_code == 200
+    assert "Saved versions" in response.text
+
+def test_revoked_token_is_rejected(client, test_user):
+    """A token revoked server-side stops working even though it hasn't expired"""
+    from app.core.security import revoke_token
+    token = create_access_token(data={"sub": test_user.email})
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/resumes/", headers=headers).status_code == 200
+
+    db = TestingSessionLocal()
+    try:
+        assert revoke_token(db, token)
+    finally:
+        db.close()
+    response = client.get("/api/resumes/", headers=headers, follow_redirects=False)
+    assert response.headers["location"] == "/login"
+
+def test_create_with_idempotency_key_replays(client, test_user, auth_token):
+    """A retried create with the same Idempotency-Key returns the first resume"""
+    headers = {"Authorization": f"Bearer {auth_token}", "Idempotency-Key": "create-once"}
+    payload = {"title": "Idempotent", "content": "Created exactly once"}
+    first = client.post("/api/resumes/", json=payload, headers=headers)
+    retry = client.post("/api/resumes/", json=payload, headers=headers)
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+
+    listing = client.get("/api/resumes/?fields=title", headers={"Authorization": f"Bearer {auth_token}"}).json()
+    assert [r["title"] for r in listing].count("Idempotent") == 1
+
+def test_detail_page_paginates_history(client, test_user, auth_token, monkeypatch):
+    """The detail page renders the first page of versions and links to the rest"""
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "HISTORY_PAGE_SIZE", 3)
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    created = client.post("/api/resumes", json={"title": "Paged", "content": "Version number 0 of this resume"}, headers=headers).json()
+    for n in range(1, 5):
+        client.put(f"/api/resumes/{created['id']}", json={"content": f"Version number {n} of this resume"}, headers=headers)
+
+    page = client.get(f"/resumes/{created['id']}", headers=headers)
+    assert page.status_code == 200
+    assert page.text.count("Version from") == 3
+    assert "Current" in page.text and "<!--flush-->" not in page.text
+    assert f"/resumes/{created['id']}/history?before=" in page.text
+
+    before = page.text.split("history?before=")[1].split('"')[0]
+    rest = client.get(f"/resumes/{created['id']}/history?before={before}", headers=headers)
+    assert rest.status_code == 200
+    assert rest.text.count("Version from") == 2
+    assert "history?before=" not in rest.text
+    # The oldest version has nothing before it to diff against
+    assert rest.text.count("Changes in this version") == 1
+
+def test_improve_batch(client, test_user, auth_token, monkeypatch):
+    """A batch improves every resume of the user, in one go, and reports the rest"""
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "IMPROVEMENT_ENGINE", "rules")
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    ids = [
+        client.post("/api/resumes", json={"title": f"Batch {n}", "content": f"- responsible for   project {n}"}, headers=headers).json()["id"]
+        for n in range(3)
+    ]
+
+    response = client.post("/api/resumes/improve-batch", json={"resume_ids": ids + [ids[0], 999999]}, headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert [r["id"] for r in body["improved"]] == ids
+    assert [r["content"] for r in body["improved"]] == [f"- Owned project {n} [Improved]" for n in range(3)]
+    assert body["missing"] == [999999]
+    db = TestingSessionLocal()
+    try:
+        from app.models.resume import Resume
+        assert {db.get(Resume, resume_id).version for resume_id in ids} == {2}
+    finally:
+        db.close()
+
+    history = client.get(f"/api/resumes/{ids[1]}/history", headers=headers).json()
+    assert ("- responsible for   project 1", "- Owned project 1 [Improved]") in {
+        (h["content"], h["improved_content"]) for h in history
+    }
+
+    monkeypatch.setattr(settings, "IMPROVE_BATCH_MAX_SIZE", 2)
+    response = client.post("/api/resumes/improve-batch", json={"resume_ids": ids}, headers=headers)
+    assert response.status_code == 400
+
+def test_match_ranks_resumes_against_a_job(client, test_user, auth_token):
+    """Resumes are ranked by fit with a job posting, including edited and unindexed ones"""
+    from app.models.resume import ResumeTerms
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    designer = client.post("/api/resumes", json={"title": "Designer", "content": "Graphic design with Figma and Photoshop"}, headers=headers).json()
+    backend = client.post("/api/resumes", json={"title": "Backend", "content": "Java services on Oracle databases"}, headers=headers).json()
+    client.put(f"/api/resumes/{backend['id']}", json={"content": "Rust services on PostgreSQL with Kafka"}, headers=headers)
+    # Resumes from before matching existed have no stored terms yet
+    db = TestingSessionLocal()
+    try:
+        db.query(ResumeTerms).filter(ResumeTerms.resume_id == designer["id"]).delete()
+        db.commit()
+    finally:
+        db.close()
+
+    job = {"job_description": "Rust engineer with PostgreSQL and Kafka experience, Figma a plus", "limit": 50}
+    response = client.post("/api/resumes/match", json=job, headers=headers)
+    assert response.status_code == 200
+    ranked = [r for r in response.json() if r["id"] in (designer["id"], backend["id"])]
+    assert [r["title"] for r in ranked] == ["Backend", "Designer"]
+    assert {"rust", "postgresql", "kafka"} <= set(ranked[0]["matched_keywords"])
+    assert "figma" in ranked[0]["missing_keywords"]
+    assert ranked[1]["matched_keywords"] == ["figma"]
+
+def test_similar_resumes_and_duplicate_warning(client, test_user, auth_token):
+    """Near-identical copies are reported on create and by /similar; unrelated resumes are not"""
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    body = " ".join(f"Delivered project {n} on time and improved throughput by {n} percent." for n in range(40))
+    original = client.post("/api/resumes", json={"title": "Original", "content": body}, headers=headers).json()
+    assert original["duplicates"] == []
+    other = client.post("/api/resumes", json={"title": "Other", "content": "Painter and decorator, twenty years of experience"}, headers=headers).json()
+
+    # Serializing the response must not fall back on plain dicts (pydantic warns when it does)
+    with warnings.catch_warnings():
+        warnings.filterwarnings("error", message="Pydantic serializer warnings")
+        copy = client.post("/api/resumes", json={"title": "Copy", "content": body + " Fluent in Spanish."}, headers=headers)
+    assert copy.status_code == 200
+    assert [d["id"] for d in copy.json()["duplicates"]] == [original["id"]]
+    assert copy.json()["duplicates"][0]["similarity"] > 0.9
+
+    similar = client.get(f"/api/resumes/{original['id']}/similar", headers=headers).json()
+    assert [s["id"] for s in similar] == [copy.json()["id"]]
+    assert client.get(f"/api/resumes/{other['id']}/similar", headers=headers).json() == []
+    assert client.get("/api/resumes/999999/similar", headers=headers).status_code == 404
+
+def test_read_resume_with_history(client, test_user, auth_token):
+    """A single resume comes back with its versions"""
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    created = client.post("/api/resumes", json={"title": "Detail", "content": "First version of it"}, headers=headers).json()
+    client.put(f"/api/resumes/{created['id']}", json={"content": "Second version of it"}, headers=headers)
+
+    response = client.get(f"/api/resumes/{created['id']}", headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["content"] == "Second version of it"
+    assert {h["improved_content"] for h in body["history"]} == {None, "Second version of it"}
+    assert "coalesced" not in response.headers
+    assert client.get("/api/resumes/999999", headers=headers).status_code == 404
+
+def test_read_resume_with_buffered_history(client, test_user, auth_token, monkeypatch):
+    """Versions still in the write-behind buffer are listed without an id"""
+    from app.core.config import settings
+    from app.crud import resume as crud_resume, resume_history as crud_resume_history
+    from app.db.history_buffer import HistoryBuffer
+
+    buffer = HistoryBuffer(max_rows=100, flush_seconds=60)
+    monkeypatch.setattr(settings, "HISTORY_DURABILITY", "buffered")
+    monkeypatch.setattr(crud_resume, "history_buffer", buffer)
+    monkeypatch.setattr(crud_resume_history, "history_buffer", buffer)
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    created = client.post("/api/resumes", json={"title": "Buffered", "content": "First buffered version"}, headers=headers).json()
+    client.put(f"/api/resumes/{created['id']}", json={"content": "Second buffered version"}, headers=headers)
+
+    response = client.get(f"/api/resumes/{created['id']}", headers=headers)
+    assert response.status_code == 200
+    history = response.json()["history"]
+    assert [(h["id"], h["improved_content"]) for h in history] == [
+        (None, "Second buffered version"), (None, None)
+    ]
+    assert client.get(f"/api/resumes/{created['id']}/history", headers=headers).json()[0]["id"] is None
+
+    buffer.close()
+    response = client.get(f"/api/resumes/{created['id']}", headers=headers)
+    assert all(h["id"] is not None for h in response.json()["history"])
+
+def test_traced_request_continues_incoming_trace(client, test_user, auth_token, monkeypatch):
+    """A sampled traceparent is continued and the request's stages are exported as spans"""
+    import json
+    from app.core import tracing
+
+    monkeypatch.setattr(tracing, "sampler", tracing.Sampler(rate=0.0, max_per_second=100))
+    exported = []
+    monkeypatch.setattr(tracing.logger, "info", exported.append)
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    created = client.post("/api/resumes", json={"title": "Traced", "content": "Traced resume content"}, headers=headers).json()
+    assert exported == []
+
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+    headers["traceparent"] = f"00-{trace_id}-00f067aa0ba902b7-01"
+    response = client.get(f"/api/resumes/{created['id']}", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["traceresponse"].startswith(f"00-{trace_id}-")
+
+    spans = json.loads(exported[0])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    names = {s["name"] for s in spans}
+    assert {
+        "GET /api/resumes/{resume_id}", "auth.jwt_decode", "auth.user_lookup",
+        "crud.resume.get_resume", "crud.resume.get_resume_history", "serialize"
+    } <= names
+    assert {s["traceId"] for s in spans} == {trace_id}
+
 # Add more test cases for other endpoints (get by id, update, delete, improve)
@@ -0,0 +1,59 @@
+import gzip
+import json
+import os
+
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from app.core.assets import PrecompressedStaticFiles, build_assets, minify_css
+
+CSS_URL = "https://cdn.example/lib/css/all.min.css"
+FILES = {
+    CSS_URL: b"/* banner */\n.icon {\n  font-family: x;\n  src: url(../webfonts/icon.woff2?v=1) format('woff2');\n}\n" * 40,
+    "https://cdn.example/lib/webfonts/icon.woff2?v=1": b"wOF2-font-bytes",
+    "https://cdn.example/app.min.js": b"console.log('hi');" * 50,
+}
+
+
+def test_minify_css_keeps_licence_comments():
+    assert minify_css("/*! MIT */\na {\n  color : red ;\n}\n/* note */") == "/*! MIT */ a{color:red}"
+
+
+def test_build_assets_fingerprints_and_serves_precompressed(tmp_path):
+    manifest = build_assets(
+        {"icons.css": CSS_URL, "app.js": "https://cdn.example/app.min.js"},
+        static_dir=str(tmp_path),
+        fetch=FILES.__getitem__,
+    )
+
+    css_path = tmp_path / manifest["icons.css"]
+    css = css_path.read_text()
+    font_name = css.split("url(")[1].split(")")[0]
+    assert font_name.startswith("icon.") and font_name.endswith(".woff2")
+    assert (tmp_path / "dist" / font_name).read_bytes() == b"wOF2-font-bytes"
+    assert "banner" not in css
+    assert gzip.decompress((tmp_path / (manifest["icons.css"] + ".gz")).read_bytes()) == css.encode()
+    assert json.loads((tmp_path / "dist" / "manifest.json").read_text()) == manifest
+
+    # Same input, same names: repeat builds don't bust client caches
+    again = build_assets(
+        {"icons.css": CSS_URL, "app.js": "https://cdn.example/app.min.js"},
+        static_dir=str(tmp_path),
+        fetch=FILES.__getitem__,
+    )
+    assert again == manifest
+
+    client = TestClient(Starlette(routes=[
+        Mount("/static", PrecompressedStaticFiles(directory=str(tmp_path)))
+    ]))
+    url = "/static/" + manifest["app.js"]
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "immutable" in response.headers["cache-control"]
+    assert response.content == FILES["https://cdn.example/app.min.js"]
+
+    plain = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.content == FILES["https://cdn.example/app.min.js"]
@@ -0,0 +1,25 @@
+from app.core.diff import diff_texts, tokenize
+
+
+def test_word_tokens_round_trip():
+    text = "  Led a team of 5\nengineers.  "
+    assert "".join(tokenize(text, "word")) == text
+
+
+def test_line_diff_collapses_unchanged_runs():
+    old = "".join(f"line {i}\n" for i in range(20))
+    new = old.replace("line 10\n", "line ten\n")
+    diff = diff_texts(old, new, granularity="line", context=2)
+
+    assert [c["op"] for c in diff["chunks"]] == ["skip", "equal", "delete", "insert", "equal", "skip"]
+    assert diff["chunks"][0]["skipped"] == 8
+    assert diff["chunks"][2]["text"] == "line 10\n"
+    assert diff["chunks"][3]["text"] == "line ten\n"
+    assert (diff["insertions"], diff["deletions"]) == (1, 1)
+    assert not diff["truncated"]
+
+
+def test_size_cap_degrades_to_single_replacement():
+    diff = diff_texts("a b c d e", "v w x y z", granularity="word", max_tokens=4)
+    assert diff["truncated"]
+    assert [c["op"] for c in diff["chunks"]] == ["delete", "insert"]
@@ -0,0 +1,35 @@
+import asyncio
+
+from app.core.events import EventBroker, broker, publish_resume_change
+
+
+def test_broker_delivers_only_to_the_owning_user():
+    async def scenario():
+        local = EventBroker()
+        mine = local.subscribe(1)
+        theirs = local.subscribe(2)
+        local.dispatch({"user_id": 1, "resume_id": 7, "version": 2})
+        event = await asyncio.wait_for(mine[1].get(), timeout=1)
+        assert event["resume_id"] == 7
+        assert theirs[1].empty()
+        local.unsubscribe(1, mine)
+        local.unsubscribe(2, theirs)
+        assert local.subscriber_count() == 0
+
+    asyncio.run(scenario())
+
+
+def test_memory_backend_publishes_from_worker_threads():
+    async def scenario():
+        subscription = broker.subscribe(42)
+        try:
+            # crud code runs in the threadpool, not on the event loop
+            await asyncio.to_thread(
+                publish_resume_change, None, "improved", user_id=42, resume_id=5, version=3
+            )
+            event = await asyncio.wait_for(subscription[1].get(), timeout=1)
+            assert (event["type"], event["resume_id"], event["version"]) == ("improved", 5, 3)
+        finally:
+            broker.unsubscribe(42, subscription)
+
+    asyncio.run(scenario())
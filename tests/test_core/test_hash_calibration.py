@@ -0,0 +1,47 @@
+from passlib.hash import bcrypt
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.base import Base
+from app.models import User
+from app.core.config import settings
+from app.core.hash_calibration import calibrate, write_env_setting
+from app.crud.user import authenticate_user
+
+
+def test_calibrate_picks_highest_cost_within_budget():
+    measured = []
+    def fake_measure(rounds, samples):
+        measured.append(rounds)
+        return 2 ** (rounds - 10) * 60.0  # 60 ms at cost 10, doubling per step
+
+    rounds, timings = calibrate(250, min_rounds=10, max_rounds=16, measure=fake_measure)
+    assert rounds == 12
+    assert measured == [10, 11, 12, 13]
+
+    rounds, _ = calibrate(10, min_rounds=10, measure=fake_measure)
+    assert rounds == 10
+
+
+def test_write_env_setting_replaces_or_appends(tmp_path):
+    env_file = tmp_path / ".env"
+    env_file.write_text("SECRET_KEY=abc\nBCRYPT_ROUNDS=12\n")
+    write_env_setting(str(env_file), "BCRYPT_ROUNDS", "11")
+    write_env_setting(str(env_file), "DEBUG", "False")
+    assert env_file.read_text() == "SECRET_KEY=abc\nBCRYPT_ROUNDS=11\nDEBUG=False\n"
+
+
+def test_login_rehashes_password_with_other_cost():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    other_cost = 4 if settings.BCRYPT_ROUNDS != 4 else 5
+    db.add(User(email="rehash@example.com", hashed_password=bcrypt.using(rounds=other_cost).hash("secret123")))
+    db.commit()
+
+    assert authenticate_user(db, "rehash@example.com", "wrong") is False
+    user = authenticate_user(db, "rehash@example.com", "secret123")
+    assert bcrypt.from_string(user.hashed_password).rounds == settings.BCRYPT_ROUNDS
+    assert authenticate_user(db, "rehash@example.com", "secret123")
+    db.close()
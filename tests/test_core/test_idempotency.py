@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+from pydantic import BaseModel
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.models import User
+from app.core.idempotency import REPLAY_HEADER, run_idempotent
+
+
+class Result(BaseModel):
+    value: int
+
+
+@pytest.fixture()
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/idempotency.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = factory()
+    db.add(User(id=1, email="idem@example.com", hashed_password="x"))
+    db.commit()
+    db.close()
+    yield factory
+    engine.dispose()
+
+
+def test_concurrent_duplicate_waits_and_replays(session_factory):
+    calls = []
+    def operation():
+        calls.append(1)
+        time.sleep(0.3)
+        return {"value": len(calls)}
+
+    responses = []
+    def request():
+        db = session_factory()
+        try:
+            responses.append(run_idempotent(db, 1, "key-1", "POST /x {}", operation, Result))
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=request) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.05)
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert {r.body for r in responses} == {b'{"value": 1}'}
+    assert sum(REPLAY_HEADER.lower() in r.headers for r in responses) == 2
+
+
+def test_failed_original_releases_key(session_factory):
+    db = session_factory()
+    def failing():
+        raise RuntimeError("boom")
+    with pytest.raises(RuntimeError):
+        run_idempotent(db, 1, "key-2", "POST /x {}", failing, Result)
+
+    response = run_idempotent(db, 1, "key-2", "POST /x {}", lambda: {"value": 7}, Result)
+    assert response.body == b'{"value": 7}'
+
+    from fastapi import HTTPException
+    with pytest.raises(HTTPException) as exc:
+        run_idempotent(db, 1, "key-2", "POST /x {\"other\": 1}", lambda: {"value": 8}, Result)
+    assert exc.value.status_code == 422
+    db.close()
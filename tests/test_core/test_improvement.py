@@ -0,0 +1,36 @@
+import pytest
+
+from app.core import improvement
+from app.core.improvement import RuleBasedEngine, improve_many, load_engine
+
+
+def test_rules_normalize_bullets_and_whitespace():
+    text = "Experience\r\n\r\n\r\n\r\n*   Built   the API  \n\t• Shipped releases\n"
+    assert RuleBasedEngine().improve(text) == "Experience\n\n- Built the API\n- Shipped releases"
+
+
+def test_rules_replace_weak_verbs_and_drop_duplicate_lines():
+    text = "- responsible for billing\n- Worked on search\n- Worked on search \nI worked on it"
+    assert RuleBasedEngine().improve(text) == "- Owned billing\n- Delivered search\nI worked on it"
+
+
+def test_load_engine_by_name_and_path():
+    assert load_engine("rules").name == "rules"
+    assert load_engine("app.core.improvement:MarkerEngine").name == "marker"
+    with pytest.raises(ValueError):
+        load_engine("nope")
+    with pytest.raises(ValueError):
+        load_engine("app.core.config:Settings")
+
+
+def test_improve_many_matches_single_calls(monkeypatch):
+    contents = [f"- helped with release {n}\n- helped with release {n}" for n in range(6)]
+    expected = [RuleBasedEngine().improve(content) for content in contents]
+    assert improve_many(contents, "rules") == expected
+
+    monkeypatch.setattr(improvement.settings, "IMPROVEMENT_WORKERS", 2)
+    monkeypatch.setattr(improvement.settings, "IMPROVEMENT_PARALLEL_MIN_BATCH", 2)
+    try:
+        assert improve_many(contents, "rules") == expected
+    finally:
+        improvement.shutdown_pool()
@@ -0,0 +1,25 @@
+from app.core.matching import rank, term_vector, tokenize
+
+
+def test_tokenize_keeps_technology_names():
+    assert tokenize("We know C++, C# and Node.js with 5 years of R.") == ["know", "c++", "c#", "node.js", "r"]
+
+
+def test_rank_prefers_the_closest_resume():
+    documents = [
+        term_vector("Python developer. Built Django and PostgreSQL services."),
+        term_vector("Graphic designer working with Photoshop and Illustrator."),
+        term_vector("Python and Kubernetes engineer running PostgreSQL on AWS."),
+    ]
+    matches = rank("Backend engineer: Python, PostgreSQL, Kubernetes, AWS", documents)
+
+    assert [m.index for m in matches] == [2, 0, 1]
+    assert matches[2].score == 0
+    assert set(matches[0].matched) == {"python", "postgresql", "kubernetes", "aws", "engineer"}
+    assert matches[0].missing == ["backend"]
+    assert set(matches[1].missing) >= {"kubernetes", "aws"}
+
+
+def test_rank_without_query_terms():
+    assert rank("the and of", [term_vector("Python")]) == []
+    assert rank("Python", []) == []
@@ -0,0 +1,33 @@
+import random
+
+from app.core import minhash
+
+
+def _words(n, seed):
+    rng = random.Random(seed)
+    return [rng.choice(["led", "built", "python", "team", "api", "data", "scaled", "design", "cloud", "sales"]) + str(rng.randint(0, 50)) for _ in range(n)]
+
+
+def test_signature_estimates_jaccard():
+    words = _words(400, 1)
+    original = " ".join(words)
+    edited = " ".join(words[:380] + _words(20, 2))
+    unrelated = " ".join(_words(400, 3))
+
+    sig = minhash.signature(original)
+    assert minhash.from_bytes(minhash.to_bytes(sig)).tolist() == sig.tolist()
+    assert (minhash.signature(original) == sig).all()
+
+    near, far = minhash.similarity(sig, [minhash.signature(edited), minhash.signature(unrelated)])
+    assert near > 0.8
+    assert far < 0.1
+
+
+def test_near_duplicates_share_a_bucket():
+    words = _words(300, 4)
+    original = minhash.buckets(minhash.signature(" ".join(words)))
+    assert len(original) == minhash.BANDS
+    edited = minhash.buckets(minhash.signature(" ".join(words[:295] + ["changed"] * 5)))
+    unrelated = minhash.buckets(minhash.signature(" ".join(_words(300, 5))))
+    assert set(original) & set(edited)
+    assert not set(original) & set(unrelated)
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.base import Base
+from app.core.revocation import BloomFilter, RevocationList
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [f"jti-{i}" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_revocation_reaches_other_workers_on_refresh(db):
+    expires = datetime.now(timezone.utc) + timedelta(hours=1)
+    worker_a = RevocationList(capacity=1000, error_rate=0.01, refresh_seconds=60)
+    worker_b = RevocationList(capacity=1000, error_rate=0.01, refresh_seconds=60)
+    assert not worker_b.is_revoked(db, "abc")
+
+    worker_a.revoke(db, "abc", expires)
+    assert worker_a.is_revoked(db, "abc")
+    # worker_b only sees it once its refresh interval is up
+    assert not worker_b.is_revoked(db, "abc")
+    worker_b.refresh(db, force=True)
+    assert worker_b.is_revoked(db, "abc")
+
+    lookups = worker_b.db_lookups
+    assert not worker_b.is_revoked(db, "never-revoked")
+    assert worker_b.db_lookups == lookups
@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+def _wait_for(flight, counter, value):
+    while flight.snapshot()[counter] < value:
+        time.sleep(0.001)
+
+
+def _run_concurrently(flight, key, fn, callers, before_wait=None):
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(flight.do(key, fn, before_wait=before_wait))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls, released = [], []
+
+    def slow_read():
+        calls.append(1)
+        release.wait(5)
+        return b"body"
+
+    threads, results, _ = _run_concurrently(
+        flight, (1, "detail", 7), slow_read, 5, before_wait=lambda: released.append(1)
+    )
+    _wait_for(flight, "collapsed", 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    # Only the waiting requests give up their connection
+    assert len(released) == 4
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert {body for body, _ in results} == {b"body"}
+    snapshot = flight.snapshot()
+    assert (snapshot["executed"], snapshot["collapsed"], snapshot["in_flight"]) == (1, 4, 0)
+
+    # Finished calls are not cached
+    assert flight.do((1, "detail", 7), lambda: b"new") == (b"new", False)
+
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def failing_read():
+        release.wait(5)
+        raise LookupError("gone")
+
+    threads, results, errors = _run_concurrently(flight, (1, "detail", 8), failing_read, 3)
+    _wait_for(flight, "collapsed", 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == [] and len(errors) == 3
+
+
+def test_forget_starts_a_fresh_call_after_a_write():
+    flight = SingleFlight()
+    release = threading.Event()
+    threads, results, _ = _run_concurrently(flight, (1, "list"), lambda: release.wait(5) and b"old", 1)
+    _wait_for(flight, "in_flight", 1)
+
+    flight.forget(2)
+    assert flight.snapshot()["in_flight"] == 1
+    flight.forget(1)
+    assert flight.do((1, "list"), lambda: b"new") == (b"new", False)
+    release.set()
+    threads[0].join()
+    assert results == [(b"old", False)]
+
+
+def test_leader_exception_is_raised():
+    def broken_read():
+        raise ValueError("bad")
+
+    flight = SingleFlight()
+    with pytest.raises(ValueError):
+        flight.do((1,), broken_read)
+    assert flight.snapshot()["in_flight"] == 0
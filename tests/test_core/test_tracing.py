@@ -0,0 +1,93 @@
+import contextvars
+import json
+import logging
+import threading
+
+import pytest
+
+from app.core import tracing
+from app.core.tracing import Sampler, span, start_trace, traced
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+@pytest.fixture
+def trace_file(tmp_path, monkeypatch):
+    """Export into tmp_path instead of the logs/traces.jsonl the app's logging config writes"""
+    path = tmp_path / "traces.jsonl"
+    handler = logging.FileHandler(path, encoding="utf8")
+    monkeypatch.setattr(tracing.logger, "handlers", [handler])
+    monkeypatch.setattr(tracing.logger, "level", logging.INFO)
+    monkeypatch.setattr(tracing.logger, "propagate", False)
+    yield path
+    handler.close()
+
+
+def test_sampler_follows_the_caller_and_caps_the_rate():
+    assert not Sampler(rate=1.0, max_per_second=10).sample(parent_sampled=False)
+    assert Sampler(rate=0.0, max_per_second=10).sample(parent_sampled=True)
+    assert not Sampler(rate=0.0, max_per_second=10).sample()
+    assert not Sampler(rate=1.0, max_per_second=0).sample(parent_sampled=True)
+
+    capped = Sampler(rate=1.0, max_per_second=3)
+    assert [capped.sample() for _ in range(5)] == [True, True, True, False, False]
+
+
+def test_incoming_traceparent_is_continued(monkeypatch):
+    monkeypatch.setattr(tracing, "sampler", Sampler(rate=0.0, max_per_second=100))
+
+    root = start_trace(f"00-{TRACE_ID}-{PARENT_ID}-01", "GET /", {})
+    assert root.trace.trace_id == TRACE_ID
+    assert root.parent_id == PARENT_ID
+    assert root.traceparent.startswith(f"00-{TRACE_ID}-") and root.traceparent.endswith("-01")
+
+    # Not sampled upstream, malformed, or absent with a zero rate: no trace
+    assert start_trace(f"00-{TRACE_ID}-{PARENT_ID}-00", "GET /", {}) is None
+    assert start_trace(f"00-{'0' * 32}-{PARENT_ID}-01", "GET /", {}) is None
+    assert start_trace("garbage", "GET /", {}) is None
+    assert start_trace(None, "GET /", {}) is None
+
+
+def test_spans_nest_across_threads_and_export_as_otlp(monkeypatch, trace_file):
+    monkeypatch.setattr(tracing, "sampler", Sampler(rate=1.0, max_per_second=100))
+
+    @traced("lookup")
+    def lookup():
+        with span("inner", rows=2):
+            pass
+
+    with span("outside") as outside:
+        assert outside is None
+
+    root = start_trace(None, "GET /api/resumes/{resume_id}", {"http.request.method": "GET"})
+    token = tracing.activate(root)
+    lookup()
+    # Threads started with a copy of the context, like Starlette's threadpool
+    context = contextvars.copy_context()
+    thread = threading.Thread(target=context.run, args=(lookup,))
+    thread.start()
+    thread.join()
+    try:
+        with span("failing"):
+            raise ValueError("boom")
+    except ValueError:
+        pass
+    tracing.end_trace(root, token)
+
+    exported = trace_file.read_text().splitlines()
+    assert len(exported) == 1
+    spans = json.loads(exported[0])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    by_name = {}
+    for s in spans:
+        by_name.setdefault(s["name"], []).append(s)
+    outer = by_name["lookup"]
+    root_span = by_name["GET /api/resumes/{resume_id}"][0]
+    assert len(outer) == 2 and all(s["parentSpanId"] == root_span["spanId"] for s in outer)
+    assert {s["parentSpanId"] for s in by_name["inner"]} == {s["spanId"] for s in outer}
+    assert by_name["inner"][0]["attributes"] == [{"key": "rows", "value": {"intValue": "2"}}]
+    assert by_name["failing"][0]["status"] == {"code": 2, "message": "ValueError: boom"}
+    assert root_span["kind"] == tracing.SPAN_KIND_SERVER and "parentSpanId" not in root_span
+    assert {s["traceId"] for s in spans} == {root.trace.trace_id}
+    assert int(root_span["endTimeUnixNano"]) >= int(root_span["startTimeUnixNano"])
+    assert tracing._current_span.get() is None
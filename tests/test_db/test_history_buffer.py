@@ -0,0 +1,132 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud import resume as crud_resume
+from app.crud import resume_history as crud_history
+from app.db.base import Base
+from app.db.history_buffer import HistoryBuffer
+from app.models import Resume, ResumeHistory, User
+from app.schemas.resume import ResumeUpdate
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'history.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def resume(engine):
+    with Session(engine) as db:
+        user = User(email="buffer@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        resume = Resume(title="Buffered", content="Version 0", user_id=user.id)
+        db.add(resume)
+        db.flush()
+        db.add(ResumeHistory(resume_id=resume.id, content="Stored", created_at=datetime.utcnow() - timedelta(days=1)))
+        db.commit()
+        return resume.id, user.id
+
+
+def _row(resume_id, n):
+    return {"resume_id": resume_id, "content": f"Version {n}", "improved_content": None,
+            "created_at": datetime.utcnow()}
+
+
+def _stored(engine, resume_id):
+    with Session(engine) as db:
+        return db.scalar(select(func.count()).select_from(ResumeHistory).where(ResumeHistory.resume_id == resume_id))
+
+
+def test_queued_rows_are_read_until_flushed_in_one_batch(engine, resume):
+    resume_id, _ = resume
+    buffer = HistoryBuffer(max_rows=100, flush_seconds=60)
+    with Session(engine) as db:
+        for n in (1, 2, 3):
+            buffer.add(db, _row(resume_id, n))
+        assert _stored(engine, resume_id) == 1
+
+        def fetch(skip, limit):
+            return db.scalars(
+                select(ResumeHistory).where(ResumeHistory.resume_id == resume_id).offset(skip).limit(limit)
+            ).all()
+
+        page = buffer.read_page(db, resume_id, 0, 10, fetch)
+        assert [entry.content for entry in page] == ["Version 3", "Version 2", "Version 1", "Stored"]
+        assert [entry.id for entry in page[:3]] == [None, None, None]
+        # Later pages skip the queued rows first, then stored ones
+        assert [entry.content for entry in buffer.read_page(db, resume_id, 2, 2, fetch)] == ["Version 1", "Stored"]
+        assert buffer.read_page(db, resume_id, 4, 2, fetch) == []
+
+        assert buffer.flush() == 3
+        assert _stored(engine, resume_id) == 4
+        assert [entry.id is not None for entry in buffer.read_page(db, resume_id, 0, 10, fetch)] == [True] * 4
+    assert buffer.snapshot()["batches"] == 1
+    assert buffer.snapshot()["queued"] == 0
+    buffer.close()
+
+
+def test_flushes_in_the_background_once_max_rows_are_queued(engine, resume):
+    resume_id, _ = resume
+    buffer = HistoryBuffer(max_rows=2, flush_seconds=60)
+    with Session(engine) as db:
+        buffer.add(db, _row(resume_id, 1))
+        buffer.add(db, _row(resume_id, 2))
+    deadline = time.monotonic() + 5
+    while buffer.snapshot()["flushed"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert _stored(engine, resume_id) == 3
+    buffer.close()
+
+
+def test_discard_and_close(engine, resume):
+    resume_id, _ = resume
+    buffer = HistoryBuffer(max_rows=100, flush_seconds=60)
+    with Session(engine) as db:
+        buffer.add(db, _row(resume_id, 1))
+        buffer.add(db, _row(resume_id, 2))
+        assert buffer.discard(db, resume_id) == 2
+        buffer.add(db, _row(resume_id, 3))
+
+    # Closing writes what is queued; rows added afterwards join the caller's transaction
+    assert buffer.close() == 1
+    assert _stored(engine, resume_id) == 2
+    with Session(engine) as db:
+        buffer.add(db, _row(resume_id, 4))
+        db.commit()
+    assert _stored(engine, resume_id) == 3
+
+
+def test_edits_queue_their_history_when_buffered(engine, resume, monkeypatch):
+    resume_id, user_id = resume
+    buffer = HistoryBuffer(max_rows=100, flush_seconds=60)
+    monkeypatch.setattr(settings, "HISTORY_DURABILITY", "buffered")
+    monkeypatch.setattr(crud_resume, "history_buffer", buffer)
+    monkeypatch.setattr(crud_history, "history_buffer", buffer)
+
+    with Session(engine) as db:
+        crud_resume.update_resume(db, resume_id, ResumeUpdate(content="Version one"), user_id)
+        crud_resume.improve_resume(db, resume_id, user_id)
+        assert _stored(engine, resume_id) == 1
+
+        history = crud_resume.get_resume_history(db, resume_id, user_id)
+        assert [entry.improved_content for entry in history[:2]] == ["Version one [Improved]", "Version one"]
+        assert crud_history.get_latest_resume_history(db, resume_id).id is None
+        assert len(crud_resume.get_resume_history_page(db, resume_id, limit=1)) == 3
+
+        buffer.flush()
+        assert _stored(engine, resume_id) == 3
+        assert crud_history.get_latest_resume_history(db, resume_id).improved_content == "Version one [Improved]"
+
+        crud_resume.update_resume(db, resume_id, ResumeUpdate(content="Version two"), user_id)
+        crud_resume.delete_resume(db, resume_id, user_id)
+    assert buffer.snapshot()["queued"] == 0
+    buffer.close()
@@ -0,0 +1,46 @@
+from datetime import date
+
+from sqlalchemy import create_engine
+
+from app.db.partitions import (
+    add_months, months_between, partition_name, partition_bounds,
+    create_partition_sql, create_partition_from_default_sql, ensure_history_partitions,
+    drop_history_partitions_before
+)
+
+
+def test_month_arithmetic_wraps_years():
+    assert add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert months_between(date(2026, 11, 20), date(2027, 1, 5)) == [
+        date(2026, 11, 1), date(2026, 12, 1), date(2027, 1, 1)
+    ]
+
+
+def test_partition_ddl():
+    month = date(2026, 12, 17)
+    assert partition_name(month) == "resume_history_y2026m12"
+    assert partition_bounds(month) == (date(2026, 12, 1), date(2027, 1, 1))
+    assert create_partition_sql(month) == (
+        "CREATE TABLE IF NOT EXISTS resume_history_y2026m12 PARTITION OF resume_history "
+        "FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')"
+    )
+
+
+def test_partition_ddl_moving_rows_out_of_default():
+    create, move, attach = create_partition_from_default_sql(date(2026, 12, 17))
+    assert create == "CREATE TABLE resume_history_y2026m12 (LIKE resume_history INCLUDING DEFAULTS)"
+    assert move.startswith("WITH moved AS (DELETE FROM resume_history_default WHERE created_at >= '2026-12-01' ")
+    assert move.endswith("INSERT INTO resume_history_y2026m12 "
+                         "(id, resume_id, content, improved_content, created_at) "
+                         "SELECT id, resume_id, content, improved_content, created_at FROM moved")
+    assert attach == (
+        "ALTER TABLE resume_history ATTACH PARTITION resume_history_y2026m12 "
+        "FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')"
+    )
+
+
+def test_maintenance_is_a_noop_on_sqlite():
+    engine = create_engine("sqlite://")
+    assert ensure_history_partitions(engine, months_ahead=3) == []
+    assert drop_history_partitions_before(engine, date(2030, 1, 1)) == []
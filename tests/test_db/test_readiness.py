@@ -0,0 +1,44 @@
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+from app.db.readiness import ReadinessChecker, check_databases, check_readiness
+
+
+def test_ready_when_database_answers(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/ready.db", poolclass=QueuePool, pool_size=1, max_overflow=0)
+    verdict = check_readiness(engine)
+    assert verdict["ready"]
+    assert verdict["database"]["status"] == "connected"
+    assert verdict["pool"]["capacity"] == 1
+    engine.dispose()
+
+
+def test_not_ready_when_pool_is_exhausted(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/ready.db", poolclass=QueuePool, pool_size=1, max_overflow=0)
+    with engine.connect():
+        verdict = check_readiness(engine)
+    assert not verdict["ready"]
+    assert verdict["reason"] == "connection pool saturated"
+    engine.dispose()
+
+
+def test_not_ready_when_any_shard_is_unreachable(tmp_path):
+    directory = create_engine(f"sqlite:///{tmp_path}/directory.db")
+    shard = create_engine(f"sqlite:///{tmp_path}/missing/shard.db")
+    verdict = check_databases({"directory": directory, "a": shard})
+    assert not verdict["ready"]
+    assert verdict["reason"] == "a: database unreachable"
+    assert verdict["databases"]["directory"]["database"]["status"] == "connected"
+    assert check_databases({"directory": directory})["ready"]
+    directory.dispose()
+    shard.dispose()
+
+
+def test_cached_verdict_goes_stale(monkeypatch):
+    checker = ReadinessChecker()
+    assert checker.snapshot()["reason"] == "starting"
+    checker.update({"ready": True, "reason": None})
+    assert checker.snapshot()["ready"]
+    monkeypatch.setattr(settings, "HEALTH_CHECK_INTERVAL_SECONDS", -1)
+    assert checker.snapshot()["reason"] == "readiness check is stale"
@@ -0,0 +1,156 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, func, select
+
+from app.core.security import create_access_token
+from app.db.base import Base
+from app.db.sharding import DIRECTORY, ShardRouter, parse_shards
+from app.jobs.shard_rebalance import move_users, plan_moves
+from app.models import Resume, ResumeHistory, User, UserShard, UserStats
+
+
+@pytest.fixture()
+def router(tmp_path):
+    directory = create_engine(f"sqlite:///{tmp_path / 'directory.db'}")
+    router = ShardRouter(directory, {
+        "a": f"sqlite:///{tmp_path / 'a.db'}",
+        "b": f"sqlite:///{tmp_path / 'b.db'}",
+    })
+    for engine in router.engines():
+        Base.metadata.create_all(bind=engine)
+    return router
+
+
+def _request(token):
+    return SimpleNamespace(cookies={}, headers={"Authorization": f"Bearer {token}"})
+
+
+def _count(db, column, **filters):
+    stmt = select(func.count(column))
+    for name, value in filters.items():
+        stmt = stmt.where(getattr(column.class_, name) == value)
+    return db.scalar(stmt)
+
+
+def test_parse_shards():
+    assert parse_shards(" a=postgresql://x/a?sslmode=require , b=sqlite:///b.db,") == {
+        "a": "postgresql://x/a?sslmode=require", "b": "sqlite:///b.db"
+    }
+    assert parse_shards("") == {}
+    for bad in ("a", "=sqlite://", "a=x,a=y", f"{DIRECTORY}=sqlite://"):
+        with pytest.raises(ValueError):
+            parse_shards(bad)
+
+
+def test_placement_rules(router):
+    placed = [router.place(user_id) for user_id in range(1, 1001)]
+    assert placed == [router.place(user_id) for user_id in range(1, 1001)]
+    assert 400 < placed.count("a") < 600
+
+    ranged = ShardRouter(router.directory_engine, router.shard_urls, strategy="range", range_size=10)
+    assert [ranged.place(user_id) for user_id in (1, 10, 11, 20, 21)] == ["a", "a", "b", "b", "a"]
+
+
+def test_new_users_are_routed_to_their_shard(router):
+    with router.directory_session() as db:
+        user = User(email="sharded@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        router.register_user(db, user)
+        user_id = user.id
+        shard = db.get(UserShard, user_id).shard
+    assert shard == router.place(user_id)
+
+    with router.session_factory(shard)() as shard_db:
+        assert shard_db.get(User, user_id).email == "sharded@example.com"
+
+    for token in (
+        create_access_token({"sub": "sharded@example.com", "uid": user_id}),
+        create_access_token({"sub": "sharded@example.com"}),
+    ):
+        with router.session_for_request(_request(token)) as db:
+            assert db.get_bind() is router.session_factory(shard).kw["bind"]
+    with router.session_for_request(_request("garbage")) as db:
+        assert db.get_bind() is router.directory_engine
+
+    with router.directory_session() as db:
+        db.get(UserShard, user_id).moving = True
+        db.commit()
+    router.invalidate(user_id)
+    with pytest.raises(HTTPException) as error:
+        router.session_for_user(user_id)
+    assert error.value.status_code == 503
+
+
+def test_password_rehash_reaches_the_shard_copy(router, monkeypatch):
+    from app.core.security import get_password_hash
+    from app.crud import user as crud_user
+
+    monkeypatch.setattr(crud_user, "shard_router", router)
+    with router.directory_session() as db:
+        user = User(email="rehash@example.com", hashed_password=get_password_hash("secret123"))
+        db.add(user)
+        db.commit()
+        router.register_user(db, user)
+        user_id, shard = user.id, router.lookup(user.id)[0]
+
+    monkeypatch.setattr(crud_user, "password_needs_rehash", lambda hashed: True)
+    with router.directory_session() as db:
+        rehashed = crud_user.authenticate_user(db, "rehash@example.com", "secret123").hashed_password
+    with router.session_factory(shard)() as shard_db:
+        assert shard_db.get(User, user_id).hashed_password == rehashed
+
+
+def test_rebalance_moves_pre_sharding_users(router):
+    with router.directory_session() as db:
+        user = User(email="legacy@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        for n in range(3):
+            resume = Resume(title=f"R{n}", content="now", user_id=user.id, version=n + 2)
+            resume.history = [ResumeHistory(content=f"v{k}") for k in range(n + 2)]
+            db.add(resume)
+        db.add(UserStats(user_id=user.id, resume_count=3, history_count=9))
+        db.commit()
+        user_id = user.id
+
+    moves = list(plan_moves(router))
+    assert moves == [(user_id, DIRECTORY, router.place(user_id))]
+    stats = move_users(router, moves, settle_seconds=0)
+    assert (stats.users, stats.resumes, stats.history) == (1, 3, 9)
+
+    target = router.place(user_id)
+    assert router.lookup(user_id) == (target, False)
+    with router.session_factory(target)() as db:
+        assert _count(db, Resume.id, user_id=user_id) == 3
+        assert _count(db, ResumeHistory.id) == 9
+        assert db.get(UserStats, user_id).history_count == 9
+    with router.directory_session() as db:
+        assert _count(db, Resume.id) == 0
+        assert _count(db, ResumeHistory.id) == 0
+        # The directory keeps the authoritative users row
+        assert db.get(User, user_id) is not None
+    assert list(plan_moves(router)) == []
+
+
+def test_diffs_are_cached_per_shard(router):
+    from sqlalchemy.orm import Session
+
+    from app.crud.resume_history import diff_versions
+
+    # Each shard numbers its rows from 1, so both resumes and versions share ids
+    diffs = []
+    for name, text in (("a", "Alice's resume"), ("b", "Bob's resume")):
+        with Session(router.session_factory(name).kw["bind"]) as db:
+            user = User(email=f"{name}@example.com", hashed_password="x")
+            db.add(user)
+            db.flush()
+            resume = Resume(title=name, content=text, user_id=user.id)
+            resume.history = [ResumeHistory(content="Old"), ResumeHistory(content=text)]
+            db.add(resume)
+            db.commit()
+            assert (resume.id, resume.history[1].id) == (1, 2)
+            diffs.append(diff_versions(db, resume, 1, 2))
+    assert [diff["chunks"][-1]["text"] for diff in diffs] == ["Alice's resume", "Bob's resume"]
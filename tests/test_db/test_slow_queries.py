@@ -0,0 +1,78 @@
+import json
+import logging
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.core.config import settings
+from app.db import slow_queries
+from app.db.slow_queries import (
+    SlowQueryLog, explain_prefix, install_slow_query_log, normalize_sql, params_shape, slow_query_log
+)
+
+
+@pytest.fixture
+def slow_query_file(tmp_path, monkeypatch):
+    """Log into tmp_path instead of the logs/slow_queries.log the app's logging config writes"""
+    path = tmp_path / "slow_queries.log"
+    handler = logging.FileHandler(path, encoding="utf8")
+    monkeypatch.setattr(slow_queries.logger, "handlers", [handler])
+    monkeypatch.setattr(slow_queries.logger, "level", logging.INFO)
+    monkeypatch.setattr(slow_queries.logger, "propagate", False)
+    yield path
+    handler.close()
+
+
+def test_normalize_sql_groups_repeats():
+    a = normalize_sql("SELECT * FROM resumes\n WHERE id IN (1, 2, 3) AND title = 'x''y'")
+    b = normalize_sql("SELECT * FROM resumes WHERE id IN (7, 8) AND title = 'z'")
+    assert a == b == "SELECT * FROM resumes WHERE id IN (?, ...) AND title = ?"
+    assert normalize_sql("SELECT * FROM resume_history_y2026m01 WHERE id = %(id_1)s") == \
+        "SELECT * FROM resume_history_y2026m01 WHERE id = ?"
+
+
+def test_params_shape_never_includes_values():
+    assert params_shape({"email": "a@b.c", "id": 3}, False) == {"email": "str", "id": "int"}
+    assert params_shape([(1, "x"), (2, "y")], True) == {"rows": 2, "row": ["int", "str"]}
+
+
+def test_only_plain_reads_are_explained_with_analyze():
+    analyze = "EXPLAIN (ANALYZE, BUFFERS) "
+    assert explain_prefix("postgresql", "SELECT resumes.id FROM resumes JOIN users ON users.id = resumes.user_id") == analyze
+    assert explain_prefix("postgresql", "SELECT count(*), max(updated_at) FROM resumes") == analyze
+    for statement in (
+        "UPDATE resumes SET version = version + 1",
+        "WITH moved AS (DELETE FROM resumes RETURNING id) SELECT * FROM moved",
+        "SELECT * FROM resume_capture_edit(%(resume_id)s, %(user_id)s, %(content)s)",
+        "SELECT resumes.id FROM resumes WHERE resumes.id IN (1, 2) FOR UPDATE",
+        "SELECT id FROM resumes FOR NO KEY UPDATE SKIP LOCKED",
+        "SELECT nextval('resume_history_id_seq')",
+    ):
+        assert explain_prefix("postgresql", statement) == "EXPLAIN ", statement
+    assert explain_prefix("sqlite", "SELECT 1") == "EXPLAIN QUERY PLAN "
+
+
+def test_slow_statements_are_recorded_and_explained(tmp_path, monkeypatch, slow_query_file):
+    monkeypatch.setattr(settings, "SLOW_QUERY_THRESHOLD_MS", 0.0001)
+    engine = create_engine(f"sqlite:///{tmp_path}/slow.db")
+    install_slow_query_log(engine)
+    slow_query_log.clear()
+    with engine.connect() as connection:
+        connection.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)"))
+        connection.execute(text("SELECT name FROM t WHERE id = :id"), {"id": 5})
+
+    snapshot = slow_query_log.snapshot()
+    statements = {s["statement"]: s for s in snapshot["statements"]}
+    assert statements["SELECT name FROM t WHERE id = ?"]["count"] == 1
+    entry = next(e for e in snapshot["recent"] if e["statement"].startswith("SELECT name"))
+    assert entry["params"] == ["int"]
+    assert entry["route"] is None
+    logged = [json.loads(line) for line in slow_query_file.read_text().splitlines()]
+    assert "SELECT name FROM t WHERE id = ?" in {line["statement"] for line in logged}
+
+    deadline = time.monotonic() + 5
+    while entry["plan"] is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert "SEARCH t USING INTEGER PRIMARY KEY" in entry["plan"]
+    engine.dispose()
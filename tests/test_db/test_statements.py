@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine.default import CacheStats
+from sqlalchemy.orm import Session
+
+from app.crud.resume import get_resume_history, get_resumes
+from app.db import statements
+from app.db.base import Base, engine_options
+from app.models import Resume, ResumeHistory, User
+
+
+def test_prebuilt_statements_are_compiled_once():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    cache_hits = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        cache_hits.append(context.cache_hit == CacheStats.CACHE_HIT)
+
+    with Session(engine) as db:
+        user = User(email="prebuilt@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        db.add_all(Resume(title=f"R{n}", content="Prebuilt content", user_id=user.id) for n in range(3))
+        db.flush()
+        first = db.scalars(statements.RESUMES_BY_USER, {"user_id": user.id, "skip": 0, "limit": 10}).first()
+        db.add_all(ResumeHistory(resume_id=first.id, content=f"Version {n}") for n in range(3))
+        db.commit()
+        user_id, resume_id = user.id, first.id
+
+        cache_hits.clear()
+        for skip in range(3):
+            assert len(get_resumes(db, user_id, skip=skip, limit=2)) == min(2, 3 - skip)
+        assert [r.title for r in get_resumes(db, user_id, fields=["title"])] == ["R0", "R1", "R2"]
+        assert statements.resumes_by_user_fields(("title",)) is statements.resumes_by_user_fields(("title",))
+        assert len(get_resume_history(db, resume_id, user_id, limit=2, with_content=False)) == 2
+        assert db.scalars(statements.USER_BY_EMAIL, {"email": "prebuilt@example.com"}).first().id == user_id
+
+    # Different skip/limit values reuse the compiled form of the same statement
+    assert cache_hits[:3] == [True, True, True]
+
+
+def test_improve_locks_the_resume_it_rewrites(monkeypatch):
+    from sqlalchemy.dialects import postgresql
+
+    from app.crud import resume as crud_resume
+
+    assert str(statements.RESUME_BY_OWNER_FOR_UPDATE.compile(dialect=postgresql.dialect())).endswith("FOR UPDATE")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    executed = []
+    original = Session.scalars
+
+    def scalars(self, statement, *args, **kwargs):
+        executed.append(statement)
+        return original(self, statement, *args, **kwargs)
+
+    monkeypatch.setattr(Session, "scalars", scalars)
+    with Session(engine) as db:
+        user = User(email="lock@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        resume = Resume(title="Lock", content="Locked content", user_id=user.id)
+        db.add(resume)
+        db.commit()
+        crud_resume.improve_resume(db, resume.id, user.id)
+    assert statements.RESUME_BY_OWNER_FOR_UPDATE in executed
+
+
+def test_engine_options_only_for_psycopg3():
+    assert engine_options("sqlite://") == {}
+    assert engine_options("postgresql://u@h/db") == {}
+    assert engine_options("postgresql+psycopg://u@h/db") == {"connect_args": {"prepare_threshold": 5}}
+
+
+def test_recent_resumes_count_never_edited_ones_from_creation():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    with Session(engine) as db:
+        user = User(email="recent@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        db.add_all([
+            Resume(title="Edited today", content="x", user_id=user.id,
+                   created_at=now - timedelta(days=30), updated_at=now),
+            Resume(title="Created last week", content="x", user_id=user.id, created_at=now - timedelta(days=7)),
+            Resume(title="Edited yesterday", content="x", user_id=user.id,
+                   created_at=now - timedelta(days=30), updated_at=now - timedelta(days=1)),
+        ])
+        db.commit()
+
+        recent = db.scalars(statements.RECENT_RESUMES, {"user_id": user.id, "limit": 3}).all()
+        assert [r.title for r in recent] == ["Edited today", "Edited yesterday", "Created last week"]
+        compiled = statements.RECENT_RESUMES.compile(engine)
+        params = compiled.construct_params({"user_id": user.id, "limit": 3})
+        plan = db.connection().exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {compiled}", tuple(params[name] for name in compiled.positiontup)
+        ).all()
+        # Read backwards along the index, without a sort step
+        assert "ix_resumes_user_id_edited_at" in " ".join(row[-1] for row in plan)
+        assert "TEMP B-TREE" not in " ".join(row[-1] for row in plan)
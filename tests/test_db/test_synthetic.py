@@ -0,0 +1,68 @@
+import random
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from app.crud.stats import recompute_user_stats
+from app.db.base import Base
+from app.db.synthetic import GenerationReport, SyntheticConfig, generate, skewed_count
+from app.models import Resume, ResumeHistory, User, UserStats
+
+
+def _config(**overrides):
+    values = dict(users=30, resumes_per_user=2, history_per_resume=8, text_length=200, batch_size=50)
+    values.update(overrides)
+    return SyntheticConfig(**values)
+
+
+def test_skewed_count_respects_bounds_and_mean():
+    rng = random.Random(1)
+    counts = [skewed_count(rng, 20, 1.0, 1, 500) for _ in range(20000)]
+    assert min(counts) >= 1 and max(counts) <= 500
+    assert 17 < sum(counts) / len(counts) < 23
+    # Skewed: the median is well below the mean
+    assert sorted(counts)[len(counts) // 2] < 15
+
+
+def test_generate_is_consistent(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'synthetic.db'}")
+    Base.metadata.create_all(bind=engine)
+
+    batches = []
+    report = generate(engine, _config(), progress=lambda r: batches.append(r.history))
+    assert len(batches) > 2
+
+    with Session(engine) as db:
+        assert db.scalar(select(func.count(User.id))) == report.users == 30
+        assert db.scalar(select(func.count(Resume.id))) == report.resumes
+        assert db.scalar(select(func.count(ResumeHistory.id))) == report.history
+
+        # Every resume's version matches its history and its content is the last edit
+        for resume in db.scalars(select(Resume)):
+            history = db.scalars(
+                select(ResumeHistory).where(ResumeHistory.resume_id == resume.id).order_by(ResumeHistory.id)
+            ).all()
+            assert resume.version == len(history)
+            assert history[0].improved_content is None
+            assert (history[-1].improved_content or history[-1].content) == resume.content
+            times = [h.created_at for h in history]
+            assert times == sorted(times)
+
+        written = {s.user_id: (s.resume_count, s.history_count, s.improvement_count) for s in db.scalars(select(UserStats))}
+        recompute_user_stats(db)
+        db.flush()
+        db.expire_all()
+        computed = {s.user_id: (s.resume_count, s.history_count, s.improvement_count) for s in db.scalars(select(UserStats))}
+        assert written == computed
+
+
+def test_generate_appends_after_existing_rows(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'synthetic.db'}")
+    Base.metadata.create_all(bind=engine)
+
+    first = generate(engine, _config(users=5))
+    second = generate(engine, _config(users=5, seed=7))
+    assert isinstance(second, GenerationReport)
+    with Session(engine) as db:
+        assert db.scalar(select(func.count(User.id))) == 10
+        assert db.scalar(select(func.count(ResumeHistory.id))) == first.history + second.history
@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.crud.resume import create_resume, find_similar_resumes
+from app.db.base import Base
+from app.jobs.content_index import index_stale_resumes
+from app.models import Resume, User
+from app.models.resume import ResumeLSHBucket, ResumeSignature
+from app.schemas.resume import ResumeCreate
+
+BODY = " ".join(f"Delivered project {n} on time and improved throughput by {n} percent." for n in range(40))
+
+
+@pytest.fixture()
+def session_factory():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.drop_all(bind=engine)
+
+
+def _user(db, email):
+    user = User(email=email, hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user.id
+
+
+def test_unindexed_resumes_are_found_once_the_job_ran(session_factory):
+    db = session_factory()
+    user_id = _user(db, "index@example.com")
+    # Written behind the crud's back: no signature, no buckets
+    legacy = [Resume(title=f"Legacy {n}", content=BODY, user_id=user_id) for n in range(3)]
+    db.add_all(legacy)
+    db.commit()
+    ids = [resume.id for resume in legacy]
+
+    # A lookup only indexes its target, so the others are not candidates yet
+    assert find_similar_resumes(db, ids[0], user_id) == []
+    db.close()
+
+    assert index_stale_resumes(session_factory, batch_size=1) == 2
+    assert index_stale_resumes(session_factory) == 0
+    db = session_factory()
+    assert [s["id"] for s in find_similar_resumes(db, ids[0], user_id)] == ids[1:]
+    assert db.scalar(select(ResumeSignature.version).where(ResumeSignature.resume_id == ids[2])) == 1
+    db.close()
+
+
+def test_other_users_copies_are_not_candidates(session_factory):
+    db = session_factory()
+    alice, bob = _user(db, "alice@example.com"), _user(db, "bob@example.com")
+    original = create_resume(db, ResumeCreate(title="Mine", content=BODY), alice)
+    create_resume(db, ResumeCreate(title="Theirs", content=BODY), bob)
+
+    assert find_similar_resumes(db, original.id, alice) == []
+    assert set(db.scalars(select(ResumeLSHBucket.user_id))) == {alice, bob}
+    db.close()
+
+
+def test_an_index_older_than_the_resume_is_not_stored(session_factory):
+    from app.crud.resume import index_content, update_resume
+    from app.schemas.resume import ResumeUpdate
+
+    db = session_factory()
+    user_id = _user(db, "race@example.com")
+    resume = create_resume(db, ResumeCreate(title="Edited", content=BODY), user_id)
+    update_resume(db, resume.id, ResumeUpdate(content="Painter and decorator"), user_id)
+
+    # A job that read version 1 before the edit committed
+    index_content(db, user_id, [(resume.id, 1, BODY)])
+    db.commit()
+    assert db.scalar(select(ResumeSignature.version).where(ResumeSignature.resume_id == resume.id)) == 2
+    db.close()
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.base import Base
+from app.models import User, Resume, ResumeHistory, ResumeHistoryArchive, JobCheckpoint
+from app.jobs.history_retention import (
+    RetentionPolicy, select_victims, run_retention, load_archived_version, JOB_NAME
+)
+
+NOW = datetime(2026, 6, 15, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture()
+def session_factory():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.drop_all(bind=engine)
+
+
+def _seed(session_factory, ages_in_hours):
+    db = session_factory()
+    user = User(email="retention@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    resume = Resume(title="Resume", content="Current content", user_id=user.id)
+    db.add(resume)
+    db.flush()
+    for hours in ages_in_hours:
+        db.add(ResumeHistory(
+            resume_id=resume.id,
+            content=f"version {hours}h old",
+            created_at=NOW - timedelta(hours=hours),
+        ))
+    db.commit()
+    resume_id = resume.id
+    db.close()
+    return resume_id
+
+
+def test_select_victims_keeps_newest_per_bucket():
+    policy = RetentionPolicy(keep_all_days=30, daily_days=365, monthly_days=0)
+    rows = [
+        (1, 1, NOW - timedelta(days=1)),                     # recent: kept
+        (2, 1, NOW - timedelta(days=40, hours=1)),           # newest of its day: kept
+        (3, 1, NOW - timedelta(days=40, hours=2)),           # same day: removed
+        (4, 1, datetime(2025, 1, 20, tzinfo=timezone.utc)),  # newest of its month: kept
+        (5, 1, datetime(2025, 1, 3, tzinfo=timezone.utc)),   # same month: removed
+        (6, 2, NOW - timedelta(days=40, hours=3)),           # other resume: kept
+    ]
+    assert select_victims(rows, policy, NOW) == [3, 5]
+
+
+def test_select_victims_drops_beyond_monthly_window():
+    policy = RetentionPolicy(keep_all_days=1, daily_days=2, monthly_days=30)
+    rows = [(1, 1, NOW - timedelta(days=60)), (2, 1, NOW - timedelta(days=90))]
+    assert select_victims(rows, policy, NOW) == [1, 2]
+
+
+def test_run_retention_archives_and_checkpoints(session_factory):
+    # Three versions on the same day 40 days ago and one from yesterday
+    resume_id = _seed(session_factory, [24, 960, 961, 962])
+
+    stats = run_retention(
+        session_factory,
+        policy=RetentionPolicy(keep_all_days=30, daily_days=365),
+        chunk_size=10,
+        archive=True,
+        now=NOW,
+    )
+    assert stats.finished
+    assert stats.versions_removed == 2
+    assert stats.versions_archived == 2
+
+    db = session_factory()
+    remaining = sorted(h.content for h in db.query(ResumeHistory).filter_by(resume_id=resume_id))
+    assert remaining == ["version 24h old", "version 960h old"]
+    archived = sorted(load_archived_version(a)["content"] for a in db.query(ResumeHistoryArchive))
+    assert archived == ["version 961h old", "version 962h old"]
+    assert db.get(JobCheckpoint, JOB_NAME).position == 0
+    db.close()
+
+
+def test_dry_run_changes_nothing(session_factory):
+    _seed(session_factory, [960, 961])
+
+    stats = run_retention(session_factory, policy=RetentionPolicy(), dry_run=True, now=NOW)
+    assert stats.versions_removed == 1
+
+    db = session_factory()
+    assert db.query(ResumeHistory).count() == 2
+    db.close()
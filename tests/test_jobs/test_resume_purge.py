@@ -0,0 +1,90 @@
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.crud.resume import delete_resume
+from app.crud.stats import get_user_stats
+from app.db.base import Base
+from app.jobs.resume_purge import purge_detached_resumes
+from app.models import Resume, ResumeHistory, User
+
+
+@pytest.fixture()
+def session_factory():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.drop_all(bind=engine)
+
+
+def _seed(db, versions):
+    user = db.scalar(select(User)) or User(email="purge@example.com", hashed_password="x")
+    resume = Resume(title="Long", content="text", user=user)
+    resume.history = [ResumeHistory(content=f"v{n}") for n in range(versions)]
+    db.add(resume)
+    db.commit()
+    return user.id, resume.id
+
+
+def _history_count(db):
+    return db.scalar(select(func.count(ResumeHistory.id)))
+
+
+def test_small_resume_is_deleted_synchronously(session_factory, monkeypatch):
+    monkeypatch.setattr(settings, "RESUME_PURGE_ASYNC_THRESHOLD", 10)
+    db = session_factory()
+    user_id, resume_id = _seed(db, 5)
+
+    assert delete_resume(db, resume_id, user_id) is False
+    assert db.get(Resume, resume_id) is None
+    assert _history_count(db) == 0
+    db.close()
+
+
+def test_large_resume_is_detached_then_purged(session_factory, monkeypatch):
+    monkeypatch.setattr(settings, "RESUME_PURGE_ASYNC_THRESHOLD", 10)
+    db = session_factory()
+    user_id, resume_id = _seed(db, 25)
+    _, kept_id = _seed(db, 3)
+    get_user_stats(db, user_id)
+
+    assert delete_resume(db, resume_id, user_id) is True
+    # Gone for its owner and its resume count at once; its history counts until purged
+    assert db.get(Resume, resume_id).user_id is None
+    assert _history_count(db) == 28
+    stats = get_user_stats(db, user_id)
+    assert (stats.resume_count, stats.history_count) == (1, 28)
+    db.close()
+
+    assert purge_detached_resumes(session_factory, batch_size=7) == 1
+    db = session_factory()
+    assert db.get(Resume, resume_id) is None
+    assert db.get(Resume, kept_id) is not None
+    assert _history_count(db) == 3
+    stats = get_user_stats(db, user_id)
+    assert (stats.resume_count, stats.history_count) == (1, 3)
+    db.close()
+
+    assert purge_detached_resumes(session_factory) == 0
+
+
+def test_stats_seeded_during_a_purge_stay_exact(session_factory, monkeypatch):
+    monkeypatch.setattr(settings, "RESUME_PURGE_ASYNC_THRESHOLD", 10)
+    db = session_factory()
+    user_id, resume_id = _seed(db, 11)
+    _seed(db, 4)
+
+    assert delete_resume(db, resume_id, user_id) is True
+    # No stats row yet: computed from the tables, detached history included
+    stats = get_user_stats(db, user_id)
+    assert (stats.resume_count, stats.history_count) == (1, 15)
+    db.close()
+
+    purge_detached_resumes(session_factory, batch_size=4)
+    db = session_factory()
+    assert get_user_stats(db, user_id).history_count == 4
+    db.close()